@@ -3,6 +3,10 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Las peticiones HTTP van a Django; los WebSocket de /ws/chat/ van al chat en
+tiempo real (usuarios.chat). Se necesita un servidor ASGI, por ejemplo:
+    uvicorn config.asgi:application
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -13,4 +17,22 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Se importa después de configurar Django porque usa los modelos
+from usuarios.chat import chat_websocket  # noqa: E402
+
+RUTAS_WEBSOCKET = {
+    '/ws/chat/': chat_websocket,
+}
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        app = RUTAS_WEBSOCKET.get(scope['path'])
+        if app is None:
+            await receive()
+            await send({'type': 'websocket.close', 'code': 4404})
+            return
+        return await app(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -41,6 +41,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'usuarios.metricas.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,7 +55,8 @@ ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que además mide el tiempo de render para /metrics/
+        'BACKEND': 'usuarios.metricas.PlantillasMedidas',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -83,12 +85,61 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD', default=''),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
-        'OPTIONS': {
-            'client_encoding': 'UTF8',
-        },
     }
 }
 
+# client_encoding solo existe en PostgreSQL; SQLite rechaza opciones desconocidas
+if 'postgresql' in DATABASES['default']['ENGINE']:
+    DATABASES['default']['OPTIONS'] = {
+        'client_encoding': 'UTF8',
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# Por defecto en la base de datos: compartida entre procesos y sin servicios extra.
+# Crear la tabla con: python manage.py createcachetable
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': config('CACHE_LOCATION', default='cache_dashboard'),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
+    }
+}
+
+# Métricas de rendimiento (/metrics/, formato Prometheus)
+# Cada worker guarda sus totales en METRICAS_DIR; vaciarlo al desplegar.
+# METRICAS_TOKEN permite que Prometheus lea sin sesión: Authorization: Bearer <token>
+
+METRICAS_DIR = config('METRICAS_DIR', default=str(BASE_DIR / 'metricas'))
+METRICAS_INTERVALO = config('METRICAS_INTERVALO', default=10, cast=int)
+METRICAS_TOKEN = config('METRICAS_TOKEN', default='')
+
+# Chat en tiempo real (WebSocket /ws/chat/, ver config/asgi.py)
+# PubSubMemoria reparte los mensajes dentro de un proceso: con varios workers o
+# nodos hay que apuntar CHAT_PUBSUB a una implementación sobre un broker compartido.
+
+CHAT_PUBSUB = config('CHAT_PUBSUB', default='usuarios.pubsub.PubSubMemoria')
+
+# Tareas en segundo plano (usuarios.tareas): difusiones del chat e imágenes subidas
+# Corren en un pool de hilos del proceso web y el trabajo de CPU en un pool de
+# procesos; con False corren en la misma petición al confirmarse la transacción
+# (útil en pruebas).
+
+TAREAS_EN_SEGUNDO_PLANO = config('TAREAS_EN_SEGUNDO_PLANO', default=True, cast=bool)
+TAREAS_HILOS = config('TAREAS_HILOS', default=2, cast=int)
+TAREAS_PROCESOS = config('TAREAS_PROCESOS', default=2, cast=int)
+
+# Límite de intentos fallidos de login (usuarios.limite_intentos), por usuario y
+# por IP en una ventana deslizante guardada en la caché (compartida entre
+# workers). Detrás de un proxy, LOGIN_IP_CABECERA nombra la cabecera META con la
+# IP real (por ejemplo HTTP_X_REAL_IP con nginx); vacía usa REMOTE_ADDR.
+
+LOGIN_VENTANA_SEGUNDOS = config('LOGIN_VENTANA_SEGUNDOS', default=900, cast=int)
+LOGIN_MAX_FALLOS_USUARIO = config('LOGIN_MAX_FALLOS_USUARIO', default=10, cast=int)
+LOGIN_MAX_FALLOS_IP = config('LOGIN_MAX_FALLOS_IP', default=30, cast=int)
+LOGIN_IP_CABECERA = config('LOGIN_IP_CABECERA', default='')
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -134,6 +185,14 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Envío de los archivos subidos (usuarios.media): la vista revisa permisos y el
+# servidor web envía los bytes. 'x-accel' (nginx, location interna
+# MEDIA_ENVIO_PREFIJO con alias a MEDIA_ROOT), 'x-sendfile' (Apache/lighttpd) o
+# 'django' (el worker envía el archivo; solo para desarrollo)
+
+MEDIA_ENVIO = config('MEDIA_ENVIO', default='django' if DEBUG else 'x-accel')
+MEDIA_ENVIO_PREFIJO = config('MEDIA_ENVIO_PREFIJO', default='/media-interno/')
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'usuarios.Usuario'
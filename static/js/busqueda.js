@@ -0,0 +1,75 @@
+// Búsqueda de texto completo en publicaciones y solicitudes (/api/buscar/).
+// Busca mientras se escribe, con una pausa para no pedir en cada tecla, y
+// descarta las respuestas de consultas que ya no están en la caja.
+
+const PAUSA_BUSQUEDA_MS = 300;
+
+function iniciarBusqueda(formulario) {
+    const caja = formulario.querySelector('input[name="q"]');
+    const tipo = formulario.querySelector('select[name="tipo"]');
+    const resultados = formulario.querySelector('.busqueda-resultados');
+    const botonMas = formulario.querySelector('.btn-cargar-mas');
+    let espera = null;
+    let vigente = 0;
+
+    function pintar(item) {
+        const fila = document.createElement('div');
+        fila.className = 'busqueda-resultado';
+        const titulo = document.createElement('strong');
+        titulo.textContent = `${item.tipo === 'publicacion' ? '📰' : '📌'} ${item.titulo}`;
+        const detalle = document.createElement('small');
+        const fecha = new Date(item.fecha).toLocaleDateString();
+        detalle.textContent = [item.categoria, item.estado, item.autor, fecha].filter(Boolean).join(' · ');
+        const resumen = document.createElement('p');
+        resumen.textContent = item.resumen;
+        fila.append(titulo, detalle, resumen);
+        resultados.appendChild(fila);
+    }
+
+    function pedir(url, limpiar) {
+        const consulta = ++vigente;
+        botonMas.disabled = true;
+        fetch(url, {headers: {'Accept': 'application/json'}})
+            .then(respuesta => respuesta.json())
+            .then(datos => {
+                if (consulta !== vigente) return;
+                if (limpiar) resultados.innerHTML = '';
+                (datos.resultados || []).forEach(pintar);
+                if (limpiar && !resultados.children.length) {
+                    resultados.innerHTML = '<p class="busqueda-vacia">Sin resultados.</p>';
+                }
+                botonMas.dataset.url = datos.siguiente || '';
+                botonMas.style.display = datos.siguiente ? 'block' : 'none';
+                botonMas.disabled = false;
+            });
+    }
+
+    function buscar() {
+        const texto = caja.value.trim();
+        if (texto.length < 2) {
+            vigente++;
+            resultados.innerHTML = '';
+            botonMas.style.display = 'none';
+            return;
+        }
+        const parametros = new URLSearchParams({q: texto});
+        if (tipo.value) parametros.set('tipo', tipo.value);
+        pedir(`${formulario.dataset.url}?${parametros}`, true);
+    }
+
+    formulario.addEventListener('click', e => e.stopPropagation());
+    formulario.addEventListener('submit', e => {
+        e.preventDefault();
+        buscar();
+    });
+    caja.addEventListener('input', () => {
+        clearTimeout(espera);
+        espera = setTimeout(buscar, PAUSA_BUSQUEDA_MS);
+    });
+    tipo.addEventListener('change', buscar);
+    botonMas.addEventListener('click', () => pedir(botonMas.dataset.url, false));
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    document.querySelectorAll('form.busqueda').forEach(iniciarBusqueda);
+});
@@ -0,0 +1,312 @@
+// Chat en tiempo real con la administración.
+// Una sola conexión WebSocket por página (/ws/chat/) recibe los mensajes nuevos y
+// las confirmaciones de lectura; el historial y los contactos se piden por HTTP.
+// Necesita el modal de templates/usuarios/chat.html.
+
+const chat = {
+    socket: null,
+    reintento: 1000,
+    contacto: null,     // {id, nombre} de la conversación abierta
+};
+
+function datosChat() {
+    return document.getElementById('modal-chat').dataset;
+}
+
+function conectarChat() {
+    if (chat.socket && chat.socket.readyState <= WebSocket.OPEN) return;
+    const protocolo = location.protocol === 'https:' ? 'wss' : 'ws';
+    chat.socket = new WebSocket(`${protocolo}://${location.host}/ws/chat/`);
+
+    chat.socket.onopen = () => {
+        // Lo que llegó mientras no había conexión se recupera por HTTP
+        if (chat.reintento > 1000 && chat.contacto) {
+            cargarHistorialChat();
+        }
+        chat.reintento = 1000;
+    };
+    chat.socket.onmessage = event => recibirEventoChat(JSON.parse(event.data));
+    chat.socket.onclose = event => {
+        // Sin sesión u origen no válido: reintentar no cambiaría nada
+        if (event.code === 4401 || event.code === 4403) return;
+        setTimeout(conectarChat, chat.reintento);
+        chat.reintento = Math.min(chat.reintento * 2, 30000);
+    };
+}
+
+function enviarEventoChat(evento) {
+    if (!chat.socket || chat.socket.readyState !== WebSocket.OPEN) {
+        mostrarErrorChat('Sin conexión con el chat. Reintentando...');
+        conectarChat();
+        return false;
+    }
+    chat.socket.send(JSON.stringify(evento));
+    return true;
+}
+
+function recibirEventoChat(evento) {
+    if (evento.tipo === 'error') {
+        mostrarErrorChat(evento.error);
+        return;
+    }
+
+    const abierta = chat.contacto && document.getElementById('modal-chat').style.display === 'flex';
+    if (evento.tipo === 'mensaje') {
+        const conContacto = chat.contacto && [evento.remitente, evento.destinatario].includes(chat.contacto.id);
+        if (abierta && conContacto) {
+            agregarMensajeChat(evento, false);
+            marcarLeidosChat();
+        } else if (evento.remitente !== Number(datosChat().usuarioId)) {
+            cargarContactosChat(true);
+        }
+    } else if (evento.tipo === 'leido' && chat.contacto && evento.lector === chat.contacto.id) {
+        document.querySelectorAll('#chat-mensajes [data-propio="true"]').forEach(burbuja => {
+            if (Number(burbuja.dataset.id) <= evento.hasta) {
+                burbuja.querySelector('.chat-estado').textContent = '✓✓';
+            }
+        });
+    }
+}
+
+function abrirChat(event, usuarioId, nombre) {
+    if (event) event.stopPropagation();
+    chat.contacto = { id: Number(usuarioId), nombre: nombre };
+    document.getElementById('chat-titulo').textContent = nombre;
+    document.getElementById('modal-chat').style.display = 'flex';
+    conectarChat();
+    cargarHistorialChat();
+}
+
+function cerrarChat() {
+    document.getElementById('modal-chat').style.display = 'none';
+    chat.contacto = null;
+}
+
+function cargarHistorialChat(url) {
+    const lista = document.getElementById('chat-mensajes');
+    const boton = document.getElementById('chat-anteriores');
+    const anteriores = Boolean(url);
+    if (!anteriores) {
+        lista.innerHTML = '';
+        url = `/chat/historial/${chat.contacto.id}/`;
+    }
+    const contactoId = chat.contacto.id;
+    boton.disabled = true;
+
+    fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+        .then(response => response.json())
+        .then(data => {
+            if (!chat.contacto || chat.contacto.id !== contactoId) return;
+            if (data.error) {
+                mostrarErrorChat(data.error);
+                return;
+            }
+            // La API devuelve primero los más recientes
+            const alturaPrevia = lista.scrollHeight;
+            data.resultados.forEach(mensaje => agregarMensajeChat(mensaje, true));
+            if (anteriores) {
+                lista.scrollTop = lista.scrollHeight - alturaPrevia;
+            } else {
+                lista.scrollTop = lista.scrollHeight;
+            }
+            boton.style.display = data.siguiente ? 'block' : 'none';
+            boton.disabled = false;
+            boton.onclick = () => cargarHistorialChat(data.siguiente);
+            marcarLeidosChat();
+        })
+        .catch(error => {
+            boton.disabled = false;
+            console.error('Error:', error);
+        });
+}
+
+function agregarMensajeChat(mensaje, alInicio) {
+    const lista = document.getElementById('chat-mensajes');
+    if (lista.querySelector(`[data-id="${mensaje.id}"]`)) return;
+
+    const propio = mensaje.remitente === Number(datosChat().usuarioId);
+    const burbuja = document.createElement('div');
+    burbuja.className = 'chat-burbuja' + (propio ? ' chat-propia' : '');
+    burbuja.dataset.id = mensaje.id;
+    burbuja.dataset.propio = propio;
+    burbuja.dataset.leido = mensaje.leido;
+    burbuja.dataset.remitente = mensaje.remitente;
+
+    const texto = document.createElement('div');
+    texto.textContent = mensaje.contenido;
+    const pie = document.createElement('small');
+    pie.className = 'chat-pie';
+    pie.textContent = new Date(mensaje.fecha_envio).toLocaleString([], { dateStyle: 'short', timeStyle: 'short' }) + ' ';
+    if (propio) {
+        const estado = document.createElement('span');
+        estado.className = 'chat-estado';
+        estado.textContent = mensaje.leido ? '✓✓' : '✓';
+        pie.appendChild(estado);
+    }
+    burbuja.append(texto, pie);
+
+    if (alInicio) {
+        lista.prepend(burbuja);
+    } else {
+        const abajo = lista.scrollHeight - lista.scrollTop - lista.clientHeight < 40;
+        lista.appendChild(burbuja);
+        if (abajo || propio) lista.scrollTop = lista.scrollHeight;
+    }
+}
+
+function marcarLeidosChat() {
+    if (!chat.contacto || !chat.socket || chat.socket.readyState !== WebSocket.OPEN) return;
+    let hasta = 0;
+    document.querySelectorAll(`#chat-mensajes [data-remitente="${chat.contacto.id}"][data-leido="false"]`).forEach(burbuja => {
+        hasta = Math.max(hasta, Number(burbuja.dataset.id));
+        burbuja.dataset.leido = 'true';
+    });
+    if (hasta) {
+        enviarEventoChat({ tipo: 'leido', remitente: chat.contacto.id, hasta: hasta });
+        const contador = document.querySelector(`[data-chat-contacto="${chat.contacto.id}"] .chat-no-leidos`);
+        if (contador) contador.remove();
+    }
+}
+
+function enviarMensajeChat(event) {
+    event.preventDefault();
+    const campo = document.getElementById('chat-texto');
+    const contenido = campo.value.trim();
+    if (!contenido || !chat.contacto) return;
+    if (enviarEventoChat({ tipo: 'mensaje', destinatario: chat.contacto.id, contenido: contenido })) {
+        campo.value = '';
+        document.getElementById('chat-error').style.display = 'none';
+    }
+}
+
+function mostrarErrorChat(texto) {
+    const error = document.getElementById('chat-error');
+    error.textContent = '❌ ' + texto;
+    error.style.display = 'block';
+}
+
+// Lista de contactos (residente) o bandeja de conversaciones (administrador);
+// la bandeja viene paginada por cursor y se extiende con "Cargar más".
+function cargarContactosChat(recargar, url) {
+    const contenedor = document.getElementById('chat-contactos');
+    if (!contenedor || (contenedor.dataset.cargada && !recargar && !url)) return;
+    contenedor.dataset.cargada = 'true';
+
+    fetch(url || contenedor.dataset.url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+        .then(response => response.json())
+        .then(data => {
+            if (!url) contenedor.innerHTML = '';
+            if (!url && !data.resultados.length && contenedor.dataset.vacio) {
+                const vacio = document.createElement('p');
+                vacio.style.cssText = 'color: #999; text-align: center;';
+                vacio.textContent = contenedor.dataset.vacio;
+                contenedor.appendChild(vacio);
+            }
+            contenedor.querySelectorAll('.btn-cargar-mas').forEach(boton => boton.remove());
+            data.resultados.forEach(contacto => contenedor.appendChild(botonContactoChat(contacto)));
+            if (data.siguiente) {
+                const mas = document.createElement('button');
+                mas.type = 'button';
+                mas.className = 'btn-opcion btn-cargar-mas';
+                mas.style.width = '100%';
+                mas.textContent = 'Cargar más';
+                mas.onclick = event => {
+                    event.stopPropagation();
+                    mas.disabled = true;
+                    cargarContactosChat(true, data.siguiente);
+                };
+                contenedor.appendChild(mas);
+            }
+        })
+        .catch(error => {
+            delete contenedor.dataset.cargada;
+            console.error('Error:', error);
+        });
+}
+
+function botonContactoChat(contacto) {
+    const boton = document.createElement('button');
+    boton.type = 'button';
+    boton.className = 'btn-opcion';
+    boton.dataset.chatContacto = contacto.id;
+    boton.style.cssText = 'width: 100%; display: flex; justify-content: space-between; align-items: center; gap: 10px; margin-bottom: 8px; text-align: left;';
+
+    const texto = document.createElement('span');
+    texto.style.cssText = 'overflow: hidden; text-overflow: ellipsis; white-space: nowrap;';
+    texto.textContent = '💬 ' + contacto.nombre + (contacto.casa_departamento ? ` (${contacto.casa_departamento})` : '');
+    if (contacto.ultimo_mensaje) {
+        const ultimo = document.createElement('small');
+        ultimo.style.cssText = 'display: block; opacity: 0.7; overflow: hidden; text-overflow: ellipsis;';
+        ultimo.textContent = contacto.ultimo_mensaje;
+        texto.appendChild(ultimo);
+    }
+    boton.appendChild(texto);
+
+    if (contacto.no_leidos) {
+        const contador = document.createElement('span');
+        contador.className = 'badge chat-no-leidos';
+        contador.style.position = 'static';
+        contador.textContent = contacto.no_leidos;
+        boton.appendChild(contador);
+    }
+    boton.onclick = event => abrirChat(event, contacto.id, contacto.nombre);
+    return boton;
+}
+
+document.addEventListener('DOMContentLoaded', conectarChat);
+
+// --- Difusiones: un mensaje de la administración a muchos residentes ---
+// El servidor responde al instante y reparte en segundo plano; aquí se
+// consulta el avance hasta que termina.
+
+function enviarDifusion(event) {
+    event.preventDefault();
+    const formulario = event.target;
+    const boton = formulario.querySelector('button[type="submit"]');
+    boton.disabled = true;
+
+    fetch(formulario.dataset.url, {
+        method: 'POST',
+        headers: { 'X-CSRFToken': formulario.querySelector('[name=csrfmiddlewaretoken]').value },
+        body: new FormData(formulario),
+    })
+        .then(response => response.json().then(data => {
+            if (!response.ok) throw new Error(data.error);
+            return data;
+        }))
+        .then(data => {
+            formulario.reset();
+            mostrarProgresoDifusion(data, boton);
+        })
+        .catch(error => {
+            boton.disabled = false;
+            mostrarProgresoDifusion({ porcentaje: 0, error: error.message }, boton);
+        });
+}
+
+function mostrarProgresoDifusion(difusion, boton) {
+    const progreso = document.getElementById('difusion-progreso');
+    progreso.style.display = 'block';
+    progreso.querySelector('.difusion-barra > div').style.width = `${difusion.porcentaje}%`;
+    const texto = progreso.querySelector('span');
+    if (difusion.error) {
+        texto.textContent = `❌ ${difusion.error}`;
+        return;
+    }
+    texto.textContent = `${difusion.enviados} de ${difusion.total} residentes · ${difusion.estado_display}`;
+
+    if (difusion.estado === 'completada' || difusion.estado === 'fallida') {
+        boton.disabled = false;
+        cargarContactosChat(true);
+        return;
+    }
+    setTimeout(() => {
+        fetch(`/chat/difusiones/${difusion.id}/`, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+            .then(response => response.json())
+            .then(data => mostrarProgresoDifusion(data, boton))
+            .catch(error => {
+                boton.disabled = false;
+                console.error('Error:', error);
+            });
+    }, 1000);
+}
@@ -0,0 +1,16 @@
+// Filtros del admin con autocompletado (usuarios.admin.FiltroAutocompletado):
+// al elegir o limpiar un valor, recarga la lista con el filtro aplicado.
+'use strict';
+{
+    const $ = django.jQuery;
+
+    $(document).on('change', 'select.filtro-autocompletado', function() {
+        const todos = this.dataset.urlTodos;
+        if (!this.value) {
+            window.location.search = todos;
+            return;
+        }
+        const separador = todos.length > 1 ? '&' : '';
+        window.location.search = `${todos}${separador}${this.dataset.parametro}=${encodeURIComponent(this.value)}`;
+    });
+}
@@ -0,0 +1,56 @@
+// Novedades en vivo del dashboard (Server-Sent Events en /novedades/).
+// Actualiza el estado (de una o de un lote) y las reacciones de las solicitudes
+// ya dibujadas y vuelve a pedir las publicaciones cuando cambian. EventSource
+// se reconecta solo y envía Last-Event-ID, así que tras un corte breve llega lo
+// que se perdió.
+
+function escucharNovedades(url = '/novedades/') {
+    if (!window.EventSource) return;
+    const fuente = new EventSource(url);
+
+    function pintarEstado(id, datos) {
+        document.querySelectorAll(`[data-solicitud-id="${id}"] .solicitud-estado`).forEach(estado => {
+            estado.className = `solicitud-estado estado-${datos.estado}`;
+            estado.textContent = datos.estado_display;
+        });
+    }
+
+    fuente.addEventListener('solicitud', e => {
+        const datos = JSON.parse(e.data);
+        pintarEstado(datos.id, datos);
+    });
+
+    // Gestión en lote: una sola novedad con todos los ids, o sin ids si eran
+    // demasiadas, y entonces se recargan las listas abiertas
+    fuente.addEventListener('solicitudes', e => {
+        const datos = JSON.parse(e.data);
+        if (datos.ids) {
+            datos.ids.forEach(id => pintarEstado(id, datos));
+            return;
+        }
+        document.querySelectorAll('[data-tarjeta="solicitudes"][data-cargada]').forEach(contenedor => {
+            contenedor.innerHTML = '';
+            cargarPaginaTarjeta(contenedor, contenedor.dataset.url);
+        });
+    });
+
+    fuente.addEventListener('reaccion', e => {
+        const datos = JSON.parse(e.data);
+        document.querySelectorAll(`[data-solicitud-id="${datos.id}"] .reacciones-count`).forEach(contador => {
+            contador.textContent = datos.total_reacciones;
+        });
+    });
+
+    fuente.addEventListener('publicacion', () => {
+        // Solo se recargan las listas que el usuario ya abrió
+        document.querySelectorAll('[data-tarjeta="reportes"][data-cargada]').forEach(contenedor => {
+            contenedor.innerHTML = '';
+            cargarPaginaTarjeta(contenedor, contenedor.dataset.url);
+        });
+    });
+
+    // Las novedades del corte ya se depuraron: la página está desactualizada
+    fuente.addEventListener('recargar', () => location.reload());
+}
+
+document.addEventListener('DOMContentLoaded', () => escucharNovedades());
@@ -0,0 +1,47 @@
+// Carga diferida de las listas del dashboard.
+// Cada contenedor con data-tarjeta="<tarjeta>" se llena desde su endpoint JSON
+// (data-url) la primera vez que se expande la tarjeta correspondiente.
+
+function cargarTarjetas(tarjeta) {
+    document.querySelectorAll(`[data-tarjeta="${tarjeta}"]`).forEach(contenedor => {
+        if (contenedor.dataset.cargada) return;
+        contenedor.dataset.cargada = 'true';
+        cargarPaginaTarjeta(contenedor, contenedor.dataset.url);
+    });
+}
+
+function cargarPaginaTarjeta(contenedor, url) {
+    const ancla = contenedor.closest('table') || contenedor;
+    let boton = ancla.nextElementSibling;
+    if (!boton || !boton.classList.contains('btn-cargar-mas')) {
+        boton = document.createElement('button');
+        boton.type = 'button';
+        boton.className = 'btn-opcion btn-cargar-mas';
+        boton.style.cssText = 'width: 100%; margin-top: 15px; display: none;';
+        boton.textContent = 'Cargar más';
+        ancla.insertAdjacentElement('afterend', boton);
+    }
+    boton.disabled = true;
+
+    fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+        .then(response => response.json())
+        .then(data => {
+            contenedor.insertAdjacentHTML('beforeend', data.html);
+            if (data.siguiente) {
+                boton.style.display = 'block';
+                boton.disabled = false;
+                boton.onclick = function (event) {
+                    event.stopPropagation();
+                    cargarPaginaTarjeta(contenedor, data.siguiente);
+                };
+            } else {
+                boton.style.display = 'none';
+            }
+        })
+        .catch(error => {
+            // Permitir reintentar al volver a expandir la tarjeta
+            delete contenedor.dataset.cargada;
+            boton.disabled = false;
+            console.error('Error:', error);
+        });
+}
@@ -1,11 +1,161 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.widgets import AutocompleteSelect
 from django.contrib.auth.admin import UserAdmin
+from django.core.exceptions import PermissionDenied
+from django.db import models
+from django.db.models import Q
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils.html import format_html, format_html_join
+from django.utils.translation import gettext as _
+from .busqueda import ids_coincidentes
+from .exportacion import nombre_de_modelo, respuesta_exportacion
+from .gestion_solicitudes import gestionar_en_lote
+from .importacion import ArchivoInvalido, importar
 from .models import Usuario, Evento, Solicitud, Mascota, Vehiculo, Publicacion
+from .paginacion import PaginadorConteoEstimado
+
+
+class FiltroAutocompletado(admin.RelatedFieldListFilter):
+    """
+    Filtro de la barra lateral por una relación (el usuario de una solicitud)
+    sin listar todos los registros relacionados: un select con el mismo
+    autocompletado de autocomplete_fields, que busca con los search_fields del
+    admin del modelo relacionado. Solo se consulta el registro elegido.
+    """
+    template = 'admin/filtro_autocompletado.html'
+
+    def field_choices(self, field, request, model_admin):
+        if not self.lookup_val:
+            return []
+        elegidos = field.remote_field.model._default_manager.filter(pk__in=self.lookup_val)
+        return [(elegido.pk, str(elegido)) for elegido in elegidos]
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        yield {
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg, self.lookup_kwarg_isnull]),
+            'parametro': self.lookup_kwarg,
+            'elegidos': self.lookup_choices,
+            'app_label': self.field.model._meta.app_label,
+            'model_name': self.field.model._meta.model_name,
+            'field_name': self.field.name,
+        }
+
+
+@admin.action(description='Exportar a CSV')
+def exportar_csv(modeladmin, request, queryset):
+    return respuesta_exportacion(request, nombre_de_modelo(queryset.model), queryset, 'csv')
+
+
+@admin.action(description='Exportar a Excel (XLSX)')
+def exportar_xlsx(modeladmin, request, queryset):
+    return respuesta_exportacion(request, nombre_de_modelo(queryset.model), queryset, 'xlsx')
+
+
+class _InputDirecto:
+    """
+    Dibuja el <input> con format_html en lugar de su plantilla: el mismo HTML,
+    sin el costo de una plantilla por casilla en cada fila de la lista.
+    """
+
+    def render(self, name, value, attrs=None, renderer=None):
+        widget = self.get_context(name, value, attrs)['widget']
+        valor = format_html(' value="{}"', widget['value']) if widget['value'] is not None else ''
+        # Como django/forms/widgets/attrs.html: en orden, True sin valor y False omitido
+        atributos = format_html_join('', '{}', (
+            (format_html(' {}', nombre) if dato is True else format_html(' {}="{}"', nombre, dato),)
+            for nombre, dato in widget['attrs'].items() if dato is not False
+        ))
+        return format_html('<input type="{}" name="{}"{}{}>', widget['type'], widget['name'], valor, atributos)
+
+
+class CasillaDirecta(_InputDirecto, forms.CheckboxInput):
+    pass
+
+
+class OcultoDirecto(_InputDirecto, forms.HiddenInput):
+    pass
+
+
+class TablaGrande:
+    """
+    Lista del admin para una tabla que crece con el conjunto (miles de usuarios,
+    decenas de miles de solicitudes): no cuenta la tabla completa y dibuja las
+    casillas de cada fila (acciones, booleanos de list_editable) sin plantilla.
+    """
+    paginator = PaginadorConteoEstimado
+    # Sin el "(N en total)" junto a los resultados filtrados: otro COUNT(*) de la tabla
+    show_full_result_count = False
+    formfield_overrides = {models.BooleanField: {'widget': CasillaDirecta}}
+
+    def action_checkbox(self, obj):
+        # Como ModelAdmin.action_checkbox, con la casilla sin plantilla
+        attrs = {'class': 'action-select', 'aria-label': format_html(_('Select this object for an action - {}'), str(obj))}
+        return CasillaDirecta(attrs, lambda value: False).render(helpers.ACTION_CHECKBOX_NAME, str(obj.pk))
+
+    def get_changelist_formset(self, request, **kwargs):
+        # El id oculto que list_editable agrega a cada fila
+        return super().get_changelist_formset(request, widgets={self.model._meta.pk.name: OcultoDirecto}, **kwargs)
+
+
+class TablaGrandeAdmin(TablaGrande, admin.ModelAdmin):
+    """
+    TablaGrande en la que los usuarios se eligen por autocompletado, en filtros
+    (FiltroAutocompletado) y formularios (autocomplete_fields).
+    """
+
+    @property
+    def media(self):
+        # Scripts de select2 para FiltroAutocompletado; no dependen del campo
+        return (
+            super().media
+            + AutocompleteSelect(None, self.admin_site).media
+            + forms.Media(js=['admin/js/jquery.init.js', 'js/filtro_autocompletado.js'])
+        )
+
+
+class BusquedaTextoCompletoAdmin(TablaGrandeAdmin):
+    """
+    Buscador del admin sobre el índice de texto completo (usuarios.busqueda)
+    en lugar de ILIKE '%...%' sobre cada campo de search_fields. También
+    encuentra por el usuario exacto del autor o por parte de su correo.
+    """
+    tipo_busqueda = None
+    campo_autor = None
+
+    def get_search_results(self, request, queryset, search_term):
+        termino = search_term.strip()
+        if not termino:
+            return queryset, False
+        coincidencias = Q(pk__in=ids_coincidentes(self.tipo_busqueda, termino))
+        # Subconsulta sobre usuarios: el ILIKE recorre los usuarios, no cada fila unida a su autor
+        autores = Usuario.objects.filter(Q(username=termino) | Q(email__icontains=termino)).values('pk')
+        coincidencias |= Q(**{f'{self.campo_autor}__in': autores})
+        return queryset.filter(coincidencias), False
+
+
+class ImportarUsuariosForm(forms.Form):
+    archivo = forms.FileField(
+        help_text='CSV en UTF-8 con username, email, first_name, last_name, telefono y, opcionales, '
+                  'casa_departamento, rol y password. Para miles de filas con contraseña conviene '
+                  'el comando importar_usuarios.',
+    )
+    solo_validar = forms.BooleanField(required=False, help_text='Revisa el archivo sin crear usuarios.')
+
+
 @admin.register(Usuario)
-class UsuarioAdmin(UserAdmin):
+class UsuarioAdmin(TablaGrande, UserAdmin):
     """
     Configuración del modelo Usuario en el panel de administración.
     """
+    actions = [exportar_csv, exportar_xlsx]
+    change_list_template = 'admin/usuarios/usuario/change_list.html'
+
     # Campos que se muestran en la lista de usuarios
     list_display = ['username', 'email', 'casa_departamento', 'rol', 'is_active', 'fecha_registro']
     
@@ -61,14 +211,44 @@ class UsuarioAdmin(UserAdmin):
         }),
     )
 
+    def get_urls(self):
+        return [
+            path('importar/', self.admin_site.admin_view(self.importar_csv), name='usuarios_usuario_importar'),
+            *super().get_urls(),
+        ]
+
+    def importar_csv(self, request):
+        """Alta de residentes desde un CSV (usuarios.importacion), con el informe de errores por línea."""
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        form = ImportarUsuariosForm(request.POST or None, request.FILES or None)
+        resultado = None
+        if form.is_valid():
+            try:
+                resultado = importar(form.cleaned_data['archivo'].read(), form.cleaned_data['solo_validar'])
+            except ArchivoInvalido as e:
+                form.add_error('archivo', str(e))
+            else:
+                if resultado['creados']:
+                    self.message_user(request, f'✅ {resultado["creados"]} usuarios creados.', messages.SUCCESS)
+        return TemplateResponse(request, 'admin/usuarios/usuario/importar.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Importar residentes desde CSV',
+            'opts': self.model._meta,
+            'form': form,
+            'resultado': resultado,
+        })
+
 
 @admin.register(Evento)
-class EventoAdmin(admin.ModelAdmin):
+class EventoAdmin(TablaGrandeAdmin):
     """
     Configuración del modelo Evento en el panel de administración.
     """
     list_display = ['titulo', 'usuario', 'fecha_inicio', 'fecha_fin', 'color']
-    list_filter = ['usuario', 'fecha_inicio', 'color']
+    list_filter = [('usuario', FiltroAutocompletado), 'fecha_inicio', 'color']
+    list_select_related = ['usuario']
+    autocomplete_fields = ['usuario']
     search_fields = ['titulo', 'descripcion', 'usuario__username']
     readonly_fields = ['creado_en', 'actualizado_en']
     
@@ -89,15 +269,29 @@ class EventoAdmin(admin.ModelAdmin):
     )
 
 
+class GestionLoteForm(forms.Form):
+    estado = forms.ChoiceField(choices=Solicitud.ESTADO_CHOICES)
+    respuesta = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={'rows': 4, 'cols': 60}),
+        help_text='Se deja en todas las solicitudes elegidas. Vacía conserva la respuesta de cada una.',
+    )
+
+
 @admin.register(Solicitud)
-class SolicitudAdmin(admin.ModelAdmin):
+class SolicitudAdmin(BusquedaTextoCompletoAdmin):
     """
     Configuración del modelo Solicitud en el panel de administración.
     """
     list_display = ['titulo', 'usuario', 'tipo', 'estado', 'fecha_creacion']
-    list_filter = ['estado', 'tipo', 'fecha_creacion', 'usuario']
+    list_filter = ['estado', 'tipo', 'fecha_creacion', ('usuario', FiltroAutocompletado)]
+    list_select_related = ['usuario']
+    autocomplete_fields = ['usuario']
     search_fields = ['titulo', 'descripcion', 'usuario__username', 'usuario__email']
+    tipo_busqueda = 'solicitud'
+    campo_autor = 'usuario'
     readonly_fields = ['fecha_creacion', 'fecha_actualizacion']
+    actions = ['gestionar_en_lote', exportar_csv, exportar_xlsx]
     
     fieldsets = (
         ('Información de la Solicitud', {
@@ -115,17 +309,43 @@ class SolicitudAdmin(admin.ModelAdmin):
         }),
     )
 
+    @admin.action(description='Cambiar estado y responder en lote')
+    def gestionar_en_lote(self, request, queryset):
+        """
+        Pide el estado y la respuesta en una página intermedia y los aplica con
+        un solo UPDATE (usuarios.gestion_solicitudes).
+        """
+        form = GestionLoteForm(request.POST if 'aplicar' in request.POST else None)
+        if form.is_valid():
+            actualizadas = gestionar_en_lote(
+                queryset, form.cleaned_data['estado'], form.cleaned_data['respuesta'].strip() or None
+            )
+            self.message_user(request, f'✅ {actualizadas} solicitudes actualizadas.', messages.SUCCESS)
+            return None
+        return TemplateResponse(request, 'admin/usuarios/solicitud/gestionar_lote.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Cambiar estado y responder en lote',
+            'opts': self.model._meta,
+            'form': form,
+            'total': queryset.count(),
+            'seleccionadas': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
+
 
 @admin.register(Mascota)
-class MascotaAdmin(admin.ModelAdmin):
+class MascotaAdmin(TablaGrandeAdmin):
     """
     Configuración del modelo Mascota en el panel de administración.
     """
     list_display = ['nombre', 'tipo', 'numero_casa', 'dueno', 'fecha_registro', 'activo']
-    list_filter = ['tipo', 'activo', 'fecha_registro', 'numero_casa']
+    # La casa se busca con el buscador: como filtro listaría todas las casas
+    list_filter = ['tipo', 'activo', 'fecha_registro', ('usuario', FiltroAutocompletado)]
     search_fields = ['nombre', 'dueno', 'numero_casa', 'descripcion']
     readonly_fields = ['fecha_registro']
     list_editable = ['activo']
+    actions = [exportar_csv, exportar_xlsx]
     
     fieldsets = (
         ('Información de la Mascota', {
@@ -145,13 +365,17 @@ class MascotaAdmin(admin.ModelAdmin):
 
 
 @admin.register(Publicacion)
-class PublicacionAdmin(admin.ModelAdmin):
+class PublicacionAdmin(BusquedaTextoCompletoAdmin):
     """
     Configuración del modelo Publicacion en el panel de administración.
     """
     list_display = ['titulo', 'autor', 'tipo', 'fecha_publicacion']
-    list_filter = ['tipo', 'fecha_publicacion', 'autor']
-    search_fields = ['titulo', 'contenido']
+    list_filter = ['tipo', 'fecha_publicacion', ('autor', FiltroAutocompletado)]
+    list_select_related = ['autor']
+    autocomplete_fields = ['autor']
+    search_fields = ['titulo', 'contenido', 'autor__username']
+    tipo_busqueda = 'publicacion'
+    campo_autor = 'autor'
     readonly_fields = ['fecha_publicacion']
     
     fieldsets = (
@@ -169,14 +393,17 @@ class PublicacionAdmin(admin.ModelAdmin):
 
 
 @admin.register(Vehiculo)
-class VehiculoAdmin(admin.ModelAdmin):
+class VehiculoAdmin(TablaGrandeAdmin):
     """
     Configuración del modelo Vehiculo en el panel de administración.
     """
     list_display = ['placa', 'marca', 'modelo', 'dueno', 'numero_casa', 'usuario', 'fecha_registro']
-    list_filter = ['marca', 'fecha_registro', 'usuario']
+    list_filter = ['marca', 'fecha_registro', ('usuario', FiltroAutocompletado)]
+    list_select_related = ['usuario']
+    autocomplete_fields = ['usuario']
     search_fields = ['placa', 'marca', 'modelo', 'dueno', 'numero_casa']
     readonly_fields = ['fecha_registro']
+    actions = [exportar_csv, exportar_xlsx]
     
     fieldsets = (
         ('Información del Vehículo', {
@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class UsuariosConfig(AppConfig):
     name = 'usuarios'
+
+    def ready(self):
+        # Registrar las señales que invalidan la caché del dashboard
+        from . import signals  # noqa: F401
+        # Y la medición de SQL en cada conexión, antes de que se abra la primera
+        from . import metricas  # noqa: F401
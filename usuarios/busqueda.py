@@ -0,0 +1,249 @@
+"""
+Búsqueda de texto completo en publicaciones y solicitudes.
+
+Cada publicación y solicitud tiene una fila en DocumentoBusqueda con su título
+y su texto ya normalizados en Python: minúsculas, sin tildes, sin palabras
+vacías y reducidos a una raíz ligera del español ("reparaciones" y
+"Reparación" quedan en "reparacion", "vecinas" y "vecino" en "vecin"). Así los
+dos motores indexan y consultan exactamente las mismas palabras:
+
+- PostgreSQL: columna generada "vector" (tsvector 'simple', título con peso A)
+  con índice GIN; se ordena con ts_rank.
+- SQLite: tabla virtual FTS5 (TABLA_FTS) que los triggers mantienen al día; se
+  ordena con bm25.
+
+Con otro motor se recurre a icontains, sin índice.
+
+Las señales (usuarios/signals.py) reindexan al guardar y borrar. Lo que se
+escribe sin señales (bulk_create, update) se reindexa con
+manage.py reindexar_busqueda.
+"""
+import heapq
+import re
+import unicodedata
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import DocumentoBusqueda, Publicacion, Solicitud
+
+TABLA_FTS = 'busqueda_documentos_fts'
+TAMANO_PAGINA = 20
+# Una consulta con más palabras no afina el resultado y encarece el índice
+MAX_TERMINOS = 8
+# bm25 de FTS5: cuánto pesa el título frente al cuerpo
+PESO_TITULO = 3.0
+# Solo se ordenan por relevancia los documentos coincidentes más recientes:
+# una palabra común aparece en la mitad del índice y calcular la relevancia de
+# todos ellos cuesta más que la búsqueda misma
+MAX_CANDIDATOS = 1000
+
+PALABRAS_VACIAS = frozenset(
+    'a al como con de del el en es la las le lo los mas me mi no o para pero por que se si sin su sus un una y ya'.split()
+)
+
+# Campos que se indexan de cada modelo: (tipo, título, cuerpo, fecha)
+CAMPOS = {
+    Publicacion: ('publicacion', 'titulo', 'contenido', 'fecha_publicacion'),
+    Solicitud: ('solicitud', 'titulo', 'descripcion', 'fecha_creacion'),
+}
+MODELOS = {tipo: modelo for modelo, (tipo, *_) in CAMPOS.items()}
+
+
+def raiz(palabra):
+    """
+    Raíz ligera de una palabra ya sin tildes: quita el plural y la vocal final
+    de género ("luces" -> "luz", "papeles" -> "papel", "vecinas" -> "vecin").
+    """
+    if len(palabra) <= 3:
+        return palabra
+    if palabra.endswith('ces'):
+        palabra = palabra[:-3] + 'z'
+    elif palabra.endswith('es') and len(palabra) > 4 and palabra[-3] not in 'aeiou':
+        palabra = palabra[:-2]
+    elif palabra.endswith('s'):
+        palabra = palabra[:-1]
+    if len(palabra) > 3 and palabra[-1] in 'aeo':
+        palabra = palabra[:-1]
+    return palabra
+
+
+def palabras(texto):
+    """Raíces de las palabras de texto, en orden y sin palabras vacías."""
+    sin_tildes = unicodedata.normalize('NFKD', (texto or '').lower()).encode('ascii', 'ignore').decode()
+    return [raiz(palabra) for palabra in re.findall(r'[a-z0-9]+', sin_tildes) if palabra not in PALABRAS_VACIAS]
+
+
+def normalizar(texto):
+    return ' '.join(palabras(texto))
+
+
+def terminos(consulta):
+    """Raíces distintas de la consulta, de dos letras o más."""
+    return list(dict.fromkeys(palabra for palabra in palabras(consulta) if len(palabra) >= 2))[:MAX_TERMINOS]
+
+
+# ---------- Sincronización ----------
+
+def _documento(instancia):
+    tipo, titulo, cuerpo, fecha = CAMPOS[type(instancia)]
+    return DocumentoBusqueda(
+        tipo=tipo,
+        objeto_id=instancia.pk,
+        titulo=normalizar(getattr(instancia, titulo)),
+        cuerpo=normalizar(getattr(instancia, cuerpo)),
+        fecha=getattr(instancia, fecha),
+    )
+
+
+def indexar(instancias):
+    """Crea o actualiza los documentos de las instancias en una sola consulta."""
+    DocumentoBusqueda.objects.bulk_create(
+        [_documento(instancia) for instancia in instancias],
+        update_conflicts=True,
+        unique_fields=['tipo', 'objeto_id'],
+        update_fields=['titulo', 'cuerpo', 'fecha'],
+    )
+
+
+def al_guardar(instancia, update_fields=None):
+    """post_save: reindexa, salvo que solo cambien campos que no se buscan."""
+    _, titulo, cuerpo, _ = CAMPOS[type(instancia)]
+    if update_fields is not None and not {titulo, cuerpo} & set(update_fields):
+        return
+    indexar([instancia])
+
+
+def al_borrar(instancia):
+    """post_delete: quita el documento de la instancia."""
+    DocumentoBusqueda.objects.filter(tipo=CAMPOS[type(instancia)][0], objeto_id=instancia.pk).delete()
+
+
+def reindexar_todo(lote=1000):
+    """
+    Reconstruye todos los documentos, de los más viejos a los más nuevos para
+    que el id siga el orden de las fechas (MAX_CANDIDATOS). Devuelve cuántos
+    quedaron.
+    """
+    fuentes = [
+        modelo.objects.only('pk', titulo, cuerpo, fecha).order_by(fecha, 'pk').iterator(chunk_size=lote)
+        for modelo, (_, titulo, cuerpo, fecha) in CAMPOS.items()
+    ]
+    total = 0
+    with transaction.atomic():
+        DocumentoBusqueda.objects.all().delete()
+        pendientes = []
+        for instancia in heapq.merge(*fuentes, key=lambda instancia: getattr(instancia, CAMPOS[type(instancia)][3])):
+            pendientes.append(instancia)
+            if len(pendientes) == lote:
+                indexar(pendientes)
+                total += len(pendientes)
+                pendientes = []
+        if pendientes:
+            indexar(pendientes)
+            total += len(pendientes)
+    return total
+
+
+# ---------- Consultas ----------
+
+def _sql_coincidencias(terminos_consulta, tipo):
+    """
+    (desde, parametros, relevancia, parametros_relevancia, recientes) de la
+    consulta de texto completo en el motor actual, o None si el motor no tiene
+    índice de texto. relevancia es menor cuanto más relevante; recientes es la
+    columna que el índice recorre de la más nueva a la más vieja.
+    """
+    if connection.vendor == 'postgresql':
+        # 'reparacion:* & fug:*': todas las palabras, cada una como prefijo
+        consulta = ' & '.join(f'{termino}:*' for termino in terminos_consulta)
+        desde = "busqueda_documentos d WHERE d.vector @@ to_tsquery('simple', %s)"
+        relevancia = "-ts_rank(d.vector, to_tsquery('simple', %s))"
+        parametros, parametros_relevancia, recientes = [consulta], [consulta], 'd.id'
+    elif connection.vendor == 'sqlite':
+        consulta = ' '.join(f'"{termino}"*' for termino in terminos_consulta)
+        desde = f'{TABLA_FTS} f JOIN busqueda_documentos d ON d.id = f.rowid WHERE {TABLA_FTS} MATCH %s'
+        relevancia = f'bm25({TABLA_FTS}, {PESO_TITULO}, 1.0)'
+        # Ordenar por f.rowid (y no d.id) deja que FTS5 entregue las filas ya ordenadas
+        parametros, parametros_relevancia, recientes = [consulta], [], 'f.rowid'
+    else:
+        return None
+    if tipo:
+        desde += ' AND d.tipo = %s'
+        parametros.append(tipo)
+    return desde, parametros, relevancia, parametros_relevancia, recientes
+
+
+def _sin_indice(terminos_consulta, tipo):
+    documentos = DocumentoBusqueda.objects.all()
+    for termino in terminos_consulta:
+        documentos = documentos.filter(Q(titulo__icontains=termino) | Q(cuerpo__icontains=termino))
+    if tipo:
+        documentos = documentos.filter(tipo=tipo)
+    return documentos
+
+
+def ids_coincidentes(tipo, consulta):
+    """
+    Expresión para filtrar un queryset de tipo con pk__in (el buscador del
+    admin), sin traer los ids a Python.
+    """
+    terminos_consulta = terminos(consulta)
+    if not terminos_consulta:
+        return DocumentoBusqueda.objects.none().values('objeto_id')
+    sql = _sql_coincidencias(terminos_consulta, tipo)
+    if sql is None:
+        return _sin_indice(terminos_consulta, tipo).values('objeto_id')
+    desde, parametros, *_ = sql
+    return RawSQL(f'SELECT d.objeto_id FROM {desde}', parametros)
+
+
+def buscar(consulta, tipo=None, pagina=1, tamano=TAMANO_PAGINA):
+    """
+    Publicaciones y solicitudes que contienen todas las palabras de la
+    consulta (cada una como prefijo), de la más a la menos relevante y, a igual
+    relevancia, de la más nueva a la más vieja. Con índice solo se ordenan las
+    MAX_CANDIDATOS coincidencias más recientes.
+    Devuelve (instancias, hay_mas); cada instancia trae tipo_busqueda.
+    Una consulta más una por tipo presente en la página.
+    """
+    terminos_consulta = terminos(consulta)
+    if not terminos_consulta:
+        return [], False
+
+    inicio = (pagina - 1) * tamano
+    sql = _sql_coincidencias(terminos_consulta, tipo)
+    if sql is None:
+        filas = list(
+            _sin_indice(terminos_consulta, tipo).order_by('-fecha', '-id')
+            .values_list('tipo', 'objeto_id')[inicio:inicio + tamano + 1]
+        )
+    else:
+        desde, parametros, relevancia, parametros_relevancia, recientes = sql
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT c.tipo, c.objeto_id FROM ('
+                f'SELECT d.id, d.tipo, d.objeto_id, d.fecha, {relevancia} AS relevancia FROM {desde} '
+                f'ORDER BY {recientes} DESC LIMIT %s'
+                ') c ORDER BY c.relevancia, c.fecha DESC, c.id DESC LIMIT %s OFFSET %s',
+                [*parametros_relevancia, *parametros, MAX_CANDIDATOS, tamano + 1, inicio],
+            )
+            filas = cursor.fetchall()
+
+    hay_mas = len(filas) > tamano
+    filas = filas[:tamano]
+
+    por_tipo = {}
+    for tipo_fila, objeto_id in filas:
+        por_tipo.setdefault(tipo_fila, []).append(objeto_id)
+    instancias = {}
+    for tipo_fila, ids in por_tipo.items():
+        modelo = MODELOS[tipo_fila]
+        relacion = 'autor' if modelo is Publicacion else 'usuario'
+        for instancia in modelo.objects.select_related(relacion).filter(pk__in=ids):
+            instancia.tipo_busqueda = tipo_fila
+            instancias[(tipo_fila, instancia.pk)] = instancia
+
+    # Un documento sin registro (borrado sin señales) simplemente no aparece
+    return [instancias[fila] for fila in filas if fila in instancias], hay_mas
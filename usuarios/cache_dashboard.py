@@ -0,0 +1,72 @@
+"""
+Caché de fragmentos del dashboard.
+
+Cada fragmento depende de uno o más grupos (publicaciones, vecinos, eventos...),
+globales o de un usuario concreto. Cada grupo tiene una versión guardada en la
+caché que forma parte de la clave del fragmento; invalidar un grupo solo cambia
+su versión, de modo que los fragmentos anteriores dejan de leerse y expiran solos.
+Las versiones se cambian desde las señales de usuarios/signals.py.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+
+_SIN_VALOR = object()
+
+
+def _clave_version(grupo, usuario_id=None):
+    if usuario_id is None:
+        return f'dashboard:version:{grupo}'
+    return f'dashboard:version:{grupo}:u{usuario_id}'
+
+
+def _versiones(dependencias):
+    """
+    Obtiene las versiones actuales de los grupos en una sola lectura de la caché
+    y las devuelve como texto para formar la clave del fragmento.
+    """
+    claves = [_clave_version(grupo, usuario_id) for grupo, usuario_id in dependencias]
+    versiones = cache.get_many(claves)
+    for clave in claves:
+        if clave not in versiones:
+            # add() no pisa la versión si otro proceso la creó primero
+            cache.add(clave, time.time_ns(), None)
+            versiones[clave] = cache.get(clave)
+    return '|'.join(
+        f"{clave.removeprefix('dashboard:version:')}={versiones[clave]}" for clave in claves
+    )
+
+
+def version(grupo, usuario_id=None):
+    """
+    Versión actual del grupo, para las cachés que viven fuera de la caché de
+    Django (por ejemplo en memoria del proceso) y deben invalidarse igual.
+    """
+    return _versiones([(grupo, usuario_id)])
+
+
+def invalidar(grupo, usuario_id=None):
+    """
+    Invalida todos los fragmentos que dependen del grupo (global o de un usuario).
+    Se usa una versión nueva e irrepetible en vez de incr() para que una versión
+    desalojada de la caché nunca vuelva a coincidir con fragmentos viejos.
+    """
+    cache.set(_clave_version(grupo, usuario_id), time.time_ns(), None)
+
+
+def fragmento(nombre, dependencias, calcular, variante=''):
+    """
+    Devuelve el fragmento cacheado o lo calcula con calcular() y lo guarda.
+    dependencias es una lista de tuplas (grupo, usuario_id o None).
+    variante distingue fragmentos del mismo nombre (por ejemplo la página pedida).
+    """
+    if variante:
+        nombre = f'{nombre}:{hashlib.md5(variante.encode()).hexdigest()}'
+    clave = f'dashboard:{nombre}:{_versiones(dependencias)}'
+
+    valor = cache.get(clave, _SIN_VALOR)
+    if valor is _SIN_VALOR:
+        valor = calcular()
+        cache.set(clave, valor)
+    return valor
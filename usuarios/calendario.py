@@ -0,0 +1,62 @@
+"""
+Consultas del calendario del dashboard.
+
+Los eventos de un mes se piden con un rango semiabierto [inicio, fin) calculado
+en la hora local y comparado directamente con las columnas, sin EXTRACT de año
+o mes, para que la consulta pueda usar los índices de Evento. Un evento entra
+en el mes si se cruza con ese rango, aunque haya empezado el mes anterior.
+"""
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from .models import Evento
+
+
+def rango_mes(ano, mes):
+    """Devuelve (inicio, fin) del mes en la zona horaria local; fin es exclusivo."""
+    inicio = datetime(ano, mes, 1)
+    fin = datetime(ano + 1, 1, 1) if mes == 12 else datetime(ano, mes + 1, 1)
+    return timezone.make_aware(inicio), timezone.make_aware(fin)
+
+
+def eventos_del_mes(ano, mes, **filtros):
+    """
+    Lista de eventos que se cruzan con el mes, ordenados por inicio.
+    filtros acota el dueño, por ejemplo es_global=True o usuario=...
+    """
+    inicio, fin = rango_mes(ano, mes)
+    return list(
+        Evento.objects
+        # fecha_fin es exclusiva, como en eventos_por_dia: terminar justo al empezar el mes no lo toca
+        .filter(fecha_fin__gt=inicio, fecha_inicio__lt=fin, **filtros)
+        .order_by('fecha_inicio', 'id')
+    )
+
+
+def eventos_por_dia(eventos, ano, mes):
+    """
+    Reparte los eventos en {día: [eventos]} en una sola pasada. Un evento de
+    varios días (por ejemplo una minga de fin de semana) aparece en cada día
+    del mes que abarca, no solo en el día en que empieza.
+    """
+    inicio, fin = rango_mes(ano, mes)
+    primer_dia_mes = inicio.date()
+    ultimo_dia_mes = (fin - timedelta(days=1)).date()
+
+    por_dia = {}
+    for evento in eventos:
+        desde = timezone.localtime(evento.fecha_inicio).date()
+        if evento.fecha_fin > evento.fecha_inicio:
+            # fecha_fin es exclusiva: terminar a medianoche no ocupa el día siguiente
+            hasta = timezone.localtime(evento.fecha_fin - timedelta(microseconds=1)).date()
+        else:
+            hasta = desde
+
+        desde = max(desde, primer_dia_mes)
+        hasta = min(hasta, ultimo_dia_mes)
+        if desde > hasta:
+            continue
+        for dia in range(desde.day, hasta.day + 1):
+            por_dia.setdefault(dia, []).append(evento)
+    return por_dia
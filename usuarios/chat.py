@@ -0,0 +1,197 @@
+"""
+Chat en tiempo real entre la administración y los residentes.
+
+Aplicación ASGI para WebSocket, montada en config/asgi.py sobre /ws/chat/. Cada
+conexión es una corrutina en el event loop del servidor (no un hilo), así que un
+worker mantiene miles de conexiones inactivas. Los mensajes se guardan junto con el
+resumen de su conversación (usuarios.conversaciones) y se reparten por la capa de
+pub/sub (usuarios.pubsub) al canal de cada participante; con PubSubMemoria la
+entrega es un put_nowait en la cola de cada conexión abierta.
+
+Protocolo (JSON en ambos sentidos):
+    cliente -> {"tipo": "mensaje", "destinatario": 15, "contenido": "Hola"}
+    cliente -> {"tipo": "leido", "remitente": 15, "hasta": 812}
+    servidor -> {"tipo": "mensaje", "id": ..., "remitente": ..., "destinatario": ...,
+                 "contenido": ..., "fecha_envio": ..., "leido": false}
+    servidor -> {"tipo": "leido", "lector": 7, "remitente": 15, "hasta": 812}
+    servidor -> {"tipo": "error", "error": "..."}
+"""
+import asyncio
+import contextlib
+import json
+from http.cookies import SimpleCookie
+from importlib import import_module
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import aget_user
+
+from .conversaciones import marcar_leidos, registrar_mensaje
+from .models import Usuario
+from .pubsub import canal_usuario, obtener_pubsub
+
+MAX_CONTENIDO = 2000
+
+# Códigos de cierre (rango 4000-4999 reservado para la aplicación)
+CIERRE_NO_AUTENTICADO = 4401
+CIERRE_ORIGEN_INVALIDO = 4403
+
+
+class ErrorChat(Exception):
+    """Petición del cliente que no se puede atender; se responde con un frame de error."""
+
+
+def _cabeceras(scope):
+    return {nombre.decode('latin-1'): valor.decode('latin-1') for nombre, valor in scope.get('headers', [])}
+
+
+def _origen_valido(cabeceras):
+    """
+    Los navegadores no aplican CSRF ni CORS a los WebSocket: se exige que el
+    Origin sea el mismo host de la página, como haría el middleware de CSRF.
+    """
+    origen = cabeceras.get('origin')
+    if origen is None:
+        return True  # clientes que no son navegadores
+    return urlsplit(origen).netloc == cabeceras.get('host')
+
+
+async def _usuario_de_la_sesion(cabeceras):
+    """Usuario autenticado de la cookie de sesión, o None."""
+    cookie = SimpleCookie()
+    cookie.load(cabeceras.get('cookie', ''))
+    morsel = cookie.get(settings.SESSION_COOKIE_NAME)
+    if morsel is None:
+        return None
+    engine = import_module(settings.SESSION_ENGINE)
+    session = engine.SessionStore(morsel.value)
+    usuario = await aget_user(SimpleNamespace(session=session))
+    if not usuario.is_authenticated or not usuario.activo:
+        return None
+    return usuario
+
+
+def serializar_mensaje(mensaje):
+    return {
+        'tipo': 'mensaje',
+        'id': mensaje.id,
+        'remitente': mensaje.remitente_id,
+        'destinatario': mensaje.destinatario_id,
+        'contenido': mensaje.contenido,
+        'fecha_envio': mensaje.fecha_envio.isoformat(),
+        'leido': mensaje.leido,
+    }
+
+
+def _entero(datos, campo):
+    try:
+        return int(datos[campo])
+    except (KeyError, TypeError, ValueError):
+        raise ErrorChat(f'Falta el campo {campo}')
+
+
+async def _enviar_mensaje(usuario, datos):
+    destinatario_id = _entero(datos, 'destinatario')
+    contenido = str(datos.get('contenido', '')).strip()
+    if not contenido:
+        raise ErrorChat('El mensaje está vacío')
+    if len(contenido) > MAX_CONTENIDO:
+        raise ErrorChat(f'El mensaje supera los {MAX_CONTENIDO} caracteres')
+
+    destinatario = await (
+        Usuario.objects.filter(pk=destinatario_id, activo=True)
+        .only('id', 'rol', 'is_superuser').afirst()
+    )
+    if destinatario is None or destinatario.pk == usuario.pk:
+        raise ErrorChat('Destinatario no válido')
+    # El chat es entre la administración y los residentes, no entre vecinos
+    if not (usuario.es_administrador() or destinatario.es_administrador()):
+        raise ErrorChat('Solo puedes escribir a la administración')
+
+    mensaje = await sync_to_async(registrar_mensaje)(usuario, destinatario, contenido)
+    evento = serializar_mensaje(mensaje)
+    pubsub = obtener_pubsub()
+    # El remitente también lo recibe: confirma el envío y sincroniza sus otras pestañas
+    await pubsub.publicar(canal_usuario(destinatario.pk), evento)
+    await pubsub.publicar(canal_usuario(usuario.pk), evento)
+
+
+async def _marcar_leidos(usuario, datos):
+    """Marca como leídos los mensajes recibidos de un remitente hasta un id y avisa al remitente."""
+    remitente_id = _entero(datos, 'remitente')
+    hasta = _entero(datos, 'hasta')
+    marcados = await sync_to_async(marcar_leidos)(usuario, remitente_id, hasta)
+    if not marcados:
+        return
+    evento = {'tipo': 'leido', 'lector': usuario.pk, 'remitente': remitente_id, 'hasta': hasta}
+    pubsub = obtener_pubsub()
+    await pubsub.publicar(canal_usuario(remitente_id), evento)
+    await pubsub.publicar(canal_usuario(usuario.pk), evento)
+
+
+ACCIONES = {
+    'mensaje': _enviar_mensaje,
+    'leido': _marcar_leidos,
+}
+
+
+async def _reenviar(cola, send):
+    """Pasa al socket lo que llega al canal del usuario."""
+    while True:
+        evento = await cola.get()
+        await send({'type': 'websocket.send', 'text': json.dumps(evento)})
+
+
+async def _atender(usuario, texto, send):
+    try:
+        datos = json.loads(texto or '')
+        if not isinstance(datos, dict):
+            raise ValueError
+    except ValueError:
+        datos = {}
+    accion = ACCIONES.get(datos.get('tipo'))
+    try:
+        if accion is None:
+            raise ErrorChat('Tipo de mensaje desconocido')
+        await accion(usuario, datos)
+    except ErrorChat as e:
+        await send({'type': 'websocket.send', 'text': json.dumps({'tipo': 'error', 'error': str(e)})})
+
+
+async def chat_websocket(scope, receive, send):
+    """Aplicación ASGI de una conexión WebSocket del chat."""
+    evento = await receive()
+    if evento['type'] != 'websocket.connect':
+        return
+
+    cabeceras = _cabeceras(scope)
+    if not _origen_valido(cabeceras):
+        await send({'type': 'websocket.close', 'code': CIERRE_ORIGEN_INVALIDO})
+        return
+    usuario = await _usuario_de_la_sesion(cabeceras)
+    if usuario is None:
+        await send({'type': 'websocket.close', 'code': CIERRE_NO_AUTENTICADO})
+        return
+
+    pubsub = obtener_pubsub()
+    canal = canal_usuario(usuario.pk)
+    cola = await pubsub.suscribir(canal)
+    await send({'type': 'websocket.accept'})
+    reenvio = asyncio.create_task(_reenviar(cola, send))
+    try:
+        while True:
+            evento = await receive()
+            if evento['type'] == 'websocket.disconnect':
+                break
+            if evento['type'] == 'websocket.receive':
+                await _atender(usuario, evento.get('text'), send)
+    finally:
+        reenvio.cancel()
+        try:
+            # Esperar la tarea cancelada: que no quede pendiente al cerrar el loop
+            with contextlib.suppress(asyncio.CancelledError):
+                await reenvio
+        finally:
+            await pubsub.desuscribir(canal, cola)
@@ -0,0 +1,17 @@
+"""
+Hash PBKDF2 de contraseñas sin dependencias de Django.
+
+Corre en el pool de procesos de usuarios.tareas durante una importación de
+residentes (usuarios.importacion): cada hash cuesta cientos de milisegundos a
+propósito, y en lote se reparte entre los núcleos. Devuelve el mismo texto que
+PBKDF2PasswordHasher.encode(), así que check_password() lo reconoce; la sal y
+las iteraciones las decide el hasher configurado en el proceso web.
+"""
+import base64
+import hashlib
+
+
+def pbkdf2(contrasena, sal, iteraciones, digest='sha256'):
+    """'pbkdf2_sha256$<iteraciones>$<sal>$<hash en base64>'."""
+    derivada = hashlib.pbkdf2_hmac(digest, contrasena.encode(), sal.encode(), iteraciones)
+    return f'pbkdf2_{digest}${iteraciones}${sal}${base64.b64encode(derivada).decode("ascii").strip()}'
@@ -0,0 +1,104 @@
+"""
+Envío y lectura de mensajes manteniendo el resumen de cada conversación.
+
+Cada operación toca el mensaje y la fila de Conversacion del par en la misma
+transacción, con UPDATE ... SET campo = campo + n para que dos envíos
+simultáneos no pierdan un contador. La bandeja del chat lee solo Conversacion.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Greatest
+
+from .models import Conversacion, Mensaje
+
+
+def _par(usuario_id, otro_id):
+    """(usuario_a_id, usuario_b_id) del par: primero el menor id."""
+    return (usuario_id, otro_id) if usuario_id < otro_id else (otro_id, usuario_id)
+
+
+def _campo_no_leidos(usuario_id, otro_id):
+    """Contador de no leídos del lado de usuario_id."""
+    return 'no_leidos_a' if usuario_id < otro_id else 'no_leidos_b'
+
+
+@transaction.atomic
+def registrar_mensaje(remitente, destinatario, contenido):
+    """Crea el mensaje y lo anota en la conversación como último y no leído por el destinatario."""
+    mensaje = Mensaje.objects.create(remitente=remitente, destinatario=destinatario, contenido=contenido)
+
+    usuario_a_id, usuario_b_id = _par(remitente.pk, destinatario.pk)
+    no_leidos = _campo_no_leidos(destinatario.pk, remitente.pk)
+    cambios = {
+        'ultimo_mensaje': mensaje,
+        'ultima_actividad': mensaje.fecha_envio,
+        no_leidos: F(no_leidos) + 1,
+    }
+    conversacion = Conversacion.objects.filter(usuario_a_id=usuario_a_id, usuario_b_id=usuario_b_id)
+    if not conversacion.update(**cambios):
+        try:
+            with transaction.atomic():
+                Conversacion.objects.create(
+                    usuario_a_id=usuario_a_id, usuario_b_id=usuario_b_id, ultimo_mensaje=mensaje,
+                    ultima_actividad=mensaje.fecha_envio, **{no_leidos: 1}
+                )
+        except IntegrityError:
+            # El primer mensaje del otro lado creó la conversación al mismo tiempo
+            conversacion.update(**cambios)
+    return mensaje
+
+
+@transaction.atomic
+def marcar_leidos(lector, remitente_id, hasta):
+    """
+    Marca como leídos los mensajes de remitente_id al lector con id <= hasta y
+    descuenta los marcados de la conversación. Devuelve cuántos se marcaron.
+    """
+    marcados = Mensaje.objects.filter(
+        destinatario=lector, remitente_id=remitente_id, leido=False, id__lte=hasta
+    ).update(leido=True)
+    if marcados:
+        usuario_a_id, usuario_b_id = _par(lector.pk, remitente_id)
+        no_leidos = _campo_no_leidos(lector.pk, remitente_id)
+        Conversacion.objects.filter(usuario_a_id=usuario_a_id, usuario_b_id=usuario_b_id).update(
+            **{no_leidos: Greatest(F(no_leidos) - marcados, 0)}
+        )
+    return marcados
+
+
+@transaction.atomic
+def registrar_difusion(remitente, mensajes):
+    """
+    registrar_mensaje() por lotes para mensajes ya creados de un mismo remitente
+    a destinatarios distintos: un UPDATE por lado del par para las conversaciones
+    que ya existen y un INSERT para las nuevas.
+    """
+    por_destinatario = {mensaje.destinatario_id: mensaje for mensaje in mensajes}
+    existentes = {
+        usuario_b_id if usuario_a_id == remitente.pk else usuario_a_id
+        for usuario_a_id, usuario_b_id in
+        Conversacion.objects.entre(remitente, list(por_destinatario)).values_list('usuario_a_id', 'usuario_b_id')
+    }
+
+    for lado, otro in (('usuario_a', 'usuario_b'), ('usuario_b', 'usuario_a')):
+        # El último mensaje de cada par sale del índice de la conversación
+        ultimo = Mensaje.objects.filter(remitente=remitente, destinatario=OuterRef(otro)).order_by('-fecha_envio', '-id')
+        no_leidos = 'no_leidos_b' if lado == 'usuario_a' else 'no_leidos_a'
+        Conversacion.objects.filter(**{lado: remitente, f'{otro}__in': existentes}).update(**{
+            'ultimo_mensaje': Subquery(ultimo.values('id')[:1]),
+            'ultima_actividad': Subquery(ultimo.values('fecha_envio')[:1]),
+            no_leidos: F(no_leidos) + 1,
+        })
+
+    nuevas = []
+    for destinatario_id, mensaje in por_destinatario.items():
+        if destinatario_id in existentes:
+            continue
+        usuario_a_id, usuario_b_id = _par(remitente.pk, destinatario_id)
+        nuevas.append(Conversacion(
+            usuario_a_id=usuario_a_id, usuario_b_id=usuario_b_id, ultimo_mensaje=mensaje,
+            ultima_actividad=mensaje.fecha_envio, **{_campo_no_leidos(destinatario_id, remitente.pk): 1}
+        ))
+    # Si el residente escribió justo ahora y creó la conversación, queda la suya;
+    # recalcular_conversaciones corrige ese caso raro
+    Conversacion.objects.bulk_create(nuevas, ignore_conflicts=True)
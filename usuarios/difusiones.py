@@ -0,0 +1,74 @@
+"""
+Reparto de las difusiones de la administración (Difusion).
+
+Cada lote de destinatarios se reparte en una sola transacción: un bulk_create
+de sus mensajes, el resumen de sus conversaciones (usuarios.conversaciones) y
+el avance de la difusión. El cursor ultimo_destinatario avanza con el lote, así
+que retomar una difusión interrumpida (comando reanudar_difusiones) no duplica
+mensajes. Los residentes con el chat abierto la reciben en ese momento por la
+capa de pub/sub.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .chat import serializar_mensaje
+from .conversaciones import registrar_difusion
+from .models import Difusion, Mensaje
+from .pubsub import canal_usuario, obtener_pubsub
+
+LOTE = 1000
+
+
+def enviar_difusion(difusion_id):
+    """Reparte la difusión desde donde quedó. Pensada para usuarios.tareas.encolar()."""
+    difusion = Difusion.objects.select_related('remitente').get(pk=difusion_id)
+    if difusion.estado == 'completada':
+        return
+    if difusion.estado == 'pendiente':
+        difusion.total = difusion.destinatarios().count()
+        difusion.estado = 'enviando'
+        difusion.save(update_fields=['total', 'estado'])
+    elif difusion.estado == 'fallida':
+        Difusion.objects.filter(pk=difusion.pk).update(estado='enviando', error='')
+
+    destinatarios = difusion.destinatarios().order_by('id').values_list('id', flat=True)
+    try:
+        while True:
+            ids = list(destinatarios.filter(id__gt=difusion.ultimo_destinatario)[:LOTE])
+            if not ids:
+                break
+            _avisar(_repartir_lote(difusion, ids))
+    except Exception as e:
+        Difusion.objects.filter(pk=difusion.pk).update(estado='fallida', error=str(e))
+        raise
+
+    Difusion.objects.filter(pk=difusion.pk).update(estado='completada', fecha_fin=timezone.now())
+
+
+@transaction.atomic
+def _repartir_lote(difusion, ids):
+    # Bloquear la difusión evita que dos repartos simultáneos (el hilo y el
+    # comando, por ejemplo) envíen el mismo lote
+    cursor = Difusion.objects.select_for_update().values_list('ultimo_destinatario', flat=True).get(pk=difusion.pk)
+    ids = [destinatario_id for destinatario_id in ids if destinatario_id > cursor]
+    if not ids:
+        difusion.ultimo_destinatario = cursor
+        return []
+
+    mensajes = Mensaje.objects.bulk_create([
+        Mensaje(remitente=difusion.remitente, destinatario_id=destinatario_id, contenido=difusion.contenido)
+        for destinatario_id in ids
+    ])
+    registrar_difusion(difusion.remitente, mensajes)
+    Difusion.objects.filter(pk=difusion.pk).update(
+        ultimo_destinatario=ids[-1], enviados=F('enviados') + len(ids)
+    )
+    difusion.ultimo_destinatario = ids[-1]
+    return mensajes
+
+
+def _avisar(mensajes):
+    pubsub = obtener_pubsub()
+    for mensaje in mensajes:
+        pubsub.publicar_desde_hilo(canal_usuario(mensaje.destinatario_id), serializar_mensaje(mensaje))
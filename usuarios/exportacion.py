@@ -0,0 +1,312 @@
+"""
+Exportación de residentes, vehículos, mascotas y solicitudes a CSV o XLSX.
+
+Las filas salen de un .values_list(...).iterator(): en PostgreSQL es un cursor
+del lado del servidor y en SQLite se leen por bloques, así que la memoria no
+crece con la tabla. Se escriben a medida que llegan en una respuesta por
+partes; los encabezados se envían antes de consultar, para que el navegador
+empiece la descarga de inmediato. Los filtros (estado, tipo, fechas, casa) van
+en el WHERE.
+
+El XLSX se arma sin dependencias: es un ZIP con unas pocas partes XML fijas y
+una hoja con las celdas como texto en línea, comprimida mientras se escribe.
+"""
+import codecs
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime, time, timedelta
+from xml.sax.saxutils import escape
+
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+# Filas por lectura del cursor
+TAMANO_LOTE = 2000
+# Filas entre envíos del XLSX (el compresor retiene lo que no completa un bloque)
+FILAS_POR_ENVIO = 500
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# nombre -> modelo, columnas (encabezado, campo) y el campo de cada filtro
+EXPORTACIONES = {
+    'usuarios': {
+        'modelo': 'usuarios.Usuario',
+        'columnas': [
+            ('ID', 'id'), ('Usuario', 'username'), ('Nombre', 'first_name'), ('Apellido', 'last_name'),
+            ('Correo', 'email'), ('Teléfono', 'telefono'), ('Casa/Dpto', 'casa_departamento'),
+            ('Rol', 'rol'), ('Activo', 'activo'), ('Registro', 'fecha_registro'),
+        ],
+        'filtros': {'tipo': 'rol', 'estado': 'activo', 'fecha': 'fecha_registro', 'casa': 'casa_departamento'},
+    },
+    'vehiculos': {
+        'modelo': 'usuarios.Vehiculo',
+        'columnas': [
+            ('ID', 'id'), ('Placa', 'placa'), ('Marca', 'marca'), ('Modelo', 'modelo'), ('Color', 'color'),
+            ('Dueño', 'dueno'), ('Casa', 'numero_casa'), ('Registrado por', 'usuario__username'),
+            ('Registro', 'fecha_registro'),
+        ],
+        'filtros': {'fecha': 'fecha_registro', 'casa': 'numero_casa'},
+    },
+    'mascotas': {
+        'modelo': 'usuarios.Mascota',
+        'columnas': [
+            ('ID', 'id'), ('Nombre', 'nombre'), ('Tipo', 'tipo'), ('Dueño', 'dueno'), ('Casa', 'numero_casa'),
+            ('Descripción', 'descripcion'), ('Activa', 'activo'), ('Registrada por', 'usuario__username'),
+            ('Registro', 'fecha_registro'),
+        ],
+        'filtros': {'tipo': 'tipo', 'estado': 'activo', 'fecha': 'fecha_registro', 'casa': 'numero_casa'},
+    },
+    'solicitudes': {
+        'modelo': 'usuarios.Solicitud',
+        'columnas': [
+            ('ID', 'id'), ('Título', 'titulo'), ('Tipo', 'tipo'), ('Estado', 'estado'),
+            ('Residente', 'usuario__username'), ('Casa', 'usuario__casa_departamento'),
+            ('Descripción', 'descripcion'), ('Respuesta', 'respuesta_admin'), ('Reacciones', 'total_reacciones'),
+            ('Creada', 'fecha_creacion'), ('Actualizada', 'fecha_actualizacion'),
+        ],
+        'filtros': {'tipo': 'tipo', 'estado': 'estado', 'fecha': 'fecha_creacion', 'casa': 'usuario__casa_departamento'},
+    },
+}
+FILTROS = ('estado', 'tipo', 'desde', 'hasta', 'casa')
+# Para los modelos cuyo "estado" es el campo activo
+ACTIVO = {'activo': True, 'inactivo': False}
+
+# Caracteres de control que XML no admite
+_NO_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def nombre_de_modelo(modelo):
+    """Nombre de la exportación de modelo (para las acciones del admin), o None."""
+    for nombre, exportacion in EXPORTACIONES.items():
+        if apps.get_model(exportacion['modelo']) is modelo:
+            return nombre
+    return None
+
+
+def _campo(modelo, ruta):
+    """El campo al final de una ruta como 'usuario__casa_departamento'."""
+    *relaciones, nombre = ruta.split('__')
+    for relacion in relaciones:
+        modelo = modelo._meta.get_field(relacion).related_model
+    return modelo._meta.get_field(nombre)
+
+
+def _dia(texto, parametro):
+    try:
+        return date.fromisoformat(texto)
+    except ValueError:
+        raise ValueError(f'Fecha inválida en {parametro}: usa AAAA-MM-DD')
+
+
+def filtrar(nombre, queryset, parametros):
+    """
+    Aplica los filtros de parametros (un dict o un QueryDict) a queryset.
+    ValueError si un filtro no aplica a la exportación o su valor no es válido.
+    """
+    exportacion = EXPORTACIONES[nombre]
+    campos = exportacion['filtros']
+    condiciones = {}
+    for parametro in FILTROS:
+        valor = (parametros.get(parametro) or '').strip()
+        if not valor:
+            continue
+        clave = 'fecha' if parametro in ('desde', 'hasta') else parametro
+        if clave not in campos:
+            raise ValueError(f'El filtro {parametro} no aplica a {nombre}')
+        campo = campos[clave]
+        if parametro == 'desde':
+            dia = _dia(valor, parametro)
+            condiciones[f'{campo}__gte'] = timezone.make_aware(datetime.combine(dia, time.min))
+        elif parametro == 'hasta':
+            # Incluye todo el día: < inicio del siguiente, sin __date para usar el índice
+            dia = _dia(valor, parametro) + timedelta(days=1)
+            condiciones[f'{campo}__lt'] = timezone.make_aware(datetime.combine(dia, time.min))
+        elif parametro == 'casa':
+            condiciones[campo] = valor
+        elif campo == 'activo':
+            if valor not in ACTIVO:
+                raise ValueError(f'Estado inválido: {valor} (activo o inactivo)')
+            condiciones[campo] = ACTIVO[valor]
+        else:
+            opciones = dict(_campo(apps.get_model(exportacion['modelo']), campo).choices)
+            if valor not in opciones:
+                raise ValueError(f'{parametro.capitalize()} inválido: {valor}')
+            condiciones[campo] = valor
+    return queryset.filter(**condiciones)
+
+
+def filas(nombre, queryset):
+    """
+    (encabezados, generador de filas) de queryset, con los valores ya como
+    texto o número: los choices por su nombre, las fechas en la zona local.
+    """
+    exportacion = EXPORTACIONES[nombre]
+    modelo = apps.get_model(exportacion['modelo'])
+    encabezados = [encabezado for encabezado, _ in exportacion['columnas']]
+    rutas = [ruta for _, ruta in exportacion['columnas']]
+    opciones = [dict(_campo(modelo, ruta).choices or ()) for ruta in rutas]
+
+    def _valor(valor, nombres):
+        if valor is None:
+            return ''
+        if isinstance(valor, bool):
+            return 'Sí' if valor else 'No'
+        if isinstance(valor, datetime):
+            return timezone.localtime(valor).strftime('%Y-%m-%d %H:%M')
+        return nombres.get(valor, valor)
+
+    def _generar():
+        # Por id: el orden de la clave primaria no necesita ordenar la tabla
+        for fila in queryset.order_by('id').values_list(*rutas).iterator(chunk_size=TAMANO_LOTE):
+            yield [_valor(valor, nombres) for valor, nombres in zip(fila, opciones)]
+
+    return encabezados, _generar()
+
+
+class _Salida(io.RawIOBase):
+    """Archivo de solo escritura que acumula lo escrito hasta que se retira."""
+
+    def __init__(self):
+        self.partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        return len(datos)
+
+    def retirar(self):
+        datos = b''.join(self.partes)
+        self.partes.clear()
+        return datos
+
+
+def csv_por_partes(encabezados, filas):
+    """Bytes del CSV en UTF-8 con BOM (Excel reconoce así las tildes), un bloque por lote."""
+    salida = io.StringIO()
+    escritor = csv.writer(salida)
+    escritor.writerow(encabezados)
+    yield codecs.BOM_UTF8 + salida.getvalue().encode()
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) == TAMANO_LOTE:
+            yield _csv_lote(salida, escritor, lote)
+    if lote:
+        yield _csv_lote(salida, escritor, lote)
+
+
+def _csv_lote(salida, escritor, lote):
+    salida.seek(0)
+    salida.truncate()
+    escritor.writerows(lote)
+    lote.clear()
+    return salida.getvalue().encode()
+
+
+_TIPOS_CONTENIDO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_RELACIONES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_LIBRO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{hoja}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_RELACIONES_LIBRO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+_INICIO_HOJA = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_FIN_HOJA = '</sheetData></worksheet>'
+
+
+def _fila_xml(fila):
+    celdas = []
+    for valor in fila:
+        if isinstance(valor, (int, float)):
+            celdas.append(f'<c t="n"><v>{valor}</v></c>')
+        else:
+            texto = escape(_NO_XML.sub('', str(valor)))
+            celdas.append(f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>')
+    return f'<row>{"".join(celdas)}</row>'.encode()
+
+
+def xlsx_por_partes(encabezados, filas, hoja='Datos'):
+    """Bytes del libro XLSX (una hoja), enviados cada FILAS_POR_ENVIO filas."""
+    salida = _Salida()
+    # salida no admite seek: zipfile escribe los tamaños al final de cada parte
+    with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED) as libro:
+        libro.writestr('[Content_Types].xml', _TIPOS_CONTENIDO)
+        libro.writestr('_rels/.rels', _RELACIONES)
+        libro.writestr('xl/workbook.xml', _LIBRO.format(hoja=escape(hoja, {'"': '&quot;'})))
+        libro.writestr('xl/_rels/workbook.xml.rels', _RELACIONES_LIBRO)
+        with libro.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as hoja_xml:
+            hoja_xml.write(_INICIO_HOJA.encode() + _fila_xml(encabezados))
+            yield salida.retirar()
+            for numero, fila in enumerate(filas, 1):
+                hoja_xml.write(_fila_xml(fila))
+                if numero % FILAS_POR_ENVIO == 0:
+                    yield salida.retirar()
+            hoja_xml.write(_FIN_HOJA.encode())
+    yield salida.retirar()
+
+
+async def _asincrono(partes):
+    # Un paso del generador por vez en el hilo de la petición (misma conexión y cursor)
+    siguiente = sync_to_async(next)
+    while (parte := await siguiente(partes, None)) is not None:
+        yield parte
+
+
+def respuesta_exportacion(request, nombre, queryset, formato='csv'):
+    """
+    Descarga de queryset con las columnas de la exportación nombre. Bajo ASGI
+    el contenido va en un iterador asíncrono: con uno síncrono Django lo
+    juntaría entero en memoria antes de enviarlo.
+    """
+    encabezados, datos = filas(nombre, queryset)
+    if formato == 'xlsx':
+        partes = xlsx_por_partes(encabezados, datos, hoja=nombre.capitalize())
+    else:
+        partes = csv_por_partes(encabezados, datos)
+    if isinstance(request, ASGIRequest):
+        partes = _asincrono(partes)
+    respuesta = StreamingHttpResponse(partes, content_type=FORMATOS[formato])
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre}-{timezone.localdate():%Y-%m-%d}.{formato}"'
+    # nginx no debe juntar la descarga en su buffer antes de enviarla
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
@@ -25,6 +25,24 @@ class UsuarioCreationForm(UserCreationForm):
             'rol': forms.Select(attrs={'class': 'form-select'}),
         }
 
+class FilaImportacionForm(forms.ModelForm):
+    """
+    Una fila de la importación de residentes (usuarios.importacion): las
+    validaciones del modelo (teléfono, rol, formato del usuario y del correo)
+    sin las de unicidad, que se revisan para todo el archivo con una consulta.
+    """
+    class Meta:
+        model = Usuario
+        fields = ('username', 'email', 'first_name', 'last_name', 'casa_departamento', 'telefono', 'rol')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Un correo vacío chocaría con el de cualquier otro residente sin correo
+        self.fields['email'].required = True
+
+    def validate_unique(self):
+        pass
+
 class UsuarioChangeForm(forms.ModelForm):
     is_active = forms.ChoiceField(
         choices=[(True, 'Activo'), (False, 'Inactivo')],
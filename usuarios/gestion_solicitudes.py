@@ -0,0 +1,53 @@
+"""
+Gestión de solicitudes en lote: cambiar el estado, y dejar una misma respuesta,
+a muchas solicitudes de una vez (por ejemplo, cerrar las pendientes después de
+una asamblea).
+
+Todo va por conjuntos: una consulta para los ids, un solo UPDATE y una sola
+novedad para el dashboard, sin importar cuántas solicitudes sean. update() no
+dispara las señales de usuarios/signals.py, así que la caché se invalida aquí:
+el grupo 'solicitudes' (listas y contadores del administrador) y
+'solicitudes_lote', del que dependen las listas propias de cada residente, en
+lugar de cambiar una versión por autor.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .cache_dashboard import invalidar
+from .models import Solicitud
+from .novedades import publicar_novedad
+
+ESTADOS = dict(Solicitud.ESTADO_CHOICES)
+# Solicitudes por petición desde el dashboard
+MAX_LOTE = 1000
+# Con más, la novedad no lista los ids y el dashboard recarga sus listas
+MAX_IDS_NOVEDAD = 500
+
+
+def _invalidar():
+    invalidar('solicitudes')
+    invalidar('solicitudes_lote')
+
+
+def gestionar_en_lote(solicitudes, estado, respuesta=None):
+    """
+    Pone estado, y respuesta_admin si respuesta no es None, a las solicitudes
+    del queryset. Devuelve cuántas se actualizaron.
+    """
+    if estado not in ESTADOS:
+        raise ValueError(f'Estado inválido: {estado}')
+    cambios = {'estado': estado, 'fecha_actualizacion': timezone.now()}
+    if respuesta is not None:
+        cambios['respuesta_admin'] = respuesta
+
+    with transaction.atomic():
+        ids = list(solicitudes.order_by().values_list('id', flat=True)[:MAX_IDS_NOVEDAD + 1])
+        if not ids:
+            return 0
+        actualizadas = solicitudes.update(**cambios)
+        publicar_novedad(
+            'solicitudes', ids=ids if len(ids) <= MAX_IDS_NOVEDAD else None,
+            estado=estado, estado_display=ESTADOS[estado],
+        )
+        transaction.on_commit(_invalidar)
+    return actualizadas
@@ -0,0 +1,227 @@
+"""
+Procesamiento en segundo plano de las imágenes subidas.
+
+Las vistas y el admin guardan el archivo tal como llega y responden de
+inmediato. Las señales de usuarios/signals.py marcan el campo como 'pendiente'
+y, al guardarse el registro, agendan procesar_imagen() (usuarios.tareas). La
+tarea recodifica en el pool de procesos (usuarios.recodificacion: orientación
+EXIF, recorte, tamaño máximo y JPEG), reemplaza el original y deja el estado en
+'lista'. Las plantillas muestran la imagen solo cuando está lista.
+
+Junto con la imagen final se generan sus versiones reducidas en WebP y JPEG
+(recodificacion.ANCHOS_DERIVADAS) dentro de CARPETA_DERIVADAS, con nombres
+derivados del de la imagen; la etiqueta {% imagen_responsiva %} arma el srcset
+a partir de ellos sin consultar el almacenamiento. Cuando la imagen se
+reemplaza o el registro se borra, sus derivadas se eliminan.
+"""
+import json
+import logging
+import os
+import re
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+from .recodificacion import (
+    ANCHOS_DERIVADAS, FORMATOS_DERIVADAS, LADO_VISTA_PREVIA, abrir, comprobar_peso, derivadas, recodificar,
+)
+from .tareas import en_proceso, encolar
+
+logger = logging.getLogger(__name__)
+
+# Campos de imagen que se procesan; cada uno tiene al lado su estado_<campo>
+CAMPOS_IMAGEN = {
+    'usuarios.Usuario': ['foto_perfil'],
+    'usuarios.Mascota': ['foto'],
+    'usuarios.Publicacion': ['imagen'],
+}
+CARPETA_DERIVADAS = 'derivadas'
+
+
+def nombre_derivada(nombre, ancho, extension):
+    """Ruta en el almacenamiento de la versión de ancho px de la imagen nombre."""
+    return f'{CARPETA_DERIVADAS}/{os.path.splitext(nombre)[0]}_{ancho}w.{extension}'
+
+
+def origen_de_derivada(nombre):
+    """
+    Imagen de la que sale la derivada nombre, o None si no tiene la forma de
+    nombre_derivada(). Las imágenes procesadas siempre son .jpg.
+    """
+    coincidencia = re.fullmatch(rf'{CARPETA_DERIVADAS}/(.+)_\d+w\.\w+', nombre)
+    return f'{coincidencia[1]}.jpg' if coincidencia else None
+
+
+def srcset(archivo, extension):
+    """Valor del atributo srcset con las versiones de archivo en el formato extension."""
+    return ', '.join(
+        f'{archivo.storage.url(nombre_derivada(archivo.name, ancho, extension))} {ancho}w'
+        for ancho in ANCHOS_DERIVADAS
+    )
+
+
+def guardar_derivadas(storage, nombre, versiones):
+    """Escribe las versiones que devolvió recodificacion.derivadas(), reemplazando las que hubiera."""
+    for (ancho, extension), contenido in versiones.items():
+        destino = nombre_derivada(nombre, ancho, extension)
+        # El nombre tiene que ser exactamente este: save() le agregaría un sufijo
+        storage.delete(destino)
+        storage.save(destino, ContentFile(contenido))
+
+
+def eliminar_derivadas(etiqueta_modelo, campo, nombre):
+    """Tarea: borra las versiones reducidas de la imagen nombre."""
+    storage = apps.get_model(etiqueta_modelo)._meta.get_field(campo).storage
+    for ancho in ANCHOS_DERIVADAS:
+        for extension in FORMATOS_DERIVADAS:
+            storage.delete(nombre_derivada(nombre, ancho, extension))
+
+
+def validar_imagen(archivo):
+    """
+    Validador de los campos de imagen: rechaza al subirla una imagen que
+    recodificar() no aceptaría por peso, megapíxeles o formato. Solo lee la
+    cabecera; las imágenes ya guardadas no se revisan.
+    """
+    if getattr(archivo, '_committed', False):
+        return
+    try:
+        comprobar_peso(archivo.size)
+        archivo.seek(0)
+        abrir(archivo)
+    except ValueError as e:
+        raise ValidationError(str(e), code='imagen_invalida')
+    finally:
+        archivo.seek(0)
+
+
+def recorte_de_vista_previa(crop_data):
+    """Recorte enviado por el formulario (JSON con left, top, width y height), o None si no es válido."""
+    try:
+        datos = json.loads(crop_data)
+        return {
+            'left': int(datos.get('left', 0)),
+            'top': int(datos.get('top', 0)),
+            'width': int(datos.get('width', LADO_VISTA_PREVIA)),
+            'height': int(datos.get('height', LADO_VISTA_PREVIA)),
+        }
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def recortar_al_procesar(instancia, campo, recorte):
+    """Recorte que se aplicará cuando se procese la imagen recién asignada a campo."""
+    instancia._recortes_imagen = {**getattr(instancia, '_recortes_imagen', {}), campo: recorte}
+
+
+def recordar_cargadas(instancia):
+    """post_init: anota qué imagen tenía cada campo al cargarse, para notar luego si se quitó."""
+    cargadas = {}
+    for campo in CAMPOS_IMAGEN[instancia._meta.label]:
+        # Se lee __dict__ y no el atributo para no disparar la carga de campos diferidos
+        if campo in instancia.__dict__:
+            valor = instancia.__dict__[campo]
+            cargadas[campo] = getattr(valor, 'name', valor) or ''
+    instancia._imagenes_cargadas = cargadas
+
+
+def marcar_subidas(instancia, update_fields=None):
+    """
+    pre_save: marca como pendientes las imágenes recién subidas (todavía sin
+    escribir), o lanza ValidationError si exceden los límites, y anota las que
+    dejan de usarse, para borrar sus derivadas.
+    """
+    nuevas = []
+    cambiadas = []
+    cargadas = getattr(instancia, '_imagenes_cargadas', {})
+    for campo in CAMPOS_IMAGEN[instancia._meta.label]:
+        if update_fields is not None and campo not in update_fields:
+            continue
+        archivo = getattr(instancia, campo)
+        if archivo and not archivo._committed:
+            # Las vistas guardan sin full_clean(): el límite se aplica aquí también
+            validar_imagen(archivo)
+            setattr(instancia, f'estado_{campo}', 'pendiente')
+            nuevas.append(campo)
+            cambiadas.append(campo)
+        elif cargadas.get(campo) and cargadas[campo] != archivo.name:
+            cambiadas.append(campo)
+    instancia._imagenes_nuevas = nuevas
+
+    # La imagen anterior se lee de la base (una consulta, solo si algo cambió):
+    # lo anotado al cargar no sobrevive a refresh_from_db()
+    anteriores = {}
+    if cambiadas and instancia.pk is not None:
+        anteriores = type(instancia)._base_manager.filter(pk=instancia.pk).values(*cambiadas).first() or {}
+    instancia._imagenes_reemplazadas = [
+        (campo, nombre) for campo, nombre in anteriores.items()
+        if nombre and nombre != getattr(instancia, campo).name
+    ]
+
+
+def encolar_subidas(instancia):
+    """post_save: agenda el procesamiento de las imágenes que marcó marcar_subidas()."""
+    etiqueta = instancia._meta.label
+    recortes = getattr(instancia, '_recortes_imagen', {})
+    for campo in instancia.__dict__.pop('_imagenes_nuevas', []):
+        encolar(procesar_imagen, etiqueta, instancia.pk, campo, recortes.get(campo))
+    for campo, anterior in instancia.__dict__.pop('_imagenes_reemplazadas', []):
+        encolar(eliminar_derivadas, etiqueta, campo, anterior)
+    recordar_cargadas(instancia)
+
+
+def encolar_borrado(instancia):
+    """post_delete: agenda el borrado de las derivadas de las imágenes del registro."""
+    for campo in CAMPOS_IMAGEN[instancia._meta.label]:
+        valor = instancia.__dict__.get(campo)
+        if valor:
+            encolar(eliminar_derivadas, instancia._meta.label, campo, getattr(valor, 'name', valor))
+
+
+def procesar_imagen(etiqueta_modelo, pk, campo, recorte=None):
+    """Tarea: recodifica la imagen de campo y la deja lista. Pensada para usuarios.tareas.encolar()."""
+    modelo = apps.get_model(etiqueta_modelo)
+    estado = f'estado_{campo}'
+    instancia = modelo.objects.filter(pk=pk).first()
+    if instancia is None or not getattr(instancia, campo):
+        return
+    original = getattr(instancia, campo)
+    nombre_original = original.name
+
+    modelo.objects.filter(pk=pk, **{campo: nombre_original}).update(**{estado: 'procesando'})
+    try:
+        with original.open('rb') as archivo:
+            datos = archivo.read()
+        procesada = en_proceso(recodificar, datos, recorte)
+        versiones = en_proceso(derivadas, procesada)
+    except Exception:
+        logger.exception('No se pudo procesar %s de %s #%s', campo, etiqueta_modelo, pk)
+        _guardar_si_no_cambio(modelo, pk, campo, nombre_original, {estado: 'error'})
+        return
+
+    nombre = original.storage.save(f'{os.path.splitext(nombre_original)[0]}.jpg', ContentFile(procesada))
+    # Las derivadas se escriben antes de marcar la imagen como lista
+    guardar_derivadas(original.storage, nombre, versiones)
+    if _guardar_si_no_cambio(modelo, pk, campo, nombre_original, {campo: nombre, estado: 'lista'}):
+        original.storage.delete(nombre_original)
+    else:
+        original.storage.delete(nombre)
+        eliminar_derivadas(etiqueta_modelo, campo, nombre)
+
+
+def _guardar_si_no_cambio(modelo, pk, campo, nombre_original, cambios):
+    """
+    Aplica los cambios solo si el campo conserva la imagen que se procesó (nadie
+    subió otra mientras tanto). Se guarda con save() para que las señales
+    invaliden la caché del dashboard.
+    """
+    with transaction.atomic():
+        instancia = modelo.objects.select_for_update().filter(pk=pk).first()
+        if instancia is None or getattr(instancia, campo).name != nombre_original:
+            return False
+        for nombre, valor in cambios.items():
+            setattr(instancia, nombre, valor)
+        instancia.save(update_fields=list(cambios))
+    return True
@@ -0,0 +1,197 @@
+"""
+Importación de residentes desde un CSV (una fila por residente), para dar de
+alta un bloque entero sin llenar crear_usuario una vez por persona.
+
+Columnas: username, email, first_name, last_name, telefono y, opcionales,
+casa_departamento, rol y password; también se aceptan los encabezados de la
+exportación de usuarios (usuarios.exportacion), así que un archivo exportado se
+puede volver a importar. Sin password la cuenta queda sin contraseña utilizable
+hasta que la administración le asigne una.
+
+Cada fila se valida como en el formulario (FilaImportacionForm y los
+validadores de contraseña); la unicidad del usuario y del correo se revisa
+para todo el archivo con una consulta por bloque. Las filas válidas se insertan
+con bulk_create en lotes y las demás vuelven en el informe con su número de
+línea. Los hashes, lo caro (PBKDF2 cuesta cientos de milisegundos a propósito),
+se reparten entre los procesos del pool de usuarios.tareas.
+"""
+import csv
+import io
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, get_hasher, make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .cache_dashboard import invalidar
+from .contrasenas import pbkdf2
+from .exportacion import EXPORTACIONES
+from .forms import FilaImportacionForm
+from .models import Usuario
+from .tareas import en_procesos
+
+COLUMNAS_OBLIGATORIAS = ('username', 'email', 'first_name', 'last_name', 'telefono')
+COLUMNAS_OPCIONALES = ('casa_departamento', 'rol', 'password')
+# Encabezados de la exportación de usuarios -> campo
+ALIAS = {
+    encabezado: campo for encabezado, campo in EXPORTACIONES['usuarios']['columnas']
+    if campo in COLUMNAS_OBLIGATORIAS + COLUMNAS_OPCIONALES
+} | {'Contraseña': 'password'}
+ROLES = {nombre.lower(): rol for rol, nombre in Usuario.ROLES}
+
+TAMANO_LOTE = 500
+# Valores por consulta IN al revisar duplicados
+TAMANO_BLOQUE_UNICOS = 500
+MAX_FILAS = 20_000
+
+
+class ArchivoInvalido(ValueError):
+    """El CSV no se puede leer o le faltan columnas; no se importa nada."""
+
+
+def leer_csv(contenido):
+    """[(línea, fila)] del CSV en bytes o texto, con las columnas ya como campos."""
+    if isinstance(contenido, bytes):
+        try:
+            contenido = contenido.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise ArchivoInvalido('El archivo debe estar en UTF-8')
+    lector = csv.DictReader(io.StringIO(contenido))
+    columnas = [ALIAS.get(columna.strip(), columna.strip()) for columna in lector.fieldnames or []]
+    faltan = [columna for columna in COLUMNAS_OBLIGATORIAS if columna not in columnas]
+    if faltan:
+        raise ArchivoInvalido(f'Faltan columnas: {", ".join(faltan)}')
+    lector.fieldnames = columnas
+
+    filas = []
+    for fila in lector:
+        if len(filas) == MAX_FILAS:
+            raise ArchivoInvalido(f'El archivo supera las {MAX_FILAS} filas')
+        if not any((valor or '').strip() for valor in fila.values() if isinstance(valor, str)):
+            continue
+        # La línea del lector cuenta el encabezado y los saltos dentro de comillas
+        filas.append((lector.line_num, {
+            campo: (fila.get(campo) or '').strip() for campo in COLUMNAS_OBLIGATORIAS + COLUMNAS_OPCIONALES
+        }))
+    return filas
+
+
+def _validar_fila(fila):
+    """(Usuario sin guardar, contraseña o None, [errores])."""
+    datos = {**fila, 'rol': ROLES.get(fila['rol'].lower(), fila['rol'].lower()) or 'vecino'}
+    form = FilaImportacionForm(datos)
+    errores = [
+        f'{campo}: {mensaje}' if campo != '__all__' else mensaje
+        for campo, mensajes in form.errors.items() for mensaje in mensajes
+    ]
+    usuario = form.instance
+    contrasena = fila['password'] or None
+    if contrasena:
+        try:
+            validate_password(contrasena, user=usuario)
+        except ValidationError as e:
+            errores.extend(f'password: {mensaje}' for mensaje in e.messages)
+    return usuario, contrasena, errores
+
+
+def _existentes(campo, valores):
+    valores = list(valores)
+    existentes = set()
+    for inicio in range(0, len(valores), TAMANO_BLOQUE_UNICOS):
+        bloque = valores[inicio:inicio + TAMANO_BLOQUE_UNICOS]
+        existentes.update(Usuario.objects.filter(**{f'{campo}__in': bloque}).values_list(campo, flat=True))
+    return existentes
+
+
+def validar(filas):
+    """
+    ([(línea, usuario, contraseña)] válidos, [{'linea', 'errores'}]) de las
+    filas de leer_csv(). Ninguna consulta por fila.
+    """
+    revisadas = []
+    for linea, fila in filas:
+        usuario, contrasena, errores = _validar_fila(fila)
+        revisadas.append((linea, usuario, contrasena, errores))
+
+    # Unicidad contra la base y dentro del mismo archivo
+    for campo in ('username', 'email'):
+        existentes = _existentes(campo, {getattr(usuario, campo) for _, usuario, _, _ in revisadas} - {''})
+        vistos = {}
+        for linea, usuario, _, errores in revisadas:
+            valor = getattr(usuario, campo)
+            if not valor or any(error.startswith(f'{campo}:') for error in errores):
+                continue
+            if valor in existentes:
+                errores.append(f'{campo}: {valor} ya está registrado')
+            elif valor in vistos:
+                errores.append(f'{campo}: {valor} se repite en la línea {vistos[valor]}')
+            else:
+                vistos[valor] = linea
+
+    validas = [(linea, usuario, contrasena) for linea, usuario, contrasena, errores in revisadas if not errores]
+    informe = [{'linea': linea, 'errores': errores} for linea, _, _, errores in revisadas if errores]
+    return validas, informe
+
+
+def hashear(contrasenas):
+    """
+    Hashes para guardar en Usuario.password, en el mismo orden. None da una
+    contraseña no utilizable. Con el hasher PBKDF2 (el de Django por omisión)
+    se calculan en el pool de procesos; con cualquier otro, aquí.
+    """
+    hasher = get_hasher()
+    por_hashear = [contrasena for contrasena in contrasenas if contrasena]
+    if isinstance(hasher, PBKDF2PasswordHasher):
+        digest = hasher.digest().name
+        hashes = en_procesos(pbkdf2, [
+            (contrasena, hasher.salt(), hasher.iterations, digest) for contrasena in por_hashear
+        ])
+    else:
+        hashes = [make_password(contrasena) for contrasena in por_hashear]
+    hashes = iter(hashes)
+    return [next(hashes) if contrasena else make_password(None) for contrasena in contrasenas]
+
+
+def _insertar(lote):
+    """Inserta un lote de (línea, usuario). Devuelve los errores de las filas que no entraron."""
+    try:
+        with transaction.atomic():
+            Usuario.objects.bulk_create([usuario for _, usuario in lote])
+        return []
+    except IntegrityError:
+        pass
+    # Otro alta ocupó un usuario o correo después de validar: se busca cuál, fila por fila
+    errores = []
+    for linea, usuario in lote:
+        try:
+            with transaction.atomic():
+                Usuario.objects.bulk_create([usuario])
+        except IntegrityError:
+            errores.append({'linea': linea, 'errores': ['El usuario o el correo ya está registrado']})
+    return errores
+
+
+def importar(contenido, solo_validar=False):
+    """
+    Importa los residentes del CSV. Devuelve {'creados', 'validos', 'errores'},
+    con errores como [{'linea', 'errores': [...]}] ordenado por línea. Con
+    solo_validar no guarda ni calcula hashes. ArchivoInvalido si el archivo
+    entero no sirve.
+    """
+    validas, errores = validar(leer_csv(contenido))
+    if solo_validar:
+        return {'creados': 0, 'validos': len(validas), 'errores': errores}
+
+    for (_, usuario, _), encriptada in zip(validas, hashear([contrasena for _, _, contrasena in validas])):
+        usuario.password = encriptada
+
+    creados = 0
+    for inicio in range(0, len(validas), TAMANO_LOTE):
+        lote = [(linea, usuario) for linea, usuario, _ in validas[inicio:inicio + TAMANO_LOTE]]
+        fallidas = _insertar(lote)
+        creados += len(lote) - len(fallidas)
+        errores.extend(fallidas)
+    if creados:
+        # bulk_create no envía post_save: la tarjeta de vecinos se invalida aquí
+        invalidar('vecinos')
+    return {'creados': creados, 'validos': len(validas), 'errores': sorted(errores, key=lambda error: error['linea'])}
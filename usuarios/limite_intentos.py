@@ -0,0 +1,79 @@
+"""
+Límite de intentos fallidos de login por usuario y por IP.
+
+Cada clave (el usuario escrito o la IP) cuenta sus fallos en ventanas fijas de
+LOGIN_VENTANA_SEGUNDOS guardadas en la caché de Django, que comparten todos los
+workers. La ventana es deslizante por aproximación: los fallos de la ventana
+anterior pesan según lo que queda de ella, así que no hay un corte en el que el
+contador vuelve a cero de golpe.
+
+Un intento bloqueado se rechaza antes de buscar al usuario y de calcular el
+hash: un ataque de fuerza bruta deja de gastar CPU en PBKDF2 y los residentes
+que entran en ese momento no esperan detrás de él. Los contadores se leen con
+un solo get_many y se escriben solo al fallar; con peticiones simultáneas se
+puede perder algún incremento, que se compensa en los intentos siguientes.
+"""
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def ip_de(request):
+    return request.META.get(settings.LOGIN_IP_CABECERA or 'REMOTE_ADDR') or request.META.get('REMOTE_ADDR', '')
+
+
+def _clave(tipo, valor, ventana):
+    # Cualquier texto del formulario, con longitud y caracteres válidos para memcached
+    resumen = hashlib.sha256(valor.encode()).hexdigest()[:32]
+    return f'login:{tipo}:{resumen}:{ventana}'
+
+
+def _espera(anterior, actual, maximo, transcurrido, ventana):
+    """Segundos hasta que anterior * (1 - fracción) + actual baje de maximo sin nuevos fallos."""
+    if actual >= maximo:
+        # Hace falta pasar a la siguiente ventana y que actual pierda peso en ella
+        return (ventana - transcurrido) + ventana * (1 - maximo / actual)
+    return ventana * (1 - (maximo - actual) / anterior) - transcurrido
+
+
+class Intentos:
+    """Fallos recientes de un usuario y de la IP de la petición."""
+
+    def __init__(self, request, username):
+        self.ventana = settings.LOGIN_VENTANA_SEGUNDOS
+        ahora = time.time()
+        numero = int(ahora // self.ventana)
+        self.transcurrido = ahora - numero * self.ventana
+        self.limites = {
+            'usuario': (username.strip().lower(), settings.LOGIN_MAX_FALLOS_USUARIO),
+            'ip': (ip_de(request), settings.LOGIN_MAX_FALLOS_IP),
+        }
+        self.claves = {
+            tipo: (_clave(tipo, valor, numero - 1), _clave(tipo, valor, numero))
+            for tipo, (valor, _) in self.limites.items()
+        }
+        self.conteos = cache.get_many([clave for par in self.claves.values() for clave in par])
+
+    @property
+    def espera(self):
+        """Segundos que faltan para poder intentar de nuevo; 0 si no hay bloqueo."""
+        fraccion = self.transcurrido / self.ventana
+        segundos = 0
+        for tipo, (_, maximo) in self.limites.items():
+            anterior, actual = (self.conteos.get(clave, 0) for clave in self.claves[tipo])
+            if anterior * (1 - fraccion) + actual >= maximo:
+                segundos = max(segundos, 1, _espera(anterior, actual, maximo, self.transcurrido, self.ventana))
+        return math.ceil(segundos)
+
+    def fallo(self):
+        # Dos ventanas: la actual sigue contando como anterior durante la siguiente
+        cache.set_many({
+            actual: self.conteos.get(actual, 0) + 1 for _, actual in self.claves.values()
+        }, 2 * self.ventana)
+
+    def exito(self):
+        """Quien entra con su contraseña deja de arrastrar los fallos de su usuario."""
+        cache.delete_many(self.claves['usuario'])
@@ -0,0 +1,39 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from usuarios.exportacion import EXPORTACIONES, FILTROS, FORMATOS, csv_por_partes, filas, filtrar, xlsx_por_partes
+
+
+class Command(BaseCommand):
+    help = 'Exporta usuarios, vehiculos, mascotas o solicitudes a CSV o XLSX, fila por fila (sin cargar la tabla en memoria).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('nombre', choices=sorted(EXPORTACIONES))
+        parser.add_argument('--formato', choices=sorted(FORMATOS), default='csv')
+        parser.add_argument('--salida', help='Archivo de destino. Sin él, el CSV sale por la salida estándar.')
+        for filtro in FILTROS:
+            parser.add_argument(f'--{filtro}', help='Fecha AAAA-MM-DD.' if filtro in ('desde', 'hasta') else None)
+
+    def handle(self, *args, nombre, formato, salida, **options):
+        if formato == 'xlsx' and not salida:
+            raise CommandError('El XLSX necesita --salida.')
+        modelo = apps.get_model(EXPORTACIONES[nombre]['modelo'])
+        try:
+            registros = filtrar(nombre, modelo.objects.all(), options)
+        except ValueError as e:
+            raise CommandError(e)
+
+        encabezados, datos = filas(nombre, registros)
+        if formato == 'xlsx':
+            partes = xlsx_por_partes(encabezados, datos, hoja=nombre.capitalize())
+        else:
+            partes = csv_por_partes(encabezados, datos)
+        if not salida:
+            for parte in partes:
+                # Sin el BOM, que solo le sirve a Excel
+                self.stdout.write(parte.decode('utf-8-sig'), ending='')
+            return
+        with open(salida, 'wb') as archivo:
+            for parte in partes:
+                archivo.write(parte)
+        self.stdout.write(self.style.SUCCESS(f'Exportación guardada en {salida}.'))
@@ -0,0 +1,315 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from usuarios.cache_dashboard import invalidar
+from usuarios.models import (
+    Evento, Solicitud, Usuario, Mascota, Publicacion, Vehiculo, ReaccionSolicitud, Mensaje,
+)
+from usuarios.placas import normalizar_placa
+
+NOMBRES = [
+    'María', 'José', 'Ana', 'Luis', 'Carmen', 'Carlos', 'Rosa', 'Jorge', 'Gabriela', 'Diego',
+    'Fernanda', 'Andrés', 'Paola', 'Santiago', 'Verónica', 'Daniel', 'Camila', 'Mateo', 'Lucía', 'Javier',
+]
+APELLIDOS = [
+    'Pérez', 'González', 'Rodríguez', 'Sánchez', 'Zambrano', 'Vera', 'Mendoza', 'Torres', 'Andrade',
+    'Guerrero', 'Moreira', 'Castillo', 'Paredes', 'Salazar', 'Cevallos', 'Jaramillo', 'Morales', 'Ortiz',
+]
+TITULOS_SOLICITUD = [
+    'Fuga de agua en el pasaje', 'Luminaria dañada', 'Ruido en horas de la noche', 'Permiso para mudanza',
+    'Poda de árboles', 'Basura fuera de horario', 'Mascota sin correa', 'Arreglo de la garita',
+]
+NOMBRES_MASCOTA = ['Firulais', 'Luna', 'Rocky', 'Michi', 'Max', 'Canela', 'Toby', 'Nala', 'Simba', 'Pelusa']
+VEHICULOS = [
+    ('Chevrolet', 'Aveo'), ('Chevrolet', 'Sail'), ('Kia', 'Rio'), ('Kia', 'Sportage'), ('Hyundai', 'Accent'),
+    ('Toyota', 'Hilux'), ('Toyota', 'Fortuner'), ('Suzuki', 'Vitara'), ('Great Wall', 'Wingle'),
+]
+COLORES = ['Blanco', 'Gris', 'Negro', 'Rojo', 'Plateado', 'Azul']
+# Primera letra de las placas ecuatorianas según la provincia
+PROVINCIAS = 'ABCEGHIJKLMNOPQRSTUVWXYZ'
+
+# Distribución de estados de las solicitudes (la mayoría siguen abiertas)
+ESTADOS = [('pendiente', 40), ('en_proceso', 20), ('aprobada', 30), ('rechazada', 10)]
+
+
+def _lotes(objetos, tamano):
+    """Parte un generador en listas de a lo sumo tamano elementos."""
+    objetos = iter(objetos)
+    while bloque := list(islice(objetos, tamano)):
+        yield bloque
+
+
+def _repartir(total, pesos, cupo):
+    """
+    Reparte exactamente total unidades en proporción a pesos, sin dar más de
+    cupo a ninguna posición: parte entera de cada cuota y lo que sobra a los
+    mayores restos. Las posiciones que llegan al cupo salen del reparto.
+    """
+    cantidades = [0] * len(pesos)
+    abiertas = list(range(len(pesos)))
+    while total:
+        suma = sum(pesos[i] for i in abiertas)
+        cuotas = {i: total * pesos[i] / suma if suma else total / len(abiertas) for i in abiertas}
+        llenas = [i for i in abiertas if cuotas[i] >= cupo]
+        if llenas:
+            for i in llenas:
+                cantidades[i] = cupo
+            total -= cupo * len(llenas)
+            abiertas = [i for i in abiertas if cuotas[i] < cupo]
+            continue
+        for i in abiertas:
+            cantidades[i] = int(cuotas[i])
+        sobrante = total - sum(cantidades[i] for i in abiertas)
+        for i in sorted(abiertas, key=lambda i: cuotas[i] - int(cuotas[i]), reverse=True)[:sobrante]:
+            cantidades[i] += 1
+        total = 0
+    return cantidades
+
+
+@contextmanager
+def _fechas_manuales(*campos):
+    """auto_now_add pisaría las fechas generadas; se desactiva mientras se inserta."""
+    for campo in campos:
+        campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo in campos:
+            campo.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera un conjunto sintético completo (usuarios, eventos, solicitudes con reacciones, '
+        'mascotas, vehículos, publicaciones y mensajes) para pruebas de carga. '
+        'Con la misma semilla produce siempre los mismos datos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--semilla', type=int, default=2026, help='Semilla del generador aleatorio')
+        parser.add_argument('--prefijo', default='demo', help='Prefijo de los username generados')
+        parser.add_argument('--clave', default='selva2026', help='Contraseña común de los usuarios generados')
+        parser.add_argument('--unidades', type=int, default=300, help='Casas/departamentos del conjunto')
+        parser.add_argument('--usuarios', type=int, default=1000)
+        parser.add_argument('--administradores', type=int, default=2)
+        parser.add_argument('--eventos', type=int, default=150)
+        parser.add_argument('--solicitudes', type=int, default=10000)
+        parser.add_argument('--reacciones', type=int, default=30000, help='Reacciones en total')
+        parser.add_argument('--mascotas', type=int, default=400)
+        parser.add_argument('--vehiculos', type=int, default=600)
+        parser.add_argument('--publicaciones', type=int, default=200)
+        parser.add_argument('--mensajes', type=int, default=5000)
+        parser.add_argument('--dias', type=int, default=365, help='Antigüedad máxima de los registros')
+        parser.add_argument('--lote', type=int, default=2000, help='Filas por INSERT')
+
+    def handle(self, *args, **options):
+        self.azar = random.Random(options['semilla'])
+        self.lote = options['lote']
+        self.ahora = timezone.now()
+        self.dias = options['dias']
+        prefijo = options['prefijo']
+
+        if options['usuarios'] < 1 or options['administradores'] < 1 or options['unidades'] < 1:
+            raise CommandError('Se necesita al menos una unidad, un usuario y un administrador.')
+        if options['reacciones'] > options['solicitudes'] * options['usuarios']:
+            raise CommandError('Cada vecino reacciona a lo sumo una vez por solicitud: --reacciones no cabe.')
+        if Usuario.objects.filter(username__startswith=prefijo).exists():
+            raise CommandError(f'Ya existen usuarios con el prefijo "{prefijo}". Use otro --prefijo.')
+
+        campos_fecha = [
+            Usuario._meta.get_field('fecha_registro'),
+            Solicitud._meta.get_field('fecha_creacion'),
+            ReaccionSolicitud._meta.get_field('fecha_creacion'),
+            Mascota._meta.get_field('fecha_registro'),
+            Vehiculo._meta.get_field('fecha_registro'),
+            Publicacion._meta.get_field('fecha_publicacion'),
+            Mensaje._meta.get_field('fecha_envio'),
+        ]
+        inicio = time.perf_counter()
+        with transaction.atomic(), _fechas_manuales(*campos_fecha):
+            admins, vecinos = self._usuarios(prefijo, options)
+            self._eventos(admins, vecinos, options['eventos'])
+            self._solicitudes(vecinos, options['solicitudes'], options['reacciones'])
+            self._mascotas(vecinos, options['mascotas'])
+            self._vehiculos(vecinos, options['vehiculos'])
+            self._publicaciones(admins, options['publicaciones'])
+            self._mensajes(admins, vecinos, options['mensajes'])
+
+        # bulk_create no dispara señales: invalidar la caché del dashboard a mano
+        for grupo in ('eventos', 'solicitudes', 'mascotas', 'vehiculos', 'publicaciones', 'vecinos'):
+            invalidar(grupo)
+        # Tampoco indexa para la búsqueda de texto completo
+        call_command('reindexar_busqueda', stdout=self.stdout)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Datos generados en {time.perf_counter() - inicio:.1f} s. '
+            f'Usuarios "{prefijo}0"... con contraseña "{options["clave"]}".'
+        ))
+
+    def _fecha(self):
+        """Fecha al azar dentro de la ventana, con más registros recientes que antiguos."""
+        dias = min(self.azar.expovariate(3 / self.dias), self.dias)
+        return self.ahora - timedelta(days=dias, seconds=self.azar.randrange(86400))
+
+    def _insertar(self, modelo, objetos):
+        """Inserta por lotes sin armar toda la lista en memoria; devuelve los ids."""
+        ids = []
+        for bloque in _lotes(objetos, self.lote):
+            ids += [objeto.pk for objeto in modelo.objects.bulk_create(bloque)]
+        self.stdout.write(f'  {modelo._meta.verbose_name_plural}: {len(ids)}')
+        return ids
+
+    def _usuarios(self, prefijo, options):
+        # Un solo hash para todos: hashear 100k contraseñas tomaría horas
+        clave = make_password(options['clave'])
+        unidades = options['unidades']
+        total = options['usuarios'] + options['administradores']
+        casas = []
+
+        def generar():
+            for i in range(total):
+                es_admin = i < options['administradores']
+                # Cada unidad tiene al menos un residente; el resto se reparte al azar
+                unidad = i % unidades if i < unidades else self.azar.randrange(unidades)
+                nombre, apellido = self.azar.choice(NOMBRES), self.azar.choice(APELLIDOS)
+                casas.append(f'Casa {unidad + 1}')
+                yield Usuario(
+                    username=f'{prefijo}{i}', email=f'{prefijo}{i}@selva.test', password=clave,
+                    first_name=nombre, last_name=f'{apellido} {self.azar.choice(APELLIDOS)}',
+                    telefono=f'09{self.azar.randrange(10 ** 8):08d}',
+                    casa_departamento=casas[-1], rol='admin' if es_admin else 'vecino',
+                    is_staff=es_admin, activo=es_admin or self.azar.random() < 0.97,
+                    fecha_registro=self._fecha(),
+                )
+
+        ids = self._insertar(Usuario, generar())
+        # Mascotas y vehículos se registran en la casa de su dueño
+        self.casas = dict(zip(ids, casas))
+        return ids[:options['administradores']], ids[options['administradores']:]
+
+    def _eventos(self, admins, vecinos, cantidad):
+        categorias = [clave for clave, _ in Evento.CATEGORIAS]
+
+        def generar():
+            for i in range(cantidad):
+                # Dos de cada tres eventos son de la administración (globales)
+                es_global = self.azar.random() < 2 / 3
+                inicio = self.ahora + timedelta(days=self.azar.randint(-90, 90), hours=self.azar.randint(7, 19))
+                # Algunas mingas duran varios días
+                duracion = timedelta(days=self.azar.choice([0, 0, 0, 1, 2]), hours=self.azar.randint(1, 4))
+                yield Evento(
+                    usuario_id=self.azar.choice(admins if es_global else vecinos), es_global=es_global,
+                    titulo=f'Evento {i + 1}', descripcion='Actividad del conjunto',
+                    fecha_inicio=inicio, fecha_fin=inicio + duracion,
+                    categoria=self.azar.choice(categorias),
+                )
+
+        self._insertar(Evento, generar())
+
+    def _solicitudes(self, vecinos, cantidad, reacciones):
+        tipos = [clave for clave, _ in Solicitud.TIPO_CHOICES]
+        estados, pesos = zip(*ESTADOS)
+        # Pocos vecinos escriben muchas solicitudes y la mayoría escribe pocas
+        actividad = [self.azar.paretovariate(1.2) for _ in vecinos]
+
+        def generar():
+            autores = self.azar.choices(vecinos, weights=actividad, k=cantidad)
+            for autor in autores:
+                yield Solicitud(
+                    usuario_id=autor, tipo=self.azar.choice(tipos), estado=self.azar.choices(estados, pesos)[0],
+                    titulo=self.azar.choice(TITULOS_SOLICITUD), descripcion='Solicitud generada para pruebas de carga.',
+                    fecha_creacion=self._fecha(),
+                )
+
+        solicitudes = self._insertar(Solicitud, generar())
+        if not solicitudes:
+            return
+
+        # Popularidad con cola larga, repartiendo exactamente el total pedido
+        popularidad = [self.azar.paretovariate(2.0) - 1 for _ in solicitudes]
+        cantidades = _repartir(reacciones, popularidad, len(vecinos))
+
+        def generar_reacciones():
+            for solicitud_id, cantidad_reacciones in zip(solicitudes, cantidades):
+                for usuario_id in self.azar.sample(vecinos, cantidad_reacciones):
+                    yield ReaccionSolicitud(usuario_id=usuario_id, solicitud_id=solicitud_id, fecha_creacion=self._fecha())
+
+        self._insertar(ReaccionSolicitud, generar_reacciones())
+        call_command('recalcular_reacciones', stdout=self.stdout)
+
+    def _mascotas(self, vecinos, cantidad):
+        tipos, pesos = ['perro', 'gato', 'pajaro', 'conejo', 'hamster', 'otro'], [55, 30, 5, 4, 3, 3]
+
+        def generar():
+            for dueno in self.azar.choices(vecinos, k=cantidad):
+                yield Mascota(
+                    usuario_id=dueno, numero_casa=self.casas[dueno], nombre=self.azar.choice(NOMBRES_MASCOTA),
+                    dueno=self.azar.choice(NOMBRES), tipo=self.azar.choices(tipos, pesos)[0],
+                    activo=self.azar.random() < 0.95, fecha_registro=self._fecha(),
+                )
+
+        self._insertar(Mascota, generar())
+
+    def _vehiculos(self, vecinos, cantidad):
+        # Índices distintos del espacio de placas (LLL-NNNN) -> placas únicas sin reintentos
+        espacio = len(PROVINCIAS) * 26 * 26 * 10000
+        if cantidad > espacio:
+            raise CommandError('Se pidieron más vehículos que placas posibles.')
+        existentes = set(Vehiculo.objects.values_list('placa', flat=True))
+
+        def placa(indice):
+            indice, numero = divmod(indice, 10000)
+            indice, tercera = divmod(indice, 26)
+            provincia, segunda = divmod(indice, 26)
+            return f'{PROVINCIAS[provincia]}{chr(65 + segunda)}{chr(65 + tercera)}-{numero:04d}'
+
+        def generar():
+            placas = (placa(indice) for indice in self.azar.sample(range(espacio), cantidad + len(existentes)))
+            placas = (p for p in placas if p not in existentes)
+            for dueno, placa_nueva in zip(self.azar.choices(vecinos, k=cantidad), placas):
+                marca, modelo = self.azar.choice(VEHICULOS)
+                yield Vehiculo(
+                    usuario_id=dueno, numero_casa=self.casas[dueno], dueno=self.azar.choice(NOMBRES),
+                    placa=placa_nueva, placa_normalizada=normalizar_placa(placa_nueva),
+                    marca=marca, modelo=modelo, color=self.azar.choice(COLORES),
+                    fecha_registro=self._fecha(),
+                )
+
+        self._insertar(Vehiculo, generar())
+
+    def _publicaciones(self, admins, cantidad):
+        tipos = [clave for clave, _ in Publicacion.TIPO_CHOICES]
+
+        def generar():
+            for i in range(cantidad):
+                yield Publicacion(
+                    autor_id=self.azar.choice(admins), titulo=f'Comunicado {i + 1}',
+                    contenido='Información para los residentes del conjunto.', tipo=self.azar.choice(tipos),
+                    fecha_publicacion=self._fecha(),
+                )
+
+        self._insertar(Publicacion, generar())
+
+    def _mensajes(self, admins, vecinos, cantidad):
+        def generar():
+            for _ in range(cantidad):
+                # El chat es entre la administración y los residentes, en ambos sentidos
+                admin, vecino = self.azar.choice(admins), self.azar.choice(vecinos)
+                remitente, destinatario = (vecino, admin) if self.azar.random() < 0.6 else (admin, vecino)
+                yield Mensaje(
+                    remitente_id=remitente, destinatario_id=destinatario, contenido='Mensaje de prueba',
+                    leido=self.azar.random() < 0.8, fecha_envio=self._fecha(),
+                )
+
+        self._insertar(Mensaje, generar())
+        # bulk_create no pasa por usuarios.conversaciones: la bandeja se resume al final
+        call_command('recalcular_conversaciones', stdout=self.stdout)
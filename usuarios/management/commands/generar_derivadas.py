@@ -0,0 +1,39 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from usuarios.imagenes import CAMPOS_IMAGEN, guardar_derivadas, nombre_derivada
+from usuarios.recodificacion import ANCHOS_DERIVADAS, derivadas
+from usuarios.tareas import en_proceso
+
+
+class Command(BaseCommand):
+    help = 'Genera las versiones reducidas (WebP y JPEG) de las imágenes ya procesadas, por ejemplo las subidas antes de que existieran.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--todas', action='store_true',
+            help='Regenera también las imágenes que ya tienen sus versiones.',
+        )
+
+    def handle(self, *args, **options):
+        generadas = 0
+        for etiqueta, campos in CAMPOS_IMAGEN.items():
+            modelo = apps.get_model(etiqueta)
+            for campo in campos:
+                imagenes = (
+                    modelo.objects.filter(**{f'estado_{campo}': 'lista', f'{campo}__gt': ''})
+                    .values_list(campo, flat=True)
+                )
+                storage = modelo._meta.get_field(campo).storage
+                for nombre in imagenes.iterator():
+                    if not options['todas'] and storage.exists(nombre_derivada(nombre, ANCHOS_DERIVADAS[0], 'webp')):
+                        continue
+                    try:
+                        with storage.open(nombre, 'rb') as archivo:
+                            guardar_derivadas(storage, nombre, en_proceso(derivadas, archivo.read()))
+                    except Exception as e:
+                        self.stderr.write(self.style.ERROR(f'{nombre}: {e}'))
+                        continue
+                    generadas += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Imágenes con versiones nuevas: {generadas}.'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from usuarios.importacion import ArchivoInvalido, importar
+
+
+class Command(BaseCommand):
+    help = (
+        'Da de alta residentes desde un CSV (username, email, first_name, last_name, telefono y, '
+        'opcionales, casa_departamento, rol, password). Los hashes se calculan en TAREAS_PROCESOS procesos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo')
+        parser.add_argument(
+            '--validar', action='store_true',
+            help='Solo revisa el archivo e informa los errores, sin crear usuarios.',
+        )
+
+    def handle(self, *args, archivo, validar, **options):
+        try:
+            with open(archivo, 'rb') as entrada:
+                resultado = importar(entrada.read(), solo_validar=validar)
+        except (OSError, ArchivoInvalido) as e:
+            raise CommandError(e)
+
+        for error in resultado['errores']:
+            self.stderr.write(f'Línea {error["linea"]}: {"; ".join(error["errores"])}')
+        if validar:
+            self.stdout.write(self.style.SUCCESS(f'Filas válidas: {resultado["validos"]}. Con errores: {len(resultado["errores"])}.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Usuarios creados: {resultado["creados"]}. Con errores: {len(resultado["errores"])}.'))
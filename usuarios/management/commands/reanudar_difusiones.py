@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from usuarios.difusiones import enviar_difusion
+from usuarios.models import Difusion
+
+
+class Command(BaseCommand):
+    help = 'Retoma las difusiones que quedaron a medias (por ejemplo tras reiniciar el servidor) o que fallaron.'
+
+    def handle(self, *args, **options):
+        pendientes = list(
+            Difusion.objects.exclude(estado='completada').order_by('fecha_creacion').values_list('id', flat=True)
+        )
+        for difusion_id in pendientes:
+            try:
+                enviar_difusion(difusion_id)
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f'Difusión #{difusion_id}: {e}'))
+
+        self.stdout.write(self.style.SUCCESS(f'Difusiones retomadas: {len(pendientes)}.'))
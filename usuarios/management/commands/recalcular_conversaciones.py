@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+
+from usuarios.models import Conversacion, Mensaje
+
+LOTE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde los mensajes el resumen de todas las conversaciones del chat.'
+
+    def handle(self, *args, **options):
+        ultimo = (
+            Mensaje.objects
+            .filter(remitente=OuterRef('remitente'), destinatario=OuterRef('destinatario'))
+            .order_by('-fecha_envio', '-id')
+            .values('id')[:1]
+        )
+        # Una fila por sentido (remitente -> destinatario) con su último mensaje y sus no leídos
+        sentidos = (
+            Mensaje.objects
+            .order_by()
+            .values('remitente', 'destinatario')
+            .annotate(
+                ultima_actividad=Max('fecha_envio'),
+                ultimo=Subquery(ultimo),
+                no_leidos=Count('id', filter=Q(leido=False)),
+            )
+        )
+
+        pares = {}
+        for sentido in sentidos.iterator():
+            remitente, destinatario = sentido['remitente'], sentido['destinatario']
+            clave = (min(remitente, destinatario), max(remitente, destinatario))
+            par = pares.get(clave)
+            if par is None:
+                par = pares[clave] = Conversacion(usuario_a_id=clave[0], usuario_b_id=clave[1])
+            if par.ultima_actividad is None or sentido['ultima_actividad'] > par.ultima_actividad:
+                par.ultima_actividad = sentido['ultima_actividad']
+                par.ultimo_mensaje_id = sentido['ultimo']
+            # Los no leídos cuentan para quien los recibe
+            if destinatario == clave[0]:
+                par.no_leidos_a = sentido['no_leidos']
+            else:
+                par.no_leidos_b = sentido['no_leidos']
+
+        with transaction.atomic():
+            Conversacion.objects.all().delete()
+            Conversacion.objects.bulk_create(pares.values(), batch_size=LOTE)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Resumen recalculado para {len(pares)} conversaciones.'
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from usuarios.models import Solicitud, ReaccionSolicitud
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero el contador total_reacciones de todas las solicitudes.'
+
+    def handle(self, *args, **options):
+        conteo = (
+            ReaccionSolicitud.objects
+            .filter(solicitud=OuterRef('pk'))
+            .order_by()
+            .values('solicitud')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+
+        # Una sola sentencia UPDATE con subconsulta; no se cargan solicitudes en memoria
+        with transaction.atomic():
+            actualizadas = Solicitud.objects.update(
+                total_reacciones=Coalesce(Subquery(conteo), 0)
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Contadores de reacciones recalculados para {actualizadas} solicitudes.'
+        ))
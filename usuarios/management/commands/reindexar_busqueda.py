@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from usuarios.busqueda import reindexar_todo
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de publicaciones y solicitudes (por ejemplo tras una carga masiva).'
+
+    def handle(self, *args, **options):
+        total = reindexar_todo()
+        self.stdout.write(self.style.SUCCESS(f'Documentos indexados: {total}.'))
@@ -0,0 +1,157 @@
+"""
+Entrega de los archivos subidos (MEDIA_URL) con control de acceso.
+
+Solo se sirven los archivos que un registro usa: el PDF o la imagen de una
+publicación, la foto de una mascota o de un usuario (ya procesadas) y sus
+versiones reducidas. Lo que quedó huérfano (una imagen reemplazada, el estado
+de cuenta de una publicación borrada) responde 404.
+
+La vista solo decide si el archivo se puede ver y responde las peticiones
+condicionales (ETag / Last-Modified -> 304) sin tocarlo. Los bytes los envía el
+servidor web según MEDIA_ENVIO:
+
+- 'x-accel': nginx, con la cabecera X-Accel-Redirect hacia la ubicación
+  interna MEDIA_ENVIO_PREFIJO (alias de MEDIA_ROOT). nginx atiende Range.
+- 'x-sendfile': Apache (mod_xsendfile) o lighttpd, con X-Sendfile.
+- 'django': el propio worker, con soporte de Range. Solo para desarrollo.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+from .imagenes import CAMPOS_IMAGEN, CARPETA_DERIVADAS, origen_de_derivada
+
+# Campos cuyos archivos se sirven, además de los de imagen (usuarios.imagenes)
+CAMPOS_ARCHIVO = {
+    'usuarios.Publicacion': ['archivo_pdf'],
+}
+# Los nombres son únicos por subida, pero el permiso se revisa cada hora
+CACHE_CONTROL = 'private, max-age=3600'
+TAMANO_BLOQUE = 64 * 1024
+
+_RANGO = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _campo_de(nombre):
+    """(modelo, campo, es_imagen) dueño de la carpeta de nombre, o None."""
+    for etiqueta, campos in (*CAMPOS_IMAGEN.items(), *CAMPOS_ARCHIVO.items()):
+        modelo = apps.get_model(etiqueta)
+        for campo in campos:
+            if nombre.startswith(modelo._meta.get_field(campo).upload_to):
+                return modelo, campo, campo in CAMPOS_IMAGEN.get(etiqueta, ())
+    return None
+
+
+def archivo_publicado(nombre):
+    """
+    True si nombre (relativo a MEDIA_ROOT) es un archivo que algún registro
+    muestra. Una consulta.
+    """
+    if nombre.startswith(f'{CARPETA_DERIVADAS}/'):
+        nombre = origen_de_derivada(nombre)
+        if nombre is None:
+            return False
+    dueno = _campo_de(nombre)
+    if dueno is None:
+        return False
+    modelo, campo, es_imagen = dueno
+    filtro = {campo: nombre}
+    if es_imagen:
+        filtro[f'estado_{campo}'] = 'lista'
+    return modelo._base_manager.filter(**filtro).exists()
+
+
+def _rango(request, tamano, etag, modificado):
+    """
+    (inicio, fin) inclusivos del encabezado Range, None para enviar el archivo
+    completo o False si el rango no se puede satisfacer. Se atiende un solo
+    rango; con varios se envía todo, como permite el RFC 9110.
+    """
+    encabezado = request.headers.get('Range')
+    if not encabezado:
+        return None
+    condicion = request.headers.get('If-Range')
+    if condicion and condicion != etag and parse_http_date_safe(condicion) != modificado:
+        return None
+    coincidencia = _RANGO.match(encabezado.strip())
+    if not coincidencia or coincidencia.groups() == ('', ''):
+        return None
+    inicio, fin = coincidencia.groups()
+    if inicio == '':
+        # bytes=-N: los últimos N bytes
+        inicio, fin = max(0, tamano - int(fin)), tamano - 1
+    else:
+        inicio, fin = int(inicio), min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or inicio > fin:
+        return False
+    return inicio, fin
+
+
+def _leer(ruta, inicio, cantidad):
+    with open(ruta, 'rb') as archivo:
+        archivo.seek(inicio)
+        while cantidad > 0:
+            bloque = archivo.read(min(TAMANO_BLOQUE, cantidad))
+            if not bloque:
+                break
+            cantidad -= len(bloque)
+            yield bloque
+
+
+def responder_archivo(request, nombre, storage=default_storage):
+    """Respuesta para el archivo nombre, ya autorizado, según MEDIA_ENVIO."""
+    ruta = storage.path(nombre)
+    try:
+        estado = os.stat(ruta)
+    except FileNotFoundError:
+        raise Http404('Archivo no encontrado')
+    modificado = int(estado.st_mtime)
+    etag = f'"{modificado:x}-{estado.st_size:x}"'
+    tipo, _ = mimetypes.guess_type(nombre)
+
+    respuesta = get_conditional_response(request, etag=etag, last_modified=modificado)
+    if respuesta is None:
+        envio = settings.MEDIA_ENVIO
+        if envio == 'x-accel':
+            respuesta = HttpResponse()
+            respuesta['X-Accel-Redirect'] = settings.MEDIA_ENVIO_PREFIJO + quote(nombre)
+        elif envio == 'x-sendfile':
+            respuesta = HttpResponse()
+            respuesta['X-Sendfile'] = ruta
+        else:
+            respuesta = _respuesta_desde_django(request, ruta, estado.st_size, etag, modificado)
+        # Sin cuerpo en los dos primeros casos: el tipo lo conserva el servidor web
+        respuesta['Content-Type'] = tipo or 'application/octet-stream'
+        respuesta['Accept-Ranges'] = 'bytes'
+        respuesta['Content-Disposition'] = f"inline; filename*=UTF-8''{quote(os.path.basename(nombre))}"
+
+    respuesta['ETag'] = etag
+    respuesta['Last-Modified'] = http_date(modificado)
+    respuesta['Cache-Control'] = CACHE_CONTROL
+    return respuesta
+
+
+def _respuesta_desde_django(request, ruta, tamano, etag, modificado):
+    rango = _rango(request, tamano, etag, modificado)
+    if rango is False:
+        respuesta = HttpResponse(status=416)
+        respuesta['Content-Range'] = f'bytes */{tamano}'
+        return respuesta
+    inicio, fin = rango or (0, tamano - 1)
+    cantidad = max(0, fin - inicio + 1)
+    if request.method == 'HEAD':
+        respuesta = HttpResponse(status=206 if rango else 200)
+    else:
+        respuesta = StreamingHttpResponse(_leer(ruta, inicio, cantidad), status=206 if rango else 200)
+    respuesta['Content-Length'] = str(cantidad)
+    if rango:
+        respuesta['Content-Range'] = f'bytes {inicio}-{fin}/{tamano}'
+    return respuesta
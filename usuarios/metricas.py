@@ -0,0 +1,321 @@
+"""
+Métricas de rendimiento por vista en formato Prometheus.
+
+MetricasMiddleware mide cada petición y la acumula en memoria, agrupada por el
+nombre de la ruta resuelta (usuarios:dashboard, usuarios:reaccionar_solicitud...):
+latencia (histograma), consultas SQL y su tiempo, tiempo de plantillas y bytes
+de la respuesta. El costo por petición es un par de sumas bajo un lock.
+
+Funciona igual bajo WSGI y ASGI (el middleware es síncrono y asíncrono). La
+medición en curso vive en un contextvar y las consultas se cuentan con un
+execute_wrapper que cada conexión recibe al abrirse, así que también se cuentan
+las que una vista asíncrona hace con sync_to_async en otro hilo: asgiref copia
+el contexto a ese hilo.
+
+Cada proceso (worker WSGI/ASGI) escribe cada pocos segundos una copia de sus
+totales en su propio archivo dentro de METRICAS_DIR. El endpoint /metrics/ suma
+los archivos de todos los procesos, así que el resultado es el mismo sin importar
+qué worker atienda la petición. Al sumar se borran los archivos de procesos que
+ya no existen (el PID está en el nombre), así que un worker que se recicla o un
+reinicio del servicio hacen bajar los totales: Prometheus lo toma como el
+reinicio de un contador. METRICAS_DIR debe ser local a la máquina, no un
+volumen compartido entre nodos, porque los PIDs solo valen en ella.
+"""
+import atexit
+import contextvars
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates
+
+# Límites superiores (segundos) del histograma de latencia
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# El método lo elige el cliente: cualquier otro se etiqueta 'other' para no crear series sin límite
+METODOS = frozenset({'GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD', 'OPTIONS'})
+
+# Medición de la petición en curso; las plantillas suman aquí su tiempo
+_medicion_actual = contextvars.ContextVar('medicion_actual', default=None)
+
+_lock = threading.Lock()
+_totales = {}
+_respuestas = {}
+_archivo = None
+_ultima_escritura = 0.0
+
+
+class _Medicion:
+    __slots__ = ('consultas', 'sql_segundos', 'plantillas_segundos')
+
+    def __init__(self):
+        self.consultas = 0
+        self.sql_segundos = 0.0
+        self.plantillas_segundos = 0.0
+
+
+def _directorio():
+    return Path(getattr(settings, 'METRICAS_DIR', Path(settings.BASE_DIR) / 'metricas'))
+
+
+def _archivo_proceso():
+    """Archivo propio de este proceso; el instante de arranque evita chocar con PIDs reusados."""
+    global _archivo
+    if _archivo is None:
+        _archivo = _directorio() / f'{os.getpid()}-{time.time_ns()}.json'
+    return _archivo
+
+
+def _total_vacio():
+    return {
+        'buckets': [0] * len(BUCKETS), 'conteo': 0, 'segundos': 0.0, 'consultas': 0,
+        'sql_segundos': 0.0, 'plantillas_segundos': 0.0, 'bytes': 0,
+    }
+
+
+def _registrar(vista, metodo, codigo, segundos, medicion, tamano):
+    global _ultima_escritura
+    with _lock:
+        total = _totales.get((vista, metodo))
+        if total is None:
+            total = _totales[(vista, metodo)] = _total_vacio()
+        for i, limite in enumerate(BUCKETS):
+            if segundos <= limite:
+                total['buckets'][i] += 1
+                break
+        total['conteo'] += 1
+        total['segundos'] += segundos
+        total['consultas'] += medicion.consultas
+        total['sql_segundos'] += medicion.sql_segundos
+        total['plantillas_segundos'] += medicion.plantillas_segundos
+        total['bytes'] += tamano
+        _respuestas[(vista, metodo, codigo)] = _respuestas.get((vista, metodo, codigo), 0) + 1
+
+        ahora = time.monotonic()
+        if ahora - _ultima_escritura < getattr(settings, 'METRICAS_INTERVALO', 10):
+            return
+        _ultima_escritura = ahora
+    escribir_metricas()
+
+
+def escribir_metricas():
+    """Guarda los totales de este proceso en su archivo (reemplazo atómico)."""
+    with _lock:
+        datos = {
+            'totales': [[vista, metodo, total] for (vista, metodo), total in _totales.items()],
+            'respuestas': [[vista, metodo, codigo, n] for (vista, metodo, codigo), n in _respuestas.items()],
+        }
+    if not datos['totales']:
+        return
+    archivo = _archivo_proceso()
+    try:
+        archivo.parent.mkdir(parents=True, exist_ok=True)
+        temporal = archivo.with_suffix('.tmp')
+        temporal.write_text(json.dumps(datos))
+        os.replace(temporal, archivo)
+    except OSError:
+        # Las métricas nunca deben tumbar una petición
+        pass
+
+
+atexit.register(escribir_metricas)
+
+
+def _proceso_vivo(pid):
+    if pid == os.getpid() or os.name == 'nt':
+        # En Windows la señal 0 de os.kill() es CTRL_C_EVENT: no se comprueba
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Existe, pero es de otro usuario
+        return True
+    return True
+
+
+def _archivos_vigentes():
+    """Archivos de los procesos vivos; los de procesos terminados se borran."""
+    vigentes = []
+    for archivo in _directorio().glob('*.json'):
+        try:
+            pid = int(archivo.stem.split('-')[0])
+        except ValueError:
+            continue
+        # Con el PID reusado por este proceso, el archivo viejo tiene otro instante de arranque
+        if _proceso_vivo(pid) and (pid != os.getpid() or archivo == _archivo):
+            vigentes.append(archivo)
+            continue
+        try:
+            archivo.unlink(missing_ok=True)
+            archivo.with_suffix('.tmp').unlink(missing_ok=True)
+        except OSError:
+            pass
+    return vigentes
+
+
+def _sumar_procesos():
+    """Suma los archivos de todos los procesos vivos."""
+    escribir_metricas()
+    totales = {}
+    respuestas = {}
+    for archivo in _archivos_vigentes():
+        try:
+            datos = json.loads(archivo.read_text())
+        except (OSError, ValueError):
+            continue
+        for vista, metodo, total in datos['totales']:
+            acumulado = totales.setdefault((vista, metodo), _total_vacio())
+            for clave, valor in total.items():
+                if clave == 'buckets':
+                    acumulado['buckets'] = [a + b for a, b in zip(acumulado['buckets'], valor)]
+                else:
+                    acumulado[clave] += valor
+        for vista, metodo, codigo, n in datos['respuestas']:
+            respuestas[(vista, metodo, codigo)] = respuestas.get((vista, metodo, codigo), 0) + n
+    return totales, respuestas
+
+
+def _etiquetas(**etiquetas):
+    def escapar(valor):
+        return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{nombre}="{escapar(valor)}"' for nombre, valor in etiquetas.items())
+
+
+def exportar_prometheus():
+    """Texto en el formato de exposición de Prometheus con los totales de todos los procesos."""
+    totales, respuestas = _sumar_procesos()
+    lineas = [
+        '# HELP django_http_request_duration_seconds Latencia de las peticiones por vista.',
+        '# TYPE django_http_request_duration_seconds histogram',
+    ]
+    for (vista, metodo), total in sorted(totales.items()):
+        acumulado = 0
+        for limite, n in zip(BUCKETS, total['buckets']):
+            acumulado += n
+            lineas.append(f'django_http_request_duration_seconds_bucket{{{_etiquetas(view=vista, method=metodo, le=limite)}}} {acumulado}')
+        etiquetas = _etiquetas(view=vista, method=metodo)
+        lineas.append(f'django_http_request_duration_seconds_bucket{{{etiquetas},le="+Inf"}} {total["conteo"]}')
+        lineas.append(f'django_http_request_duration_seconds_sum{{{etiquetas}}} {total["segundos"]}')
+        lineas.append(f'django_http_request_duration_seconds_count{{{etiquetas}}} {total["conteo"]}')
+
+    lineas += [
+        '# HELP django_http_responses_total Respuestas por vista y código HTTP.',
+        '# TYPE django_http_responses_total counter',
+    ]
+    for (vista, metodo, codigo), n in sorted(respuestas.items()):
+        lineas.append(f'django_http_responses_total{{{_etiquetas(view=vista, method=metodo, status=codigo)}}} {n}')
+
+    contadores = [
+        ('django_sql_queries_total', 'consultas', 'Consultas SQL ejecutadas por vista.'),
+        ('django_sql_duration_seconds_total', 'sql_segundos', 'Tiempo total en consultas SQL por vista.'),
+        ('django_template_render_seconds_total', 'plantillas_segundos', 'Tiempo total dibujando plantillas por vista.'),
+        ('django_http_response_bytes_total', 'bytes', 'Bytes enviados en las respuestas por vista.'),
+    ]
+    for nombre, clave, ayuda in contadores:
+        lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} counter']
+        for (vista, metodo), total in sorted(totales.items()):
+            lineas.append(f'{nombre}{{{_etiquetas(view=vista, method=metodo)}}} {total[clave]}')
+    return '\n'.join(lineas) + '\n'
+
+
+def _medir_sql(execute, sql, params, many, context):
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.consultas += 1
+        medicion.sql_segundos += time.perf_counter() - inicio
+
+
+@receiver(connection_created)
+def _instalar_medicion_sql(sender, connection, **kwargs):
+    # Al principio de la lista: connection.execute_wrapper() de otros saca el último al salir
+    if _medir_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _medir_sql)
+
+
+class MetricasMiddleware:
+    """
+    Mide cada petición y la suma a las métricas de su vista.
+    Va primero en MIDDLEWARE para incluir el tiempo de todo el resto.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medicion = _Medicion()
+        token = _medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicion_actual.reset(token)
+        self._registrar(request, response, time.perf_counter() - inicio, medicion)
+        return response
+
+    async def __acall__(self, request):
+        medicion = _Medicion()
+        token = _medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicion_actual.reset(token)
+        self._registrar(request, response, time.perf_counter() - inicio, medicion)
+        return response
+
+    @staticmethod
+    def _registrar(request, response, segundos, medicion):
+        resolver_match = getattr(request, 'resolver_match', None)
+        vista = resolver_match.view_name if resolver_match else '<sin_ruta>'
+        tamano = 0 if response.streaming else len(response.content)
+        metodo = request.method if request.method in METODOS else 'other'
+        _registrar(vista, metodo, response.status_code, segundos, medicion, tamano)
+
+
+class _PlantillaMedida:
+    """Envuelve una plantilla para sumar su tiempo de render a la petición en curso."""
+
+    def __init__(self, plantilla):
+        self.plantilla = plantilla
+
+    def __getattr__(self, nombre):
+        return getattr(self.plantilla, nombre)
+
+    def render(self, context=None, request=None):
+        medicion = _medicion_actual.get()
+        if medicion is None:
+            return self.plantilla.render(context, request)
+        inicio = time.perf_counter()
+        try:
+            return self.plantilla.render(context, request)
+        finally:
+            medicion.plantillas_segundos += time.perf_counter() - inicio
+
+
+class PlantillasMedidas(DjangoTemplates):
+    """Motor de plantillas de Django que registra el tiempo de render en las métricas."""
+
+    def from_string(self, template_code):
+        return _PlantillaMedida(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _PlantillaMedida(super().get_template(template_name))
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:00
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def calcular_total_reacciones(apps, schema_editor):
+    Solicitud = apps.get_model('usuarios', 'Solicitud')
+    ReaccionSolicitud = apps.get_model('usuarios', 'ReaccionSolicitud')
+    conteo = (
+        ReaccionSolicitud.objects
+        .filter(solicitud=OuterRef('pk'))
+        .order_by()
+        .values('solicitud')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    Solicitud.objects.update(total_reacciones=Coalesce(Subquery(conteo), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solicitud',
+            name='total_reacciones',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Número de reacciones, se actualiza junto con cada ReaccionSolicitud'),
+        ),
+        migrations.RunPython(calcular_total_reacciones, migrations.RunPython.noop),
+    ]
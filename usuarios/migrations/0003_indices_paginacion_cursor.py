@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0002_solicitud_total_reacciones'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='publicacion',
+            index=models.Index(fields=['-fecha_publicacion', '-id'], name='publicaciones_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitud',
+            index=models.Index(fields=['-fecha_creacion', '-id'], name='solicitudes_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiculo',
+            index=models.Index(fields=['-fecha_registro', '-id'], name='vehiculos_fecha_id_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:26
+
+from django.db import migrations, models
+
+
+def marcar_eventos_globales(apps, schema_editor):
+    Evento = apps.get_model('usuarios', 'Evento')
+    Evento.objects.filter(usuario__rol='admin').update(es_global=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0003_indices_paginacion_cursor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evento',
+            name='es_global',
+            field=models.BooleanField(default=False, editable=False, help_text='Evento de la administración, visible para todos los residentes'),
+        ),
+        migrations.RunPython(marcar_eventos_globales, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['es_global', 'fecha_fin', 'fecha_inicio'], name='eventos_global_fin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['usuario', 'fecha_fin', 'fecha_inicio'], name='eventos_usuario_fin_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('usuarios', '0004_evento_es_global_indices_calendario'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['fecha_inicio'], name='eventos_fecha_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mascota',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['numero_casa', 'nombre'], name='mascotas_activas_casa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mensaje',
+            index=models.Index(condition=models.Q(('leido', False)), fields=['destinatario'], name='mensajes_no_leidos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitud',
+            index=models.Index(fields=['usuario', '-fecha_creacion', '-id'], name='solicitudes_usuario_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitud',
+            index=models.Index(condition=models.Q(('estado', 'pendiente')), fields=['-fecha_creacion', '-id'], name='solicitudes_pendientes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['casa_departamento', 'last_name'], name='usuarios_activos_casa_idx'),
+        ),
+    ]
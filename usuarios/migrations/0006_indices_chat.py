@@ -0,0 +1,22 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('usuarios', '0005_indices_rutas_de_acceso'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mensaje',
+            index=models.Index(fields=['remitente', 'destinatario', '-fecha_envio', '-id'], name='mensajes_conversacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(condition=models.Q(models.Q(('rol', 'admin'), ('is_superuser', True), _connector='OR'), ('activo', True)), fields=['first_name', 'last_name'], name='usuarios_administradores_idx'),
+        ),
+    ]
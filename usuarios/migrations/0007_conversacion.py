@@ -0,0 +1,69 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def resumir_conversaciones(apps, schema_editor):
+    """Crea el resumen de las conversaciones que ya tienen mensajes."""
+    Mensaje = apps.get_model('usuarios', 'Mensaje')
+    Conversacion = apps.get_model('usuarios', 'Conversacion')
+    ultimo = (
+        Mensaje.objects
+        .filter(remitente=models.OuterRef('remitente'), destinatario=models.OuterRef('destinatario'))
+        .order_by('-fecha_envio', '-id')
+        .values('id')[:1]
+    )
+    sentidos = (
+        Mensaje.objects.order_by().values('remitente', 'destinatario')
+        .annotate(
+            ultima_actividad=models.Max('fecha_envio'),
+            ultimo=models.Subquery(ultimo),
+            no_leidos=models.Count('id', filter=models.Q(leido=False)),
+        )
+    )
+    pares = {}
+    for sentido in sentidos.iterator():
+        remitente, destinatario = sentido['remitente'], sentido['destinatario']
+        clave = (min(remitente, destinatario), max(remitente, destinatario))
+        par = pares.setdefault(clave, Conversacion(usuario_a_id=clave[0], usuario_b_id=clave[1]))
+        if par.ultima_actividad is None or sentido['ultima_actividad'] > par.ultima_actividad:
+            par.ultima_actividad = sentido['ultima_actividad']
+            par.ultimo_mensaje_id = sentido['ultimo']
+        if destinatario == clave[0]:
+            par.no_leidos_a = sentido['no_leidos']
+        else:
+            par.no_leidos_b = sentido['no_leidos']
+    Conversacion.objects.bulk_create(pares.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0006_indices_chat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultima_actividad', models.DateTimeField(help_text='Fecha del mensaje más reciente')),
+                ('no_leidos_a', models.PositiveIntegerField(default=0, help_text='Mensajes recibidos por usuario_a que aún no ha leído')),
+                ('no_leidos_b', models.PositiveIntegerField(default=0, help_text='Mensajes recibidos por usuario_b que aún no ha leído')),
+                ('ultimo_mensaje', models.ForeignKey(blank=True, help_text='Mensaje más reciente de la conversación', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='usuarios.mensaje')),
+                ('usuario_a', models.ForeignKey(help_text='Participante con el menor id', on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('usuario_b', models.ForeignKey(help_text='Participante con el mayor id', on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Conversación',
+                'verbose_name_plural': 'Conversaciones',
+                'db_table': 'conversaciones',
+                'ordering': ['-ultima_actividad'],
+                'indexes': [models.Index(fields=['usuario_a', '-ultima_actividad', '-id'], name='conversaciones_a_idx'), models.Index(fields=['usuario_b', '-ultima_actividad', '-id'], name='conversaciones_b_idx')],
+                'constraints': [models.UniqueConstraint(fields=('usuario_a', 'usuario_b'), name='conversacion_unica'), models.CheckConstraint(condition=models.Q(('usuario_a__lt', models.F('usuario_b'))), name='conversacion_par_ordenado')],
+            },
+        ),
+        migrations.RunPython(resumir_conversaciones, migrations.RunPython.noop),
+    ]
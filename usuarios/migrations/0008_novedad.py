@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0007_conversacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Novedad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('solicitud', 'Solicitud'), ('reaccion', 'Reacción'), ('publicacion', 'Publicación')], help_text='Qué cambió', max_length=20)),
+                ('datos', models.JSONField(help_text='Contenido del evento tal como se envía al navegador')),
+                ('fecha', models.DateTimeField(auto_now_add=True, db_index=True, help_text='Momento del cambio; las novedades viejas se depuran')),
+            ],
+            options={
+                'verbose_name': 'Novedad',
+                'verbose_name_plural': 'Novedades',
+                'db_table': 'novedades',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0008_novedad'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Difusion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('contenido', models.TextField(help_text='Texto que recibe cada destinatario')),
+                ('destino', models.CharField(choices=[('todos', 'Todos los residentes'), ('con_vehiculo', 'Residentes con vehículo'), ('con_mascota', 'Residentes con mascota')], default='todos', help_text='Grupo de residentes que la recibe', max_length=20)),
+                ('casa', models.CharField(blank=True, help_text='Solo casas/departamentos que empiezan así (ej: "Dpto 3"); vacío = todas', max_length=50)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('enviando', 'Enviando'), ('completada', 'Completada'), ('fallida', 'Fallida')], default='pendiente', help_text='Estado del reparto', max_length=20)),
+                ('total', models.PositiveIntegerField(default=0, help_text='Destinatarios al iniciar el reparto')),
+                ('enviados', models.PositiveIntegerField(default=0, help_text='Mensajes ya creados')),
+                ('ultimo_destinatario', models.PositiveIntegerField(default=0, help_text='Id del último destinatario atendido; el reparto sigue desde ahí')),
+                ('error', models.TextField(blank=True, help_text='Motivo del fallo, si lo hubo')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, help_text='Fecha en que se creó la difusión')),
+                ('fecha_fin', models.DateTimeField(blank=True, help_text='Fecha en que terminó el reparto', null=True)),
+                ('remitente', models.ForeignKey(help_text='Administrador que envía la difusión', on_delete=django.db.models.deletion.CASCADE, related_name='difusiones', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Difusión',
+                'verbose_name_plural': 'Difusiones',
+                'db_table': 'difusiones',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-18 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0009_difusion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mascota',
+            name='estado_foto',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('lista', 'Lista'), ('error', 'Error')], default='lista', help_text='Procesamiento de la foto; se muestra cuando está lista', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='publicacion',
+            name='estado_imagen',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('lista', 'Lista'), ('error', 'Error')], default='lista', help_text='Procesamiento de la imagen; se muestra cuando está lista', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='estado_foto_perfil',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('lista', 'Lista'), ('error', 'Error')], default='lista', help_text='Procesamiento de la foto de perfil; se muestra cuando está lista', max_length=20),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-18 13:07
+
+import usuarios.imagenes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0010_estado_imagenes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mascota',
+            name='foto',
+            field=models.ImageField(blank=True, help_text='Foto de la mascota', null=True, upload_to='mascotas/fotos/', validators=[usuarios.imagenes.validar_imagen]),
+        ),
+        migrations.AlterField(
+            model_name='publicacion',
+            name='imagen',
+            field=models.ImageField(blank=True, help_text='Imagen ilustrativa opcional', null=True, upload_to='publicaciones/imagenes/', validators=[usuarios.imagenes.validar_imagen]),
+        ),
+        migrations.AlterField(
+            model_name='usuario',
+            name='foto_perfil',
+            field=models.ImageField(blank=True, help_text='Foto de perfil del usuario', null=True, upload_to='usuarios/fotos_perfil/', validators=[usuarios.imagenes.validar_imagen]),
+        ),
+    ]
@@ -0,0 +1,113 @@
+# Generated by Django 6.0.1 on 2026-10-18 13:13
+
+from django.db import migrations, models
+
+# Con SQLite, una migración que rehaga la tabla busqueda_documentos borra los
+# triggers: habría que volver a crearlos.
+SQL_INDICE = {
+    'postgresql': [
+        """
+        ALTER TABLE busqueda_documentos ADD COLUMN vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', titulo), 'A') || setweight(to_tsvector('simple', cuerpo), 'B')
+        ) STORED
+        """,
+        'CREATE INDEX busqueda_documentos_vector ON busqueda_documentos USING GIN (vector)',
+    ],
+    'sqlite': [
+        # El texto ya viene normalizado; los índices de prefijo aceleran "palabra*"
+        """
+        CREATE VIRTUAL TABLE busqueda_documentos_fts USING fts5(
+            titulo, cuerpo, content='busqueda_documentos', content_rowid='id', prefix='2 3 4'
+        )
+        """,
+        """
+        CREATE TRIGGER busqueda_documentos_ai AFTER INSERT ON busqueda_documentos BEGIN
+            INSERT INTO busqueda_documentos_fts(rowid, titulo, cuerpo) VALUES (new.id, new.titulo, new.cuerpo);
+        END
+        """,
+        """
+        CREATE TRIGGER busqueda_documentos_ad AFTER DELETE ON busqueda_documentos BEGIN
+            INSERT INTO busqueda_documentos_fts(busqueda_documentos_fts, rowid, titulo, cuerpo)
+            VALUES ('delete', old.id, old.titulo, old.cuerpo);
+        END
+        """,
+        """
+        CREATE TRIGGER busqueda_documentos_au AFTER UPDATE ON busqueda_documentos BEGIN
+            INSERT INTO busqueda_documentos_fts(busqueda_documentos_fts, rowid, titulo, cuerpo)
+            VALUES ('delete', old.id, old.titulo, old.cuerpo);
+            INSERT INTO busqueda_documentos_fts(rowid, titulo, cuerpo) VALUES (new.id, new.titulo, new.cuerpo);
+        END
+        """,
+    ],
+}
+SQL_BORRAR_INDICE = {
+    'postgresql': ['ALTER TABLE busqueda_documentos DROP COLUMN vector'],
+    'sqlite': [
+        'DROP TRIGGER busqueda_documentos_ai',
+        'DROP TRIGGER busqueda_documentos_ad',
+        'DROP TRIGGER busqueda_documentos_au',
+        'DROP TABLE busqueda_documentos_fts',
+    ],
+}
+
+
+def crear_indice_texto(apps, schema_editor):
+    """Índice de texto completo del motor (usuarios.busqueda); otros motores no lo tienen."""
+    for sql in SQL_INDICE.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def borrar_indice_texto(apps, schema_editor):
+    for sql in SQL_BORRAR_INDICE.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def indexar_existentes(apps, schema_editor):
+    """Crea los documentos de las publicaciones y solicitudes que ya existen."""
+    from usuarios.busqueda import normalizar
+
+    DocumentoBusqueda = apps.get_model('usuarios', 'DocumentoBusqueda')
+    modelos = [
+        ('publicacion', apps.get_model('usuarios', 'Publicacion'), 'contenido', 'fecha_publicacion'),
+        ('solicitud', apps.get_model('usuarios', 'Solicitud'), 'descripcion', 'fecha_creacion'),
+    ]
+    for tipo, modelo, cuerpo, fecha in modelos:
+        DocumentoBusqueda.objects.bulk_create(
+            (
+                DocumentoBusqueda(
+                    tipo=tipo, objeto_id=fila['id'], titulo=normalizar(fila['titulo']),
+                    cuerpo=normalizar(fila[cuerpo]), fecha=fila[fecha],
+                )
+                for fila in modelo.objects.values('id', 'titulo', cuerpo, fecha).iterator()
+            ),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0011_limites_imagenes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentoBusqueda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('publicacion', 'Publicación'), ('solicitud', 'Solicitud')], help_text='Modelo del documento', max_length=20)),
+                ('objeto_id', models.PositiveBigIntegerField(help_text='Id de la publicación o solicitud')),
+                ('titulo', models.TextField(help_text='Palabras normalizadas del título (pesan más en el orden)')),
+                ('cuerpo', models.TextField(help_text='Palabras normalizadas del contenido o la descripción')),
+                ('fecha', models.DateTimeField(help_text='Fecha del documento, para desempatar resultados')),
+            ],
+            options={
+                'verbose_name': 'Documento de búsqueda',
+                'verbose_name_plural': 'Documentos de búsqueda',
+                'db_table': 'busqueda_documentos',
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'objeto_id'), name='documento_busqueda_unico')],
+            },
+        ),
+        migrations.RunPython(crear_indice_texto, borrar_indice_texto),
+        migrations.RunPython(indexar_existentes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-18 13:40
+
+from django.db import migrations, models
+
+from usuarios.placas import normalizar_placa
+
+
+def normalizar_placas(apps, schema_editor):
+    Vehiculo = apps.get_model('usuarios', 'Vehiculo')
+    vehiculos = list(Vehiculo.objects.only('id', 'placa'))
+    for vehiculo in vehiculos:
+        vehiculo.placa_normalizada = normalizar_placa(vehiculo.placa)
+    Vehiculo.objects.bulk_update(vehiculos, ['placa_normalizada'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0012_documentobusqueda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehiculo',
+            name='placa_normalizada',
+            field=models.CharField(db_index=True, default='', editable=False, help_text='Placa en mayúsculas y sin separadores (ABC1234), para comparar placas escritas distinto', max_length=20),
+            preserve_default=False,
+        ),
+        migrations.RunPython(normalizar_placas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 13:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0013_vehiculo_placa_normalizada'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='novedad',
+            name='tipo',
+            field=models.CharField(choices=[('solicitud', 'Solicitud'), ('solicitudes', 'Solicitudes en lote'), ('reaccion', 'Reacción'), ('publicacion', 'Publicación')], help_text='Qué cambió', max_length=20),
+        ),
+    ]
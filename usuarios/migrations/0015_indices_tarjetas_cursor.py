@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:50
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0014_novedad_solicitudes_en_lote'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='mascota',
+            name='mascotas_activas_casa_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='usuario',
+            name='usuarios_activos_casa_idx',
+        ),
+        migrations.AddIndex(
+            model_name='mascota',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['-fecha_registro', '-id'], name='mascotas_activas_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(django.db.models.functions.comparison.Coalesce('casa_departamento', django.db.models.expressions.RawSQL("''", ()), output_field=models.CharField()), models.F('last_name'), models.F('id'), condition=models.Q(('activo', True)), name='usuarios_activos_casa_idx'),
+        ),
+    ]
@@ -1,12 +1,25 @@
 ﻿from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.core.validators import RegexValidator
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+
+from .imagenes import validar_imagen
+from .placas import normalizar_placa
 
 validador_ecuador = RegexValidator(
     regex=r'^09\d{8}$',
     message="El número de teléfono debe empezar con '09' y tener 10 dígitos en total (ej: 0991234567)."
 )
 
+# Procesamiento en segundo plano de las imágenes subidas (usuarios.imagenes)
+ESTADOS_IMAGEN = [
+    ('pendiente', 'Pendiente'),
+    ('procesando', 'Procesando'),
+    ('lista', 'Lista'),
+    ('error', 'Error'),
+]
+
 class UsuarioManager(BaseUserManager):
     def create_user(self, username, email=None, password=None, **extra_fields):
         extra_fields.setdefault('is_staff', False)
@@ -33,6 +46,11 @@ class UsuarioManager(BaseUserManager):
         user.set_password(password)
         user.save(using=self._db)
         return user
+# Casa para ordenar la lista de vecinos: sin NULL, que cada motor ordena en un extremo distinto.
+# '' va literal (no como parámetro) para que SQLite reconozca la expresión del índice
+CASA_ORDEN = Coalesce('casa_departamento', RawSQL("''", ()), output_field=models.CharField())
+
+
 # Modelo de Usuario Personalizado para el Conjunto Selva Alegre
 class Usuario(AbstractUser):
     """
@@ -91,9 +109,17 @@ class Usuario(AbstractUser):
         upload_to='usuarios/fotos_perfil/',
         blank=True,
         null=True,
+        validators=[validar_imagen],
         help_text='Foto de perfil del usuario'
     )
     
+    estado_foto_perfil = models.CharField(
+        max_length=20,
+        choices=ESTADOS_IMAGEN,
+        default='lista',
+        help_text='Procesamiento de la foto de perfil; se muestra cuando está lista'
+    )
+    
     activo = models.BooleanField(
         default=True,
         help_text='Indica si el usuario está activo en el conjunto'
@@ -109,6 +135,20 @@ class Usuario(AbstractUser):
         verbose_name_plural = 'Usuarios'
         ordering = ['casa_departamento', 'last_name']
         db_table = 'usuarios'
+        indexes = [
+            # Tarjeta de vecinos: activos ordenados por casa, apellido e id (cursor)
+            models.Index(
+                CASA_ORDEN, models.F('last_name'), models.F('id'),
+                condition=models.Q(activo=True),
+                name='usuarios_activos_casa_idx',
+            ),
+            # Contactos del chat de los residentes: la administración activa
+            models.Index(
+                fields=['first_name', 'last_name'],
+                condition=(models.Q(rol='admin') | models.Q(is_superuser=True)) & models.Q(activo=True),
+                name='usuarios_administradores_idx',
+            ),
+        ]
     
     def __str__(self):
         """Representación en string del usuario"""
@@ -174,6 +214,13 @@ class Evento(models.Model):
         help_text='Color del evento en formato hexadecimal'
     )
     
+    # Copia del rol del autor para no hacer JOIN con usuarios al armar el calendario
+    es_global = models.BooleanField(
+        default=False,
+        editable=False,
+        help_text='Evento de la administración, visible para todos los residentes'
+    )
+    
     creado_en = models.DateTimeField(
         auto_now_add=True,
         help_text='Fecha de creación del evento'
@@ -189,9 +236,36 @@ class Evento(models.Model):
         verbose_name_plural = 'Eventos'
         ordering = ['fecha_inicio']
         db_table = 'eventos'
+        # El calendario pide los eventos que terminan después del inicio del mes
+        indexes = [
+            models.Index(fields=['es_global', 'fecha_fin', 'fecha_inicio'], name='eventos_global_fin_idx'),
+            models.Index(fields=['usuario', 'fecha_fin', 'fecha_inicio'], name='eventos_usuario_fin_idx'),
+            # Orden por defecto (admin y listados)
+            models.Index(fields=['fecha_inicio'], name='eventos_fecha_inicio_idx'),
+        ]
     
     def __str__(self):
         return f"{self.titulo} - {self.fecha_inicio.date()}"
+    
+    def save(self, *args, **kwargs):
+        self.es_global = self.usuario.rol == 'admin'
+        super().save(*args, **kwargs)
+
+
+class SolicitudQuerySet(models.QuerySet):
+    def con_reacciones(self, usuario):
+        """
+        Anota cada solicitud con si el usuario ya reaccionó, en la misma consulta,
+        para no consultar reacciones fila por fila. El total ya viene en total_reacciones.
+        """
+        return self.annotate(
+            reaccionada_por_usuario=models.Exists(
+                ReaccionSolicitud.objects.filter(
+                    solicitud=models.OuterRef('pk'),
+                    usuario=usuario
+                )
+            )
+        )
 
 
 class Solicitud(models.Model):
@@ -215,6 +289,8 @@ class Solicitud(models.Model):
         ('otro', 'Otro'),
     ]
     
+    objects = SolicitudQuerySet.as_manager()
+    
     usuario = models.ForeignKey(
         Usuario,
         on_delete=models.CASCADE,
@@ -261,11 +337,29 @@ class Solicitud(models.Model):
         help_text='Respuesta del administrador'
     )
     
+    total_reacciones = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text='Número de reacciones, se actualiza junto con cada ReaccionSolicitud'
+    )
+    
     class Meta:
         verbose_name = 'Solicitud'
         verbose_name_plural = 'Solicitudes'
         ordering = ['-fecha_creacion']
         db_table = 'solicitudes'
+        indexes = [
+            # Paginación por cursor: ORDER BY fecha_creacion DESC, id DESC
+            models.Index(fields=['-fecha_creacion', '-id'], name='solicitudes_fecha_id_idx'),
+            # Solicitudes propias del residente, con el mismo orden del cursor
+            models.Index(fields=['usuario', '-fecha_creacion', '-id'], name='solicitudes_usuario_fecha_idx'),
+            # Pendientes del administrador (contador y bandeja); el resto de estados no se consulta solo
+            models.Index(
+                fields=['-fecha_creacion', '-id'],
+                condition=models.Q(estado='pendiente'),
+                name='solicitudes_pendientes_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.get_tipo_display()} - {self.titulo} ({self.get_estado_display()})"
@@ -337,14 +431,30 @@ class Mascota(models.Model):
         upload_to='mascotas/fotos/',
         blank=True,
         null=True,
+        validators=[validar_imagen],
         help_text='Foto de la mascota'
     )
     
+    estado_foto = models.CharField(
+        max_length=20,
+        choices=ESTADOS_IMAGEN,
+        default='lista',
+        help_text='Procesamiento de la foto; se muestra cuando está lista'
+    )
+    
     class Meta:
         verbose_name = 'Mascota'
         verbose_name_plural = 'Mascotas'
         ordering = ['numero_casa', 'nombre']
         db_table = 'mascotas'
+        indexes = [
+            # Tarjeta de mascotas: activas, las más recientes primero (cursor)
+            models.Index(
+                fields=['-fecha_registro', '-id'],
+                condition=models.Q(activo=True),
+                name='mascotas_activas_fecha_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.nombre} ({self.get_tipo_display()}) - {self.numero_casa}"
@@ -387,11 +497,118 @@ class Mensaje(models.Model):
         verbose_name_plural = 'Mensajes'
         ordering = ['fecha_envio']
         db_table = 'mensajes'
+        indexes = [
+            # Historial de una conversación en cada sentido, del más reciente al más antiguo
+            models.Index(
+                fields=['remitente', 'destinatario', '-fecha_envio', '-id'],
+                name='mensajes_conversacion_idx',
+            ),
+            # Mensajes sin leer de cada destinatario
+            models.Index(
+                fields=['destinatario'],
+                condition=models.Q(leido=False),
+                name='mensajes_no_leidos_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"De: {self.remitente} Para: {self.destinatario} - {self.fecha_envio.strftime('%d/%m/%Y %H:%M')}"
 
 
+class ConversacionQuerySet(models.QuerySet):
+    def de_usuario(self, usuario):
+        """
+        Conversaciones en las que participa el usuario, como dos querysets (uno por
+        lado del par) para que cada uno use su índice; paginar_keyset los mezcla.
+        """
+        return [self.filter(usuario_a=usuario), self.filter(usuario_b=usuario)]
+
+    def entre(self, usuario, otros_ids):
+        """Conversaciones del usuario con cada uno de otros_ids, por el índice único del par."""
+        mayores = [otro_id for otro_id in otros_ids if otro_id > usuario.pk]
+        menores = [otro_id for otro_id in otros_ids if otro_id < usuario.pk]
+        return self.filter(
+            models.Q(usuario_a=usuario, usuario_b_id__in=mayores) |
+            models.Q(usuario_b=usuario, usuario_a_id__in=menores)
+        )
+
+
+class Conversacion(models.Model):
+    """
+    Resumen de la conversación entre dos usuarios para la bandeja del chat:
+    último mensaje, última actividad y mensajes sin leer de cada lado.
+    Se actualiza en la misma transacción que cada envío y cada lectura
+    (usuarios.conversaciones), así la bandeja no agrupa la tabla de mensajes.
+    usuario_a es siempre el de menor id del par.
+    """
+    usuario_a = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        related_name='+',
+        help_text='Participante con el menor id'
+    )
+    
+    usuario_b = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        related_name='+',
+        help_text='Participante con el mayor id'
+    )
+    
+    ultimo_mensaje = models.ForeignKey(
+        Mensaje,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text='Mensaje más reciente de la conversación'
+    )
+    
+    ultima_actividad = models.DateTimeField(
+        help_text='Fecha del mensaje más reciente'
+    )
+    
+    no_leidos_a = models.PositiveIntegerField(
+        default=0,
+        help_text='Mensajes recibidos por usuario_a que aún no ha leído'
+    )
+    
+    no_leidos_b = models.PositiveIntegerField(
+        default=0,
+        help_text='Mensajes recibidos por usuario_b que aún no ha leído'
+    )
+    
+    objects = ConversacionQuerySet.as_manager()
+    
+    class Meta:
+        verbose_name = 'Conversación'
+        verbose_name_plural = 'Conversaciones'
+        ordering = ['-ultima_actividad']
+        db_table = 'conversaciones'
+        constraints = [
+            models.UniqueConstraint(fields=['usuario_a', 'usuario_b'], name='conversacion_unica'),
+            models.CheckConstraint(condition=models.Q(usuario_a__lt=models.F('usuario_b')), name='conversacion_par_ordenado'),
+        ]
+        indexes = [
+            # Bandeja de cada lado del par, de la más reciente a la más antigua
+            models.Index(fields=['usuario_a', '-ultima_actividad', '-id'], name='conversaciones_a_idx'),
+            models.Index(fields=['usuario_b', '-ultima_actividad', '-id'], name='conversaciones_b_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.usuario_a} - {self.usuario_b}"
+    
+    def otro(self, usuario):
+        """El participante que no es el usuario dado."""
+        return self.usuario_b if self.usuario_a_id == usuario.pk else self.usuario_a
+    
+    def otro_id(self, usuario):
+        return self.usuario_b_id if self.usuario_a_id == usuario.pk else self.usuario_a_id
+    
+    def no_leidos_de(self, usuario):
+        return self.no_leidos_a if self.usuario_a_id == usuario.pk else self.no_leidos_b
+
+
 class Vehiculo(models.Model):
     """
     Modelo para registrar vehículos de los residentes del conjunto.
@@ -418,6 +635,13 @@ class Vehiculo(models.Model):
         unique=True,
         help_text='Placa del vehículo (ej: ABC-1234)'
     )
+
+    placa_normalizada = models.CharField(
+        max_length=20,
+        db_index=True,
+        editable=False,
+        help_text='Placa en mayúsculas y sin separadores (ABC1234), para comparar placas escritas distinto'
+    )
     
     marca = models.CharField(
         max_length=100,
@@ -444,10 +668,18 @@ class Vehiculo(models.Model):
         verbose_name_plural = 'Vehículos'
         ordering = ['-fecha_registro']
         db_table = 'vehiculos'
+        indexes = [
+            # Paginación por cursor: ORDER BY fecha_registro DESC, id DESC
+            models.Index(fields=['-fecha_registro', '-id'], name='vehiculos_fecha_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.marca} {self.modelo} - {self.placa}"
 
+    def save(self, *args, **kwargs):
+        self.placa_normalizada = normalizar_placa(self.placa)
+        super().save(*args, **kwargs)
+
 
 class Publicacion(models.Model):
     """
@@ -483,8 +715,15 @@ class Publicacion(models.Model):
         upload_to='publicaciones/imagenes/',
         blank=True,
         null=True,
+        validators=[validar_imagen],
         help_text='Imagen ilustrativa opcional'
     )
+    estado_imagen = models.CharField(
+        max_length=20,
+        choices=ESTADOS_IMAGEN,
+        default='lista',
+        help_text='Procesamiento de la imagen; se muestra cuando está lista'
+    )
     archivo_pdf = models.FileField(
         upload_to='publicaciones/documentos/',
         blank=True,
@@ -501,6 +740,10 @@ class Publicacion(models.Model):
         verbose_name_plural = 'Publicaciones'
         ordering = ['-fecha_publicacion']
         db_table = 'publicaciones'
+        indexes = [
+            # Paginación por cursor: ORDER BY fecha_publicacion DESC, id DESC
+            models.Index(fields=['-fecha_publicacion', '-id'], name='publicaciones_fecha_id_idx'),
+        ]
 
     def __str__(self):
         return self.titulo
@@ -537,3 +780,198 @@ class ReaccionSolicitud(models.Model):
 
     def __str__(self):
         return f"{self.usuario.username} reaccionó a {self.solicitud.titulo}"
+
+
+class Novedad(models.Model):
+    """
+    Cambio que se empuja en vivo a los dashboards abiertos (usuarios.novedades):
+    estado de una o varias solicitudes, total de reacciones o una publicación
+    nueva.
+    El id creciente es el id del evento SSE; un cliente que se reconecta pide
+    las novedades posteriores a su Last-Event-ID.
+    """
+    TIPO_CHOICES = [
+        ('solicitud', 'Solicitud'),
+        ('solicitudes', 'Solicitudes en lote'),
+        ('reaccion', 'Reacción'),
+        ('publicacion', 'Publicación'),
+    ]
+    
+    tipo = models.CharField(
+        max_length=20,
+        choices=TIPO_CHOICES,
+        help_text='Qué cambió'
+    )
+    
+    datos = models.JSONField(
+        help_text='Contenido del evento tal como se envía al navegador'
+    )
+    
+    fecha = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        help_text='Momento del cambio; las novedades viejas se depuran'
+    )
+    
+    class Meta:
+        verbose_name = 'Novedad'
+        verbose_name_plural = 'Novedades'
+        ordering = ['id']
+        db_table = 'novedades'
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.id}"
+
+
+class Difusion(models.Model):
+    """
+    Mensaje de la administración a muchos residentes a la vez. Se reparte en
+    segundo plano (usuarios.difusiones) como un Mensaje por destinatario, en
+    lotes; ultimo_destinatario es el cursor del reparto, así que una difusión
+    interrumpida se retoma sin duplicar mensajes.
+    """
+    DESTINO_CHOICES = [
+        ('todos', 'Todos los residentes'),
+        ('con_vehiculo', 'Residentes con vehículo'),
+        ('con_mascota', 'Residentes con mascota'),
+    ]
+    
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('enviando', 'Enviando'),
+        ('completada', 'Completada'),
+        ('fallida', 'Fallida'),
+    ]
+    
+    remitente = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        related_name='difusiones',
+        help_text='Administrador que envía la difusión'
+    )
+    
+    contenido = models.TextField(
+        help_text='Texto que recibe cada destinatario'
+    )
+    
+    destino = models.CharField(
+        max_length=20,
+        choices=DESTINO_CHOICES,
+        default='todos',
+        help_text='Grupo de residentes que la recibe'
+    )
+    
+    casa = models.CharField(
+        max_length=50,
+        blank=True,
+        help_text='Solo casas/departamentos que empiezan así (ej: "Dpto 3"); vacío = todas'
+    )
+    
+    estado = models.CharField(
+        max_length=20,
+        choices=ESTADO_CHOICES,
+        default='pendiente',
+        help_text='Estado del reparto'
+    )
+    
+    total = models.PositiveIntegerField(
+        default=0,
+        help_text='Destinatarios al iniciar el reparto'
+    )
+    
+    enviados = models.PositiveIntegerField(
+        default=0,
+        help_text='Mensajes ya creados'
+    )
+    
+    ultimo_destinatario = models.PositiveIntegerField(
+        default=0,
+        help_text='Id del último destinatario atendido; el reparto sigue desde ahí'
+    )
+    
+    error = models.TextField(
+        blank=True,
+        help_text='Motivo del fallo, si lo hubo'
+    )
+    
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True,
+        help_text='Fecha en que se creó la difusión'
+    )
+    
+    fecha_fin = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Fecha en que terminó el reparto'
+    )
+    
+    class Meta:
+        verbose_name = 'Difusión'
+        verbose_name_plural = 'Difusiones'
+        ordering = ['-fecha_creacion']
+        db_table = 'difusiones'
+    
+    def __str__(self):
+        return f"{self.get_destino_display()} - {self.fecha_creacion.strftime('%d/%m/%Y %H:%M')}"
+    
+    def destinatarios(self):
+        """Residentes activos que reciben la difusión."""
+        usuarios = Usuario.objects.filter(activo=True, rol='vecino', is_superuser=False).exclude(pk=self.remitente_id)
+        if self.destino == 'con_vehiculo':
+            usuarios = usuarios.filter(models.Exists(Vehiculo.objects.filter(usuario=models.OuterRef('pk'))))
+        elif self.destino == 'con_mascota':
+            usuarios = usuarios.filter(models.Exists(Mascota.objects.filter(usuario=models.OuterRef('pk'), activo=True)))
+        if self.casa:
+            usuarios = usuarios.filter(casa_departamento__istartswith=self.casa)
+        return usuarios
+    
+    @property
+    def porcentaje(self):
+        if self.estado == 'completada':
+            return 100
+        return self.enviados * 100 // self.total if self.total else 0
+
+
+class DocumentoBusqueda(models.Model):
+    """
+    Texto normalizado de una publicación o solicitud para la búsqueda de texto
+    completo (usuarios.busqueda). El índice lo crea la migración según el motor:
+    columna tsvector con GIN en PostgreSQL, tabla FTS5 en SQLite.
+    """
+    TIPO_CHOICES = [
+        ('publicacion', 'Publicación'),
+        ('solicitud', 'Solicitud'),
+    ]
+    
+    tipo = models.CharField(
+        max_length=20,
+        choices=TIPO_CHOICES,
+        help_text='Modelo del documento'
+    )
+    
+    objeto_id = models.PositiveBigIntegerField(
+        help_text='Id de la publicación o solicitud'
+    )
+    
+    titulo = models.TextField(
+        help_text='Palabras normalizadas del título (pesan más en el orden)'
+    )
+    
+    cuerpo = models.TextField(
+        help_text='Palabras normalizadas del contenido o la descripción'
+    )
+    
+    fecha = models.DateTimeField(
+        help_text='Fecha del documento, para desempatar resultados'
+    )
+    
+    class Meta:
+        verbose_name = 'Documento de búsqueda'
+        verbose_name_plural = 'Documentos de búsqueda'
+        db_table = 'busqueda_documentos'
+        constraints = [
+            models.UniqueConstraint(fields=['tipo', 'objeto_id'], name='documento_busqueda_unico'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.objeto_id}"
@@ -0,0 +1,239 @@
+"""
+Novedades en vivo del dashboard por Server-Sent Events.
+
+Las vistas registran cada cambio con publicar_novedad() dentro de su propia
+transacción. La tabla novedades es la fuente de verdad: su id es el id del
+evento SSE, así que reanudar con Last-Event-ID es un WHERE id > :ultimo.
+
+Los flujos abiertos no consultan la tabla. Un solo lector por proceso (por
+event loop) la lee cuando la capa de pub/sub (usuarios.pubsub) avisa de un
+cambio y reparte las filas nuevas en memoria a todos los flujos, así que un
+aviso cuesta una consulta sin importar cuántos navegadores estén conectados.
+Si el aviso no llega (otro worker u otro nodo), el lector igual revisa la tabla
+cada ESPERA_SEGUNDOS. Un flujo solo consulta al reanudar, para enviar lo que el
+cliente se perdió.
+"""
+import asyncio
+import json
+import logging
+import weakref
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Novedad
+from .pubsub import obtener_pubsub
+
+logger = logging.getLogger(__name__)
+
+CANAL = 'dashboard.novedades'
+
+# Espera máxima entre revisiones; también es el intervalo del latido que
+# mantiene la conexión abierta a través de proxies
+ESPERA_SEGUNDOS = 15
+LOTE = 100
+# Los ids se asignan al insertar pero se confirman en cualquier orden: se vuelven
+# a mirar los últimos para no saltarse una transacción que confirmó más tarde
+VENTANA_IDS = 20
+REINTENTO_MS = 3000
+# Novedades pendientes por flujo antes de considerarlo atascado
+TAMANO_COLA = 100
+
+RETENCION = timedelta(days=1)
+DEPURAR_CADA = 1000
+
+# Marcas que el lector deja en la cola de un flujo
+_RECARGAR = object()
+_FIN = object()
+
+
+def publicar_novedad(tipo, **datos):
+    """Registra una novedad en la transacción en curso y avisa a los flujos al confirmarse."""
+    novedad = Novedad.objects.create(tipo=tipo, datos=datos)
+    if novedad.id % DEPURAR_CADA == 0:
+        Novedad.objects.filter(fecha__lt=timezone.now() - RETENCION).delete()
+    transaction.on_commit(_avisar)
+    return novedad
+
+
+def _avisar():
+    async_to_sync(obtener_pubsub().publicar)(CANAL, {})
+
+
+def _evento_sse(novedad):
+    return f'id: {novedad.id}\nevent: {novedad.tipo}\ndata: {json.dumps(novedad.datos)}\n\n'
+
+
+async def _primer_id(orden):
+    return await Novedad.objects.order_by(orden).values_list('id', flat=True).afirst()
+
+
+class _Posicion:
+    """Hasta dónde se leyó la tabla: el mayor id y los ids recientes ya vistos."""
+
+    def __init__(self, ultimo_id):
+        self.ultimo_id = ultimo_id
+        self.vistos = set(range(ultimo_id - VENTANA_IDS + 1, ultimo_id + 1))
+
+    async def leer(self):
+        """Novedades confirmadas que aún no se vieron, en orden de id; una consulta por lote."""
+        while True:
+            leidas = [
+                novedad async for novedad in
+                Novedad.objects.filter(id__gt=self.ultimo_id - VENTANA_IDS).order_by('id')[:LOTE]
+            ]
+            for novedad in leidas:
+                if novedad.id not in self.vistos:
+                    self.vistos.add(novedad.id)
+                    self.ultimo_id = max(self.ultimo_id, novedad.id)
+                    yield novedad
+            self.vistos = {id_visto for id_visto in self.vistos if id_visto > self.ultimo_id - VENTANA_IDS}
+            if len(leidas) < LOTE:
+                return
+
+
+class _Repartidor:
+    """
+    Lector único de la tabla para los flujos de un event loop. Arranca con el
+    primer flujo y se detiene con el último.
+    """
+
+    def __init__(self):
+        self.colas = set()
+        self.tarea = None
+        self.listo = None
+
+    async def suscribir(self):
+        cola = asyncio.Queue(maxsize=TAMANO_COLA)
+        self.colas.add(cola)
+        if self.tarea is None:
+            self.listo = asyncio.get_running_loop().create_future()
+            self.tarea = asyncio.create_task(self._leer())
+        try:
+            # Lo que se confirme desde aquí llega por la cola
+            await asyncio.shield(self.listo)
+        except BaseException:
+            await self.desuscribir(cola)
+            raise
+        return cola
+
+    async def desuscribir(self, cola):
+        self.colas.discard(cola)
+        if self.colas or self.tarea is None:
+            return
+        tarea, self.tarea = self.tarea, None
+        tarea.cancel()
+        try:
+            await tarea
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            # Ya quedó en el log al fallar
+            pass
+
+    async def _leer(self):
+        pubsub = obtener_pubsub()
+        avisos = await pubsub.suscribir(CANAL)
+        listo = self.listo
+        try:
+            posicion = _Posicion(await _primer_id('-id') or 0)
+            listo.set_result(None)
+            while True:
+                try:
+                    await asyncio.wait_for(avisos.get(), ESPERA_SEGUNDOS)
+                except asyncio.TimeoutError:
+                    pass
+                # Varios avisos seguidos se atienden con una sola consulta
+                while not avisos.empty():
+                    avisos.get_nowait()
+                async for novedad in posicion.leer():
+                    self._repartir(novedad)
+        except asyncio.CancelledError:
+            if not listo.done():
+                listo.cancel()
+            raise
+        except Exception as e:
+            # Sin lector los flujos se cierran; EventSource reconecta y reanuda con Last-Event-ID
+            logger.exception('El lector de novedades se detuvo')
+            if not listo.done():
+                listo.set_exception(e)
+            if self.tarea is asyncio.current_task():
+                self.tarea = None
+            for cola in list(self.colas):
+                self._reemplazar(cola, _FIN)
+            raise
+        finally:
+            await pubsub.desuscribir(CANAL, avisos)
+
+    def _repartir(self, novedad):
+        for cola in list(self.colas):
+            try:
+                cola.put_nowait(novedad)
+            except asyncio.QueueFull:
+                # Un cliente que no lee no frena a los demás: recargará sus listas
+                logger.warning('Flujo de novedades atascado; se le pide recargar')
+                self._reemplazar(cola, _RECARGAR)
+
+    @staticmethod
+    def _reemplazar(cola, marca):
+        while not cola.empty():
+            cola.get_nowait()
+        cola.put_nowait(marca)
+
+
+_repartidores = weakref.WeakKeyDictionary()
+
+
+def _repartidor():
+    loop = asyncio.get_running_loop()
+    repartidor = _repartidores.get(loop)
+    if repartidor is None:
+        repartidor = _repartidores[loop] = _Repartidor()
+    return repartidor
+
+
+async def flujo_novedades(ultimo_id=None):
+    """
+    Generador asíncrono con el texto del flujo SSE. Sin ultimo_id empieza desde
+    ahora (el dashboard recién cargado ya está al día); con él, reenvía lo que
+    el cliente se perdió o le pide recargar si esas novedades ya se depuraron.
+    """
+    repartidor = _repartidor()
+    cola = await repartidor.suscribir()
+    try:
+        posicion = None
+        recargar = False
+        if ultimo_id is not None:
+            primero = await _primer_id('id')
+            if primero is not None and ultimo_id < primero - 1:
+                recargar = True
+            else:
+                posicion = _Posicion(ultimo_id)
+
+        yield f'retry: {REINTENTO_MS}\n\n'
+        if recargar:
+            yield 'event: recargar\ndata: {}\n\n'
+
+        # Lo perdido en el corte; las que también reparta el lector no se repiten
+        enviadas = set()
+        if posicion is not None:
+            async for novedad in posicion.leer():
+                enviadas.add(novedad.id)
+                yield _evento_sse(novedad)
+
+        while True:
+            try:
+                novedad = await asyncio.wait_for(cola.get(), ESPERA_SEGUNDOS)
+            except asyncio.TimeoutError:
+                yield ': latido\n\n'
+                continue
+            if novedad is _FIN:
+                return
+            if novedad is _RECARGAR:
+                yield 'event: recargar\ndata: {}\n\n'
+            elif novedad.id not in enviadas:
+                yield _evento_sse(novedad)
+    finally:
+        await repartidor.desuscribir(cola)
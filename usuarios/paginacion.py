@@ -0,0 +1,179 @@
+"""
+Paginación por cursor (keyset) sobre (fecha, id).
+
+En lugar de OFFSET, cada página se pide "después" del último elemento visto:
+    WHERE fecha < :fecha OR (fecha = :fecha AND id < :id)
+    ORDER BY fecha DESC, id DESC
+    LIMIT :tamano + 1
+Así la página 200 cuesta lo mismo que la primera y los cursores siguen siendo
+estables aunque se creen registros nuevos mientras se navega. Las listas
+alfabéticas (vecinos por casa y apellido) usan paginar_por_campos, el mismo
+esquema en orden ascendente sobre varios campos.
+
+El admin sigue paginando con OFFSET, pero con PaginadorConteoEstimado para no
+contar la tabla entera en cada lista.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connection
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# Por debajo de esto COUNT(*) es barato y la estimación del motor, poco fiable
+MIN_FILAS_ESTIMADAS = 10_000
+
+
+class CursorInvalido(ValueError):
+    """El cursor recibido no se puede decodificar."""
+
+
+def codificar_cursor(fecha, pk):
+    """Convierte (fecha, id) en un cursor opaco apto para URLs."""
+    crudo = f'{fecha.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Devuelve la tupla (fecha, id) codificada en el cursor."""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        crudo = base64.urlsafe_b64decode(cursor + relleno).decode()
+        fecha, pk = crudo.split('|')
+        return datetime.fromisoformat(fecha), int(pk)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise CursorInvalido(cursor) from e
+
+
+def codificar_cursor_campos(valores):
+    """Convierte los valores de los campos de orden (texto e id) en un cursor opaco."""
+    crudo = json.dumps(valores, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip('=')
+
+
+def decodificar_cursor_campos(cursor, cantidad):
+    """Devuelve la lista de cantidad valores codificada en el cursor."""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno).decode())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise CursorInvalido(cursor) from e
+    if (
+        not isinstance(valores, list) or len(valores) != cantidad
+        or not all(isinstance(valor, str) for valor in valores[:-1]) or type(valores[-1]) is not int
+    ):
+        raise CursorInvalido(cursor)
+    return valores
+
+
+def _pagina(queryset, campo_fecha, cursor, limite):
+    queryset = queryset.order_by(f'-{campo_fecha}', '-pk')
+
+    if cursor:
+        fecha, pk = cursor
+        queryset = queryset.filter(
+            Q(**{f'{campo_fecha}__lt': fecha}) |
+            Q(**{campo_fecha: fecha, 'pk__lt': pk})
+        )
+    return list(queryset[:limite])
+
+
+def paginar_keyset(queryset, campo_fecha, cursor=None, tamano=20):
+    """
+    Devuelve (items, siguiente_cursor) para el queryset ordenado por campo_fecha e id
+    descendentes. siguiente_cursor es None cuando no hay más resultados.
+
+    queryset también puede ser una lista de querysets disjuntos del mismo modelo
+    (por ejemplo los dos lados de un OR): cada uno se pagina con su propio índice
+    y las páginas se mezclan en memoria, en lugar de ordenar todas las filas del OR.
+    """
+    if cursor:
+        cursor = decodificar_cursor(cursor)
+
+    if isinstance(queryset, (list, tuple)):
+        items = sorted(
+            (item for parte in queryset for item in _pagina(parte, campo_fecha, cursor, tamano + 1)),
+            key=lambda item: (getattr(item, campo_fecha), item.pk),
+            reverse=True,
+        )[:tamano + 1]
+    else:
+        items = _pagina(queryset, campo_fecha, cursor, tamano + 1)
+
+    if len(items) <= tamano:
+        return items, None
+
+    items = items[:tamano]
+    ultimo = items[-1]
+    return items, codificar_cursor(getattr(ultimo, campo_fecha), ultimo.pk)
+
+
+def paginar_por_campos(queryset, campos, cursor=None, tamano=20):
+    """
+    Devuelve (items, siguiente_cursor) para el queryset ordenado por campos e id
+    ascendentes, por ejemplo ('casa', 'last_name'). Los campos son de texto y sin
+    NULL (el orden de NULL cambia entre motores): los que admiten NULL se anotan
+    antes con Coalesce.
+    """
+    nombres = [*campos, 'pk']
+    queryset = queryset.order_by(*nombres)
+
+    if cursor:
+        valores = decodificar_cursor_campos(cursor, len(nombres))
+        # (a, b, id) > (x, y, pk): a > x OR (a = x AND b > y) OR (a = x AND b = y AND id > pk)
+        despues = Q()
+        for i, nombre in enumerate(nombres):
+            despues |= Q(**dict(zip(nombres[:i], valores[:i])), **{f'{nombre}__gt': valores[i]})
+        queryset = queryset.filter(despues)
+
+    items = list(queryset[:tamano + 1])
+    if len(items) <= tamano:
+        return items, None
+
+    items = items[:tamano]
+    ultimo = items[-1]
+    return items, codificar_cursor_campos([getattr(ultimo, nombre) for nombre in nombres])
+
+
+def filas_estimadas(modelo):
+    """
+    Número de filas de la tabla según las estadísticas del motor (PostgreSQL:
+    pg_class.reltuples; SQLite: sqlite_stat1 tras ANALYZE), sin recorrerla.
+    None si el motor no tiene estimación.
+    """
+    tabla = modelo._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [tabla])
+            elif connection.vendor == 'sqlite':
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [tabla])
+            else:
+                return None
+            fila = cursor.fetchone()
+    except DatabaseError:
+        # SQLite sin ANALYZE no tiene sqlite_stat1
+        return None
+    if fila is None:
+        return None
+    # reltuples es -1 si la tabla nunca se analizó
+    filas = int(str(fila[0]).split()[0])
+    return filas if filas >= 0 else None
+
+
+class PaginadorConteoEstimado(Paginator):
+    """
+    Paginator para el admin: la lista sin filtros de una tabla grande usa las
+    filas estimadas por el motor en lugar de COUNT(*), que en PostgreSQL
+    recorre la tabla completa. Con filtros o búsqueda cuenta de verdad.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimado = filas_estimadas(self.object_list.model)
+            if estimado is not None and estimado >= MIN_FILAS_ESTIMADAS:
+                return estimado
+        return super().count
@@ -0,0 +1,132 @@
+"""
+Índice de placas en memoria para la consulta en la garita.
+
+Las placas se comparan normalizadas (mayúsculas, sin guiones ni espacios:
+"abc-1234" y "ABC 1234" son "ABC1234"); Vehiculo.placa_normalizada guarda esa
+forma para que la base de datos impida los duplicados con otro formato.
+
+La consulta tolera errores de digitación con un índice de borrados (como
+SymSpell): cada placa se registra junto con todas sus variantes con hasta
+MAX_ERRORES caracteres borrados; una placa escrita con hasta MAX_ERRORES errores
+comparte alguna variante con la registrada, así que basta buscar las variantes
+de la consulta en un diccionario y confirmar las candidatas con la distancia de
+edición. Son unas 30 entradas por placa: pensado para los vehículos de un
+conjunto, no para un registro nacional.
+
+El índice vive en cada proceso y se reconstruye cuando cambia la versión del
+grupo 'vehiculos' de usuarios.cache_dashboard, que las señales cambian al
+guardar o borrar un vehículo.
+"""
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+from django.apps import apps
+
+from .cache_dashboard import version
+
+# _borrados() llega hasta dos
+MAX_ERRORES = 2
+MAX_RESULTADOS = 10
+# Con menos caracteres por error cualquier placa corta coincidiría con todo
+CARACTERES_POR_ERROR = 3
+CAMPOS = ('id', 'placa', 'dueno', 'numero_casa', 'marca', 'modelo', 'color')
+
+_candado = threading.Lock()
+_indice = None
+_version = None
+
+
+def normalizar_placa(texto):
+    """'abc-1234' -> 'ABC1234'."""
+    sin_tildes = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode()
+    return re.sub(r'[^A-Z0-9]', '', sin_tildes.upper())
+
+
+def errores_permitidos(placa):
+    return min(MAX_ERRORES, (len(placa) - 1) // CARACTERES_POR_ERROR)
+
+
+def _borrados(placa, maximo):
+    """placa y sus variantes con hasta maximo (0, 1 o 2) caracteres borrados."""
+    n = len(placa)
+    variantes = {placa}
+    if maximo >= 1:
+        variantes.update(placa[:i] + placa[i + 1:] for i in range(n))
+    if maximo >= 2:
+        variantes.update(placa[:i] + placa[i + 1:j] + placa[j + 1:] for i in range(n) for j in range(i + 1, n))
+    return variantes
+
+
+def distancia(a, b, maximo):
+    """
+    Distancia de edición con transposiciones de letras vecinas ("ABC" ->
+    "BAC" es un error). Devuelve maximo + 1 en cuanto sabe que la supera.
+    """
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+    anterior, actual = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        antepenultima, anterior, actual = anterior, actual, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            costo = a[i - 1] != b[j - 1]
+            actual[j] = min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + costo)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                actual[j] = min(actual[j], antepenultima[j - 2] + 1)
+        if min(actual) > maximo:
+            return maximo + 1
+    return actual[-1]
+
+
+class IndicePlacas:
+    """Vehículos por placa normalizada, con búsqueda tolerante a errores."""
+
+    def __init__(self, vehiculos):
+        self._vehiculos = defaultdict(list)
+        # Tuplas y no conjuntos: casi todas las variantes son de una sola placa
+        self._variantes = {}
+        for vehiculo in vehiculos:
+            placa = normalizar_placa(vehiculo['placa'])
+            if placa not in self._vehiculos:
+                for variante in _borrados(placa, MAX_ERRORES):
+                    self._variantes[variante] = self._variantes.get(variante, ()) + (placa,)
+            self._vehiculos[placa].append(vehiculo)
+
+    def __len__(self):
+        return sum(len(vehiculos) for vehiculos in self._vehiculos.values())
+
+    def buscar(self, texto, limite=MAX_RESULTADOS):
+        """
+        [(errores, vehiculo)] de las placas a MAX_ERRORES o menos de texto, de la
+        más a la menos parecida.
+        """
+        consulta = normalizar_placa(texto)
+        if not consulta:
+            return []
+        maximo = errores_permitidos(consulta)
+        candidatas = set()
+        for variante in _borrados(consulta, maximo):
+            candidatas.update(self._variantes.get(variante, ()))
+        encontradas = sorted(
+            (errores, placa) for placa in candidatas
+            if (errores := distancia(consulta, placa, maximo)) <= maximo
+        )
+        return [(errores, vehiculo) for errores, placa in encontradas for vehiculo in self._vehiculos[placa]][:limite]
+
+
+def indice():
+    """El índice del proceso, reconstruido si algún vehículo cambió desde la última vez."""
+    global _indice, _version
+    actual = version('vehiculos')
+    if _indice is None or actual != _version:
+        with _candado:
+            if _indice is None or actual != _version:
+                Vehiculo = apps.get_model('usuarios', 'Vehiculo')
+                _indice = IndicePlacas(Vehiculo.objects.values(*CAMPOS).iterator(chunk_size=2000))
+                _version = actual
+    return _indice
+
+
+def buscar_placa(texto, limite=MAX_RESULTADOS):
+    return indice().buscar(texto, limite)
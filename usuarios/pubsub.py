@@ -0,0 +1,81 @@
+"""
+Capa de publicación/suscripción del chat.
+
+El chat no conoce el transporte: publica diccionarios en canales con nombre
+("chat.usuario.15") y cada conexión WebSocket se suscribe al canal de su usuario.
+La implementación se elige con settings.CHAT_PUBSUB, de modo que PubSubMemoria
+(un solo proceso) se puede cambiar por una sobre Redis u otro broker con la misma
+interfaz cuando el sitio corra en varios nodos.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+_instancia = None
+
+
+class PubSubMemoria:
+    """
+    Pub/sub dentro del proceso: cada suscripción es una asyncio.Queue, así que
+    publicar es un put_nowait por suscriptor, sin hilos ni red.
+    Debe usarse desde el event loop del servidor ASGI.
+    """
+
+    # Mensajes pendientes por conexión antes de considerarla atascada
+    TAMANO_COLA = 100
+
+    def __init__(self):
+        self._suscriptores = defaultdict(set)
+        self._loop = None
+
+    async def suscribir(self, canal):
+        self._loop = asyncio.get_running_loop()
+        cola = asyncio.Queue(maxsize=self.TAMANO_COLA)
+        self._suscriptores[canal].add(cola)
+        return cola
+
+    async def desuscribir(self, canal, cola):
+        colas = self._suscriptores.get(canal)
+        if colas is None:
+            return
+        colas.discard(cola)
+        if not colas:
+            del self._suscriptores[canal]
+
+    async def publicar(self, canal, mensaje):
+        self._repartir(canal, mensaje)
+
+    def publicar_desde_hilo(self, canal, mensaje):
+        """
+        publicar() para código que corre fuera del event loop, como las tareas en
+        segundo plano: las colas no son seguras entre hilos, así que el reparto se
+        agenda en el loop de los suscriptores.
+        """
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._repartir, canal, mensaje)
+
+    def _repartir(self, canal, mensaje):
+        for cola in list(self._suscriptores.get(canal, ())):
+            try:
+                cola.put_nowait(mensaje)
+            except asyncio.QueueFull:
+                # Un cliente que no lee no debe frenar a los demás; recuperará el
+                # historial por HTTP al reconectarse
+                logger.warning('Cola llena en el canal %s; se descarta un mensaje', canal)
+
+
+def obtener_pubsub():
+    """Instancia única (por proceso) de la implementación configurada."""
+    global _instancia
+    if _instancia is None:
+        _instancia = import_string(getattr(settings, 'CHAT_PUBSUB', 'usuarios.pubsub.PubSubMemoria'))()
+    return _instancia
+
+
+def canal_usuario(usuario_id):
+    return f'chat.usuario.{usuario_id}'
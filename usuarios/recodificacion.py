@@ -0,0 +1,161 @@
+"""
+Recodificación de las imágenes subidas, sin dependencias de Django.
+
+Corre en el pool de procesos de usuarios.tareas: recibe los bytes del archivo
+original y devuelve los del JPEG final, sin tocar la base de datos ni el
+almacenamiento. Por eso este módulo solo importa Pillow.
+
+La memoria por imagen está acotada: el archivo y sus píxeles tienen límite
+(BYTES_MAXIMOS, PIXELES_MAXIMOS, revisados también al subir), un JPEG se
+decodifica ya reducido cuando el resultado no necesita la resolución completa,
+y se recorta antes de enderezar y convertir.
+"""
+import io
+import math
+
+from PIL import Image
+
+LADO_MAXIMO = 1600
+# Una foto de celular ronda los 12-50 MP y 3-15 MB
+BYTES_MAXIMOS = 20 * 1024 * 1024
+PIXELES_MAXIMOS = 60_000_000
+CALIDAD_JPEG = 90
+# El recorte llega en coordenadas del contenedor de 300x300 px del formulario
+LADO_VISTA_PREVIA = 300
+
+# Orientación EXIF -> transposición que endereza la imagen (como ImageOps.exif_transpose)
+ORIENTACION_EXIF = 0x0112
+TRANSPOSICIONES = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+# Anchos de las versiones reducidas que usan las tarjetas (srcset) y sus formatos
+ANCHOS_DERIVADAS = (320, 640, 960)
+FORMATOS_DERIVADAS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def caja_de_recorte(recorte, ancho, alto):
+    """
+    Convierte el recorte hecho sobre la vista previa a píxeles de la imagen,
+    dentro de sus límites. None si el área queda vacía.
+    """
+    escala_x = ancho / LADO_VISTA_PREVIA
+    escala_y = alto / LADO_VISTA_PREVIA
+    izquierda = max(0, min(int(recorte['left'] * escala_x), ancho))
+    arriba = max(0, min(int(recorte['top'] * escala_y), alto))
+    derecha = max(0, min(int((recorte['left'] + recorte['width']) * escala_x), ancho))
+    abajo = max(0, min(int((recorte['top'] + recorte['height']) * escala_y), alto))
+    if derecha <= izquierda or abajo <= arriba:
+        return None
+    return izquierda, arriba, derecha, abajo
+
+
+def comprobar_peso(tamano):
+    """Lanza ValueError si un archivo de tamano bytes excede BYTES_MAXIMOS."""
+    if tamano > BYTES_MAXIMOS:
+        raise ValueError(f'La imagen pesa más de {BYTES_MAXIMOS // (1024 * 1024)} MB.')
+
+
+def abrir(archivo):
+    """
+    Abre la imagen sin decodificarla (solo lee la cabecera) y comprueba que no
+    exceda PIXELES_MAXIMOS. Lanza ValueError si no es una imagen admitida.
+    """
+    try:
+        imagen = Image.open(archivo)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError('El archivo no es una imagen válida.') from e
+    if imagen.width * imagen.height > PIXELES_MAXIMOS:
+        raise ValueError(
+            f'La imagen tiene {imagen.width}x{imagen.height} px; '
+            f'el máximo es {PIXELES_MAXIMOS // 1_000_000} megapíxeles.'
+        )
+    return imagen
+
+
+def caja_sin_enderezar(caja, orientacion, ancho, alto):
+    """
+    Lleva una caja en coordenadas de la imagen enderezada a las del archivo tal
+    como está guardado (de ancho x alto px), según su orientación EXIF.
+    """
+    def punto(x, y):
+        return {
+            2: (ancho - x, y),
+            3: (ancho - x, alto - y),
+            4: (x, alto - y),
+            5: (y, x),
+            6: (y, alto - x),
+            7: (ancho - y, alto - x),
+            8: (ancho - y, x),
+        }.get(orientacion, (x, y))
+
+    (x1, y1), (x2, y2) = punto(caja[0], caja[1]), punto(caja[2], caja[3])
+    return min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+
+
+def recodificar(datos, recorte=None):
+    """
+    Endereza la imagen según su orientación EXIF (la vista previa del navegador
+    ya la muestra así), aplica el recorte, la limita a LADO_MAXIMO y la codifica
+    en JPEG. Devuelve los bytes del resultado.
+    """
+    comprobar_peso(len(datos))
+    # Sin "with": el bloque retendría la imagen completa hasta el final
+    imagen = abrir(io.BytesIO(datos))
+    orientacion = imagen.getexif().get(ORIENTACION_EXIF)
+    girada = orientacion in (5, 6, 7, 8)
+
+    def tamano_enderezada():
+        return (imagen.height, imagen.width) if girada else imagen.size
+
+    caja = caja_de_recorte(recorte, *tamano_enderezada()) if recorte else None
+    lado = max(caja[2] - caja[0], caja[3] - caja[1]) if caja else max(imagen.size)
+    if lado > LADO_MAXIMO:
+        # Con JPEG, decodifica a 1/2, 1/4 u 1/8 si así alcanza para el resultado
+        escala = LADO_MAXIMO / lado
+        imagen.draft(None, (math.ceil(imagen.width * escala), math.ceil(imagen.height * escala)))
+        if caja:
+            caja = caja_de_recorte(recorte, *tamano_enderezada())
+
+    # Recortar antes de enderezar y convertir: esas copias son solo de la región
+    if caja:
+        imagen = imagen.crop(caja_sin_enderezar(caja, orientacion, imagen.width, imagen.height))
+    if orientacion in TRANSPOSICIONES:
+        imagen = imagen.transpose(TRANSPOSICIONES[orientacion])
+    imagen.thumbnail((LADO_MAXIMO, LADO_MAXIMO))
+    if imagen.mode != 'RGB':
+        imagen = imagen.convert('RGB')
+
+    salida = io.BytesIO()
+    imagen.save(salida, format='JPEG', quality=CALIDAD_JPEG, optimize=True)
+    return salida.getvalue()
+
+
+def derivadas(datos):
+    """
+    Versiones reducidas de una imagen ya recodificada: un dict
+    {(ancho, extension): bytes} con cada ancho de ANCHOS_DERIVADAS en cada
+    formato de FORMATOS_DERIVADAS. No se amplía: si la imagen es más angosta,
+    esa versión queda de su tamaño.
+    """
+    resultado = {}
+    with Image.open(io.BytesIO(datos)) as imagen:
+        imagen.load()
+        # De la más ancha a la más angosta, reduciendo cada una desde la anterior
+        for ancho in sorted(ANCHOS_DERIVADAS, reverse=True):
+            if imagen.width > ancho:
+                imagen = imagen.resize((ancho, max(1, round(imagen.height * ancho / imagen.width))), Image.LANCZOS)
+            for extension, (formato, opciones) in FORMATOS_DERIVADAS.items():
+                salida = io.BytesIO()
+                imagen.save(salida, format=formato, **opciones)
+                resultado[(ancho, extension)] = salida.getvalue()
+    return resultado
@@ -0,0 +1,142 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import busqueda
+from .cache_dashboard import invalidar
+from .imagenes import encolar_borrado, encolar_subidas, marcar_subidas, recordar_cargadas
+from .models import Evento, Solicitud, Mascota, Vehiculo, Publicacion, ReaccionSolicitud, Usuario
+
+
+@receiver([post_save, post_delete], sender=Evento)
+def invalidar_eventos(sender, instance, **kwargs):
+    invalidar('eventos')
+
+
+@receiver([post_save, post_delete], sender=Solicitud)
+def invalidar_solicitudes(sender, instance, **kwargs):
+    invalidar('solicitudes')
+    invalidar('solicitudes', instance.usuario_id)
+
+
+def _contar_reaccion(reaccion, delta):
+    """
+    Suma delta a Solicitud.total_reacciones en la misma transacción que la
+    reacción, sin importar desde dónde se crea o borra (la vista, el admin,
+    una cascada, el shell).
+    """
+    Solicitud.objects.filter(pk=reaccion.solicitud_id).update(total_reacciones=F('total_reacciones') + delta)
+    if ReaccionSolicitud.solicitud.is_cached(reaccion):
+        autor_id = reaccion.solicitud.usuario_id
+        transaction.on_commit(lambda: invalidar('solicitudes', autor_id))
+    else:
+        # Sin consultar el autor de cada una: se invalidan las listas propias de todos
+        transaction.on_commit(lambda: invalidar('solicitudes_lote'))
+
+
+@receiver(post_save, sender=ReaccionSolicitud)
+def sumar_reaccion(sender, instance, created, raw=False, **kwargs):
+    # Un fixture (loaddata) trae el contador ya calculado
+    if created and not raw:
+        _contar_reaccion(instance, 1)
+
+
+def _borrado_desde(origin, modelo):
+    """Si el borrado empezó en una instancia o un queryset de modelo."""
+    return isinstance(origin, modelo) or getattr(origin, 'model', None) is modelo
+
+
+@receiver(post_delete, sender=ReaccionSolicitud)
+def descontar_reaccion(sender, instance, origin=None, **kwargs):
+    # Si se borra la solicitud, sus reacciones caen en cascada: no hay contador que corregir.
+    # Las de un usuario borrado ya las descontó descontar_reacciones_de_usuario
+    if _borrado_desde(origin, Solicitud) or _borrado_desde(origin, Usuario):
+        return
+    _contar_reaccion(instance, -1)
+
+
+@receiver(pre_delete, sender=Usuario)
+def descontar_reacciones_de_usuario(sender, instance, **kwargs):
+    # Un solo UPDATE para todas sus reacciones, antes de que caigan en cascada
+    if Solicitud.objects.filter(reacciones__usuario=instance).update(total_reacciones=F('total_reacciones') - 1):
+        transaction.on_commit(lambda: invalidar('solicitudes_lote'))
+
+
+@receiver([post_save, post_delete], sender=Mascota)
+def invalidar_mascotas(sender, instance, **kwargs):
+    invalidar('mascotas')
+
+
+@receiver([post_save, post_delete], sender=Vehiculo)
+def invalidar_vehiculos(sender, instance, **kwargs):
+    invalidar('vehiculos')
+    invalidar('vehiculos', instance.usuario_id)
+
+
+@receiver([post_save, post_delete], sender=Publicacion)
+def invalidar_publicaciones(sender, instance, **kwargs):
+    invalidar('publicaciones')
+
+
+@receiver([post_save, post_delete], sender=Usuario)
+def invalidar_usuarios(sender, instance, update_fields=None, **kwargs):
+    # El login solo actualiza last_login; no cambia nada de lo que se muestra
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    invalidar('vecinos')
+    # Mascotas y vehículos muestran el nombre de quien los registró
+    invalidar('mascotas')
+    invalidar('vehiculos')
+
+
+@receiver(post_save, sender=Usuario)
+def sincronizar_eventos_globales(sender, instance, created, update_fields=None, **kwargs):
+    # Evento.es_global copia el rol del autor: actualizarlo si el rol cambia
+    if created or (update_fields is not None and 'rol' not in update_fields):
+        return
+    es_admin = instance.rol == 'admin'
+    if Evento.objects.filter(usuario=instance).exclude(es_global=es_admin).update(es_global=es_admin):
+        invalidar('eventos')
+
+
+@receiver(post_init, sender=Usuario)
+@receiver(post_init, sender=Mascota)
+@receiver(post_init, sender=Publicacion)
+def recordar_imagenes_cargadas(sender, instance, **kwargs):
+    recordar_cargadas(instance)
+
+
+@receiver(pre_save, sender=Usuario)
+@receiver(pre_save, sender=Mascota)
+@receiver(pre_save, sender=Publicacion)
+def marcar_imagenes_subidas(sender, instance, update_fields=None, **kwargs):
+    marcar_subidas(instance, update_fields)
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_save, sender=Mascota)
+@receiver(post_save, sender=Publicacion)
+def procesar_imagenes_subidas(sender, instance, **kwargs):
+    # El archivo se guardó tal como llegó; se recodifica en segundo plano
+    encolar_subidas(instance)
+
+
+@receiver(post_delete, sender=Usuario)
+@receiver(post_delete, sender=Mascota)
+@receiver(post_delete, sender=Publicacion)
+def borrar_derivadas(sender, instance, **kwargs):
+    # Las versiones reducidas no sirven sin el registro
+    encolar_borrado(instance)
+
+
+@receiver(post_save, sender=Publicacion)
+@receiver(post_save, sender=Solicitud)
+def indexar_para_busqueda(sender, instance, update_fields=None, **kwargs):
+    busqueda.al_guardar(instance, update_fields)
+
+
+@receiver(post_delete, sender=Publicacion)
+@receiver(post_delete, sender=Solicitud)
+def quitar_de_busqueda(sender, instance, **kwargs):
+    busqueda.al_borrar(instance)
@@ -0,0 +1,93 @@
+"""
+Tareas en segundo plano dentro del proceso web.
+
+El proyecto no tiene una cola de trabajos aparte: el trabajo largo que dispara
+una petición (repartir una difusión, procesar una imagen subida) se entrega, al
+confirmarse la transacción, a un pool pequeño de hilos del mismo proceso, y la
+respuesta sale de inmediato. Cada tarea guarda su estado en la base de datos,
+de modo que se puede consultar desde otra petición.
+
+El trabajo de CPU puro (decodificar y recodificar imágenes, calcular los hashes
+de una importación de residentes) pasa además por un pool de procesos con
+en_proceso() o en_procesos(), para no competir por el GIL con los hilos que
+atienden peticiones.
+
+Con TAREAS_EN_SEGUNDO_PLANO = False (pruebas) todo corre en el mismo hilo al
+confirmarse la transacción.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_candado = threading.Lock()
+_hilos = None
+_procesos = None
+
+
+def _obtener_hilos():
+    global _hilos
+    with _candado:
+        if _hilos is None:
+            _hilos = ThreadPoolExecutor(max_workers=settings.TAREAS_HILOS, thread_name_prefix='tarea')
+    return _hilos
+
+
+def _obtener_procesos():
+    global _procesos
+    with _candado:
+        if _procesos is None:
+            # spawn y no fork: copiar un proceso con hilos (el servidor) puede heredar candados tomados
+            _procesos = ProcessPoolExecutor(
+                max_workers=settings.TAREAS_PROCESOS, mp_context=multiprocessing.get_context('spawn')
+            )
+    return _procesos
+
+
+def _ejecutar(funcion, args):
+    # Cada hilo del pool tiene su propia conexión: se trata como una petición más
+    close_old_connections()
+    try:
+        funcion(*args)
+    except Exception:
+        logger.exception('Falló la tarea en segundo plano %s', funcion.__name__)
+    finally:
+        close_old_connections()
+
+
+def encolar(funcion, *args):
+    """Ejecuta funcion(*args) fuera de la petición cuando se confirme la transacción en curso."""
+    if not settings.TAREAS_EN_SEGUNDO_PLANO:
+        transaction.on_commit(lambda: funcion(*args))
+        return
+    transaction.on_commit(lambda: _obtener_hilos().submit(_ejecutar, funcion, args))
+
+
+def en_proceso(funcion, *args):
+    """
+    Ejecuta en el pool de procesos una función de CPU pura y espera su resultado.
+    funcion y sus argumentos deben poder serializarse, y su módulo no debe
+    importar Django (el proceso hijo no lo inicializa).
+    """
+    if not settings.TAREAS_EN_SEGUNDO_PLANO:
+        return funcion(*args)
+    return _obtener_procesos().submit(funcion, *args).result()
+
+
+def en_procesos(funcion, argumentos):
+    """
+    Como en_proceso(), para muchas llamadas: reparte funcion(*args) de cada
+    tupla de argumentos entre los procesos del pool y devuelve los resultados
+    en el mismo orden.
+    """
+    argumentos = list(argumentos)
+    if not settings.TAREAS_EN_SEGUNDO_PLANO or not argumentos:
+        return [funcion(*args) for args in argumentos]
+    # Bloques grandes para no pagar un viaje entre procesos por llamada
+    bloque = max(1, len(argumentos) // (settings.TAREAS_PROCESOS * 4))
+    return list(_obtener_procesos().map(funcion, *zip(*argumentos), chunksize=bloque))
@@ -1,4 +1,7 @@
 from django import template
+from django.utils.html import format_html, format_html_join
+
+from usuarios.imagenes import srcset
 
 register = template.Library()
 
@@ -18,5 +21,28 @@ def user_reacted(solicitud, user):
     """
     Filtro para verificar si un usuario ha reaccionado a una solicitud.
     Uso: {% if solicitud|user_reacted:user %}...{% endif %}
+    Si la solicitud viene anotada con con_reacciones() no se consulta la base de datos.
     """
+    if hasattr(solicitud, 'reaccionada_por_usuario'):
+        return solicitud.reaccionada_por_usuario
     return solicitud.reacciones.filter(usuario=user).exists()
+
+
+
+@register.simple_tag
+def imagen_responsiva(imagen, alt='', sizes='(max-width: 768px) 100vw, 50vw', **atributos):
+    """
+    Imagen con sus versiones reducidas (usuarios.imagenes) en WebP y JPEG, para
+    que el navegador descargue la que corresponde al ancho de la tarjeta.
+    Uso: {% imagen_responsiva mascota.foto mascota.nombre %}
+    Los argumentos con nombre adicionales pasan como atributos del <img>.
+    """
+    return format_html(
+        '<picture class="imagen-responsiva">'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" loading="lazy" decoding="async"{}>'
+        '</picture>',
+        srcset(imagen, 'webp'), sizes,
+        imagen.url, srcset(imagen, 'jpg'), sizes, alt,
+        format_html_join('', ' {}="{}"', atributos.items()),
+    )
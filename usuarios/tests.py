@@ -1,3 +1,1621 @@
-from django.test import TestCase
+"""
+Pruebas de las vistas de usuarios.
 
-# Create your tests here.
+PresupuestoRendimientoTests siembra un conjunto de datos parecido al de
+producción (miles de usuarios, decenas de miles de solicitudes y reacciones) y
+recorre cada ruta de usuarios/urls.py como administrador y como residente,
+comprobando un máximo de consultas SQL y de tiempo por vista. Si vuelve un N+1
+en los dashboards o en los endpoints JSON, la prueba falla tanto en SQLite como
+en PostgreSQL. Cada funcionalidad (chat, novedades, difusiones, imágenes,
+búsqueda, admin, importación...) tiene además su propia clase, con solo los
+datos que necesita.
+
+Los presupuestos de consultas y el uso de índices son deterministas y se
+comprueban siempre. Los de tiempo dependen de la máquina, así que solo se
+comprueban con la variable de entorno MEDIR_TIEMPOS=1 (en una máquina dedicada
+a medir, no en cada corrida de CI); en máquinas lentas se pueden escalar con
+PRESUPUESTO_TIEMPO_FACTOR (por ejemplo 3).
+"""
+import asyncio
+import contextlib
+import csv
+import io
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+from django.template import Context, Template
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .chat import chat_websocket
+from .imagenes import eliminar_derivadas, nombre_derivada
+from .metricas import MetricasMiddleware, exportar_prometheus
+from .novedades import _Posicion
+from .busqueda import buscar, normalizar
+from .calendario import eventos_del_mes, eventos_por_dia, rango_mes
+from .exportacion import csv_por_partes, filas, xlsx_por_partes
+from .importacion import hashear
+from .placas import IndicePlacas, normalizar_placa
+from .cache_dashboard import version
+from .models import Evento, Solicitud, Usuario, Mascota, Publicacion, Vehiculo, ReaccionSolicitud, Mensaje, Conversacion, Difusion, DocumentoBusqueda, Novedad
+from .recodificacion import ANCHOS_DERIVADAS, FORMATOS_DERIVADAS, PIXELES_MAXIMOS
+from .urls import urlpatterns
+
+NUM_USUARIOS = 2000
+NUM_SOLICITUDES = 20000
+NUM_REACCIONES = 30000
+NUM_MASCOTAS = 3000
+NUM_VEHICULOS = 2000
+NUM_PUBLICACIONES = 500
+NUM_EVENTOS = 300
+NUM_MENSAJES = 5000
+
+CLAVE = 'Clave-Segura-2026'
+
+# Milisegundos por petición; solo se comprueban con MEDIR_TIEMPOS=1
+MEDIR_TIEMPOS = os.environ.get('MEDIR_TIEMPOS') == '1'
+FACTOR_TIEMPO = float(os.environ.get('PRESUPUESTO_TIEMPO_FACTOR', 1))
+PRESUPUESTO_TIEMPO_MS = 300
+PRESUPUESTO_TIEMPO_RUTA_MS = {
+    # Dibuja la tabla completa de usuarios: crece con su número, no con las consultas
+    'lista_usuarios': 1500,
+}
+# Desde que un usuario envía un mensaje por el chat hasta que el otro lo recibe
+PRESUPUESTO_CHAT_MS = 50
+# Difusión a todos los residentes sembrados, desde la petición hasta el último lote
+PRESUPUESTO_DIFUSION_MS = 3000
+# Memoria pico (MB sobre la del proceso) al recodificar una foto de 24 MP sin recorte
+PRESUPUESTO_MEMORIA_FOTO_MB = 60
+# Búsqueda de texto completo sobre NUM_DOCUMENTOS_BUSQUEDA documentos
+NUM_DOCUMENTOS_BUSQUEDA = 100_000
+PRESUPUESTO_BUSQUEDA_MS = 50
+# Consulta de una placa en el índice en memoria (promedio), con NUM_PLACAS_GARITA placas reales
+NUM_PLACAS_GARITA = 5000
+PRESUPUESTO_PLACA_MS = 1
+# Listas y formularios del admin con NUM_USUARIOS_ADMIN usuarios
+NUM_USUARIOS_ADMIN = 10_000
+PRESUPUESTO_ADMIN_MS = 200
+MAX_CONSULTAS_ADMIN = 8
+# Cerrar las pendientes después de una asamblea, en una sola petición
+NUM_SOLICITUDES_LOTE = 300
+# Un intento de login bloqueado no busca al usuario ni calcula el hash (PBKDF2 ronda los 500 ms)
+PRESUPUESTO_LOGIN_BLOQUEADO_MS = 20
+NUM_INTENTOS_ATAQUE = 50
+# Alta de un bloque nuevo desde un CSV
+NUM_IMPORTACION = 2000
+PRESUPUESTO_IMPORTACION_S = 5
+# SQLite parte cada INSERT en grupos de unas 50 filas (límite de parámetros); una consulta por fila serían miles
+MAX_CONSULTAS_IMPORTACION = NUM_IMPORTACION // 25
+# Memoria pico al exportar, en CSV o XLSX: depende del lote del cursor, no de las filas
+PRESUPUESTO_MEMORIA_EXPORTACION_MB = 5
+
+# (ruta, método, argumentos, datos, máx. consultas admin, máx. consultas residente)
+# Los argumentos nombran atributos de la clase de prueba (por ejemplo 'solicitud')
+# cuyo id (o su valor, si no es un registro) se pasa a reverse(). None en las consultas = la ruta no aplica a ese rol.
+RUTAS = [
+    ('home', 'get', {}, {}, 0, 0),
+    ('login', 'get', {}, {}, 0, 0),
+    ('login', 'post', {}, {'username': 'residente', 'password': CLAVE}, None, 9),
+    ('logout', 'get', {}, {}, 4, 4),
+    ('dashboard', 'get', {}, {}, 7, 8),
+    ('tarjeta_solicitudes', 'get', {}, {}, 3, 3),
+    ('tarjeta_solicitudes', 'get', {}, {'alcance': 'comunidad'}, 3, 3),
+    ('tarjeta_mascotas', 'get', {}, {}, 3, 3),
+    ('tarjeta_vehiculos', 'get', {}, {}, 3, 3),
+    ('tarjeta_vecinos', 'get', {}, {}, 3, 3),
+    ('tarjeta_publicaciones', 'get', {}, {}, 3, 3),
+    ('api_solicitudes', 'get', {}, {}, 3, 3),
+    ('api_publicaciones', 'get', {}, {}, 3, 3),
+    ('api_buscar', 'get', {}, {'q': 'comunicado'}, 9, 9),
+    ('api_placas', 'get', {}, {'placa': 'pba 0001'}, 4, 2),
+    ('api_vehiculos', 'get', {}, {}, 3, 3),
+    ('crear_solicitud', 'post', {}, {'tipo': 'queja', 'titulo': 'Ruido', 'descripcion': 'Música alta'}, 4, 4),
+    ('gestionar_solicitud', 'post', {'solicitud_id': 'solicitud'}, {'estado': 'aprobada', 'respuesta': 'Listo'}, 7, 2),
+    ('gestionar_solicitudes_lote', 'post', {}, {'ids': [1, 2, 3], 'estado': 'aprobada', 'respuesta': 'Listo'}, 8, 2),
+    ('reaccionar_solicitud', 'post', {'solicitud_id': 'solicitud'}, {}, 10, 10),
+    ('crear_usuario', 'get', {}, {}, 2, 2),
+    ('crear_usuario', 'post', {}, {
+        'username': 'nuevo', 'email': 'nuevo@selva.ec', 'first_name': 'Nuevo', 'last_name': 'Vecino',
+        'casa_departamento': 'Casa 999', 'telefono': '0999999999', 'rol': 'vecino',
+        'password1': CLAVE, 'password2': CLAVE,
+    }, 6, 2),
+    ('lista_usuarios', 'get', {}, {}, 3, 2),
+    ('editar_usuario', 'get', {'user_id': 'vecino'}, {}, 3, 2),
+    ('editar_usuario', 'post', {'user_id': 'vecino'}, {
+        'username': 'vecino', 'email': 'vecino@selva.ec', 'first_name': 'Otro', 'last_name': 'Vecino',
+        'casa_departamento': 'Casa 2', 'telefono': '0990000002', 'rol': 'vecino', 'is_active': 'True',
+    }, 7, 2),
+    ('eliminar_usuario', 'get', {'user_id': 'vecino'}, {}, 31, 2),
+    ('crear_evento', 'get', {}, {}, 2, 2),
+    ('crear_evento', 'post', {}, {
+        'titulo': 'Minga', 'descripcion': 'Limpieza', 'fecha_inicio': '2026-11-07T08:00',
+        'fecha_fin': '2026-11-08T12:00', 'categoria': 'minga', 'color': '#00aa00',
+    }, 3, 2),
+    ('crear_mascota', 'post', {}, {'numero_casa': 'Casa 2', 'nombre': 'Firulais', 'dueno': 'Ana', 'tipo': 'perro'}, 3, 3),
+    ('obtener_mascota', 'get', {'mascota_id': 'mascota'}, {}, 3, 3),
+    ('editar_mascota', 'post', {'mascota_id': 'mascota'}, {'nombre': 'Michi'}, 4, 4),
+    ('eliminar_mascota', 'post', {'mascota_id': 'mascota'}, {}, 4, 4),
+    ('crear_publicacion', 'post', {}, {'titulo': 'Aviso', 'contenido': 'Corte de agua', 'tipo': 'comunicado'}, 7, 2),
+    ('editar_publicacion', 'post', {'pk': 'publicacion'}, {'titulo': 'Aviso corregido'}, 8, 2),
+    ('eliminar_publicacion', 'post', {'pk': 'publicacion'}, {}, 8, 2),
+    ('crear_vehiculo', 'post', {}, {
+        'numero_casa': 'Casa 2', 'dueno': 'Ana', 'placa': 'ZZZ-9999', 'marca': 'Kia', 'modelo': 'Rio', 'color': 'Rojo',
+    }, 4, 4),
+    ('obtener_vehiculo', 'get', {'vehiculo_id': 'vehiculo'}, {}, 3, 3),
+    ('editar_vehiculo', 'post', {'vehiculo_id': 'vehiculo'}, {'placa': 'ZZZ-8888', 'color': 'Azul'}, 5, 5),
+    ('eliminar_vehiculo', 'post', {'vehiculo_id': 'vehiculo'}, {}, 4, 4),
+    ('chat_contactos', 'get', {}, {}, 4, 4),
+    ('chat_bandeja', 'get', {}, {}, 4, 4),
+    ('chat_historial', 'get', {'usuario_id': 'residente'}, {}, 4, None),
+    ('chat_historial', 'get', {'usuario_id': 'admin'}, {}, None, 4),
+    ('crear_difusion', 'post', {}, {'contenido': 'Mañana no hay agua', 'destino': 'todos'}, 10, 2),
+    ('estado_difusion', 'get', {'difusion_id': 'difusion'}, {}, 3, 2),
+    ('exportar', 'get', {'nombre': 'exportacion'}, {'estado': 'pendiente', 'formato': 'xlsx'}, 2, 2),
+    ('novedades', 'get', {}, {}, 2, 2),
+    ('media', 'get', {'ruta': 'ruta_pdf'}, {}, 3, 3),
+    ('metricas', 'get', {}, {}, 2, 2),
+]
+
+# Recorrer completa una tabla pequeña es el plan correcto: solo se revisan las grandes
+MIN_FILAS_RECORRIDO = 1000
+
+# Recorridos completos aceptados porque la consulta necesita casi toda la tabla
+RECORRIDOS_PERMITIDOS = {
+    ('lista_usuarios', 'usuarios'): 'muestra todos los usuarios',
+    ('dashboard', 'mascotas'): 'cuenta las mascotas activas, que son casi todas',
+    ('api_buscar', 'c'): 'ordena los candidatos ya acotados por el índice (MAX_CANDIDATOS)',
+}
+
+# Endpoints paginados: la página siguiente debe costar lo mismo que la primera
+PAGINADAS = [
+    ('tarjeta_solicitudes', {}),
+    ('tarjeta_solicitudes', {'alcance': 'comunidad'}),
+    ('tarjeta_mascotas', {}),
+    ('tarjeta_vehiculos', {}),
+    ('tarjeta_vecinos', {}),
+    ('tarjeta_publicaciones', {}),
+    ('api_solicitudes', {}),
+    ('api_publicaciones', {}),
+    ('api_vehiculos', {}),
+]
+
+
+def _vecino(i, clave='', **campos):
+    return Usuario(**{
+        'username': f'vecino{i}', 'email': f'vecino{i}@selva.ec', 'password': clave,
+        'first_name': f'Nombre{i}', 'last_name': f'Apellido{i}', 'telefono': f'09{i:08d}',
+        'casa_departamento': f'Casa {i % 400 + 1}', **campos,
+    })
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    METRICAS_DIR=os.path.join(tempfile.gettempdir(), 'selva_alegre_metricas_pruebas'),
+    MEDIA_ROOT=os.path.join(tempfile.gettempdir(), 'selva_alegre_media_pruebas'),
+    TAREAS_EN_SEGUNDO_PLANO=False,
+)
+class PruebaUsuarios(TestCase):
+    """
+    Base de las pruebas de usuarios: ajustes, el administrador, el residente y el
+    vecino que usan todas, y utilidades para medir peticiones. Cada subclase
+    siembra en su setUpTestData lo demás que necesite.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        clave = make_password(CLAVE)
+        cls.admin, cls.residente, cls.vecino = Usuario.objects.bulk_create([
+            Usuario(
+                username='admin', email='admin@selva.ec', password=clave, first_name='Admin',
+                last_name='Selva', telefono='0990000000', casa_departamento='Casa 1', rol='admin',
+            ),
+            Usuario(
+                username='residente', email='residente@selva.ec', password=clave, first_name='Ana',
+                last_name='Pérez', telefono='0990000001', casa_departamento='Casa 2',
+            ),
+            Usuario(
+                username='vecino', email='vecino@selva.ec', password=clave, first_name='Luis',
+                last_name='Mora', telefono='0990000002', casa_departamento='Casa 3',
+            ),
+        ])
+
+    @classmethod
+    def _sembrar_volumen(cls):
+        """Volumen de producción: NUM_USUARIOS usuarios, NUM_SOLICITUDES solicitudes, etc."""
+        azar = random.Random(2026)
+        clave = make_password(CLAVE)
+        usuarios = [cls.admin, cls.residente, cls.vecino] + Usuario.objects.bulk_create([
+            _vecino(i, clave, activo=azar.random() > 0.05) for i in range(3, NUM_USUARIOS)
+        ])
+
+        # Las primeras solicitudes son del residente para que sus tarjetas tengan varias páginas
+        autores = [cls.residente] * 30 + [azar.choice(usuarios) for _ in range(NUM_SOLICITUDES - 30)]
+        pares = set()
+        while len(pares) < NUM_REACCIONES:
+            pares.add((azar.randrange(NUM_USUARIOS), azar.randrange(NUM_SOLICITUDES)))
+        totales = [0] * NUM_SOLICITUDES
+        for _, indice in pares:
+            totales[indice] += 1
+
+        solicitudes = Solicitud.objects.bulk_create([
+            Solicitud(
+                usuario=autor, titulo=f'Solicitud {i}', descripcion='Detalle de la solicitud',
+                tipo=azar.choice(Solicitud.TIPO_CHOICES)[0], estado=azar.choice(Solicitud.ESTADO_CHOICES)[0],
+                total_reacciones=totales[i],
+            )
+            for i, autor in enumerate(autores)
+        ], batch_size=1000)
+        ReaccionSolicitud.objects.bulk_create([
+            ReaccionSolicitud(usuario=usuarios[u], solicitud=solicitudes[s]) for u, s in pares
+        ], batch_size=1000)
+        cls.solicitud = solicitudes[0]
+
+        mascotas = Mascota.objects.bulk_create([
+            Mascota(
+                usuario=cls.residente if i < 30 else azar.choice(usuarios), numero_casa=f'Casa {i % 400 + 1}',
+                nombre=f'Mascota {i}', dueno=f'Dueño {i}', tipo=azar.choice(Mascota.TIPO_CHOICES)[0],
+            )
+            for i in range(NUM_MASCOTAS)
+        ], batch_size=1000)
+        cls.mascota = mascotas[0]
+
+        vehiculos = Vehiculo.objects.bulk_create([
+            Vehiculo(
+                usuario=cls.residente if i < 30 else azar.choice(usuarios), numero_casa=f'Casa {i % 400 + 1}',
+                dueno=f'Dueño {i}', placa=f'PBA-{i:04d}', placa_normalizada=f'PBA{i:04d}',
+                marca='Chevrolet', modelo='Aveo', color='Gris',
+            )
+            for i in range(NUM_VEHICULOS)
+        ], batch_size=1000)
+        cls.vehiculo = vehiculos[0]
+
+        publicaciones = Publicacion.objects.bulk_create([
+            Publicacion(autor=cls.admin, titulo=f'Comunicado {i}', contenido='Contenido del comunicado')
+            for i in range(NUM_PUBLICACIONES)
+        ], batch_size=1000)
+        cls.publicacion = publicaciones[0]
+        cls._adjuntar_pdf(cls.publicacion)
+
+        inicio_mes = timezone.localtime().replace(day=1, hour=8, minute=0, second=0, microsecond=0)
+        # bulk_create no llama a Evento.save(): es_global se asigna a mano
+        autores = [cls.admin if i % 3 else azar.choice(usuarios[1:]) for i in range(NUM_EVENTOS)]
+        Evento.objects.bulk_create([
+            Evento(
+                usuario=autor, titulo=f'Evento {i}', es_global=autor.rol == 'admin',
+                fecha_inicio=inicio_mes + timedelta(days=i % 60 - 20),
+                fecha_fin=inicio_mes + timedelta(days=i % 60 - 20 + i % 3, hours=2),
+            )
+            for i, autor in enumerate(autores)
+        ], batch_size=1000)
+
+        # La administración conversa con muchos vecinos; con el residente, varias páginas
+        otros = [cls.residente] * 60 + [azar.choice(usuarios[1:]) for _ in range(NUM_MENSAJES - 60)]
+        Mensaje.objects.bulk_create([
+            Mensaje(
+                remitente=cls.admin if i % 2 else otro, destinatario=otro if i % 2 else cls.admin,
+                contenido=f'Mensaje {i}', leido=azar.random() > 0.2,
+            )
+            for i, otro in enumerate(otros)
+        ], batch_size=1000)
+        call_command('recalcular_conversaciones', stdout=StringIO())
+        call_command('reindexar_busqueda', stdout=StringIO())
+        cls.exportacion = 'solicitudes'
+        cls.difusion = Difusion.objects.create(remitente=cls.admin, contenido='Corte de agua', estado='completada')
+
+    @classmethod
+    def _adjuntar_pdf(cls, publicacion):
+        """Estado de cuenta adjunto (lo entrega usuarios:media); se borra al terminar la clase."""
+        publicacion.archivo_pdf.save('estado_cuenta.pdf', ContentFile(b'%PDF-1.4\n' + b'0' * 4096))
+        cls.addClassCleanup(publicacion.archivo_pdf.storage.delete, publicacion.archivo_pdf.name)
+        cls.ruta_pdf = publicacion.archivo_pdf.name
+
+    def setUp(self):
+        cache.clear()
+
+    def _url(self, nombre, argumentos):
+        return reverse(
+            f'usuarios:{nombre}',
+            kwargs={
+                clave: getattr(getattr(self, atributo), 'id', getattr(self, atributo))
+                for clave, atributo in argumentos.items()
+            }
+        )
+
+    def _recorrer(self, usuario, nombre, patron, parametros=None, paginas=2):
+        """
+        Sigue los enlaces 'siguiente' de una tarjeta hasta el final y junta lo que
+        patron encuentra en cada página. Comprueba que haya al menos paginas páginas.
+        """
+        self.client.force_login(usuario)
+        url, encontrados, recorridas = reverse(f'usuarios:{nombre}'), [], 0
+        while url:
+            datos = self.client.get(url, parametros if recorridas == 0 else None).json()
+            encontrados += re.findall(patron, datos['html'])
+            url = datos['siguiente']
+            recorridas += 1
+        self.assertGreaterEqual(recorridas, paginas)
+        return encontrados
+
+    def _medir(self, usuario, metodo, url, datos):
+        """
+        Ejecuta la petición dentro de un savepoint que se revierte, para que las
+        rutas que modifican datos no afecten a las siguientes.
+        Devuelve (respuesta, consultas, milisegundos).
+        """
+        if usuario is None:
+            self.client.logout()
+        else:
+            self.client.force_login(usuario)
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as consultas:
+                inicio = time.perf_counter()
+                respuesta = getattr(self.client, metodo)(url, datos)
+                milisegundos = (time.perf_counter() - inicio) * 1000
+            transaction.set_rollback(True)
+        return respuesta, consultas, milisegundos
+
+    def _comprobar_tiempo(self, medido, presupuesto, mensaje=None):
+        """Compara un tiempo con su presupuesto, solo si se pidió con MEDIR_TIEMPOS=1."""
+        if not MEDIR_TIEMPOS:
+            return
+        presupuesto *= FACTOR_TIEMPO
+        self.assertLessEqual(medido, presupuesto, f'{mensaje or "tiempo"}: {medido:.1f} (máximo {presupuesto:.1f})')
+
+    async def _abrir_novedades(self, **cabeceras):
+        cliente = AsyncClient()
+        await cliente.aforce_login(self.residente)
+        respuesta = await cliente.get(reverse('usuarios:novedades'), headers=cabeceras)
+        self.assertEqual(respuesta['Content-Type'], 'text/event-stream')
+        flujo = _FlujoSSE(respuesta)
+        self.assertTrue((await flujo.leer()).startswith('retry:'))
+        return flujo
+
+
+class PresupuestoRendimientoTests(PruebaUsuarios):
+    """
+    Número de consultas y tiempo por vista con un volumen de datos realista.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls._sembrar_volumen()
+
+    def _comprobar_presupuestos(self, usuario, columna):
+        for ruta in RUTAS:
+            nombre, metodo, argumentos, datos, maximo = ruta[0], ruta[1], ruta[2], ruta[3], ruta[columna]
+            if maximo is None:
+                continue
+            # El login se mide sin sesión iniciada
+            solicitante = None if nombre == 'login' and metodo == 'post' else usuario
+            url = self._url(nombre, argumentos)
+            with self.subTest(ruta=nombre, metodo=metodo, datos=datos):
+                respuesta, consultas, milisegundos = self._medir(solicitante, metodo, url, datos)
+                self.assertLess(respuesta.status_code, 500)
+                self.assertLessEqual(
+                    len(consultas), maximo,
+                    f'{metodo.upper()} {url}: {len(consultas)} consultas (máximo {maximo})\n'
+                    + '\n'.join(consulta['sql'] for consulta in consultas.captured_queries)
+                )
+                self._comprobar_tiempo(
+                    milisegundos, PRESUPUESTO_TIEMPO_RUTA_MS.get(nombre, PRESUPUESTO_TIEMPO_MS),
+                    f'{metodo.upper()} {url}'
+                )
+
+    def _recorridos_completos(self, sql):
+        """Tablas que el plan de la consulta recorre completas (sin índice)."""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'EXPLAIN {sql}')
+                return [fila[0].split('Seq Scan on ')[1].split()[0] for fila in cursor.fetchall() if 'Seq Scan on ' in fila[0]]
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            # SQLite: "SCAN tabla" sin "USING ... INDEX" es un recorrido completo
+            return [
+                fila[-1].split()[1] for fila in cursor.fetchall()
+                if fila[-1].startswith('SCAN ') and ' INDEX ' not in fila[-1]
+            ]
+
+    def test_consultas_de_las_vistas_usan_indices(self):
+        """
+        Ninguna consulta de las vistas debe recorrer completa una tabla grande con
+        el volumen sembrado. Las consultas se toman de las propias peticiones.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        filas = {modelo._meta.db_table: modelo.objects.count() for modelo in apps.get_app_config('usuarios').get_models()}
+
+        consultas = {}
+        for usuario, columna in ((self.admin, 4), (self.residente, 5)):
+            for ruta in RUTAS:
+                nombre, metodo, argumentos, datos = ruta[:4]
+                if ruta[columna] is None:
+                    continue
+                _, capturadas, _ = self._medir(usuario, metodo, self._url(nombre, argumentos), datos)
+                for consulta in capturadas.captured_queries:
+                    if consulta['sql'].startswith('SELECT'):
+                        consultas.setdefault(consulta['sql'], nombre)
+
+        for sql, nombre in consultas.items():
+            recorridas = [
+                tabla for tabla in self._recorridos_completos(sql)
+                if filas.get(tabla, MIN_FILAS_RECORRIDO) >= MIN_FILAS_RECORRIDO
+                and (nombre, tabla) not in RECORRIDOS_PERMITIDOS
+            ]
+            with self.subTest(ruta=nombre, sql=sql):
+                self.assertEqual(recorridas, [], f'{nombre}: recorrido secuencial de {recorridas}')
+
+    def test_todas_las_rutas_tienen_presupuesto(self):
+        con_presupuesto = {ruta[0] for ruta in RUTAS}
+        sin_presupuesto = {patron.name for patron in urlpatterns} - con_presupuesto
+        self.assertFalse(sin_presupuesto, f'Rutas sin presupuesto de rendimiento: {sorted(sin_presupuesto)}')
+
+    def test_presupuestos_administrador(self):
+        self._comprobar_presupuestos(self.admin, 4)
+
+    def test_presupuestos_residente(self):
+        self._comprobar_presupuestos(self.residente, 5)
+
+    def test_paginas_siguientes_cuestan_lo_mismo(self):
+        for usuario in (self.admin, self.residente):
+            for nombre, datos in PAGINADAS:
+                with self.subTest(usuario=usuario.username, ruta=nombre, datos=datos):
+                    url = self._url(nombre, {})
+                    respuesta, primera, _ = self._medir(usuario, 'get', url, datos)
+                    siguiente = respuesta.json()['siguiente']
+                    self.assertIsNotNone(siguiente)
+                    cache.clear()
+                    _, segunda, _ = self._medir(usuario, 'get', siguiente, {})
+                    self.assertEqual(len(segunda), len(primera))
+
+
+class ContadorReaccionesTests(PruebaUsuarios):
+    """Solicitud.total_reacciones sigue a las reacciones, se creen o se borren como sea."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        azar = random.Random(3)
+        usuarios = [cls.admin, cls.residente, cls.vecino] + Usuario.objects.bulk_create([_vecino(i) for i in range(3, 10)])
+        reaccionan = [azar.sample(usuarios, azar.randrange(len(usuarios))) for _ in range(30)]
+        solicitudes = Solicitud.objects.bulk_create([
+            Solicitud(
+                usuario=azar.choice(usuarios), titulo=f'Solicitud {i}', descripcion='Detalle de la solicitud',
+                tipo='queja', total_reacciones=len(quienes),
+            )
+            for i, quienes in enumerate(reaccionan)
+        ])
+        ReaccionSolicitud.objects.bulk_create([
+            ReaccionSolicitud(usuario=usuario, solicitud=solicitud)
+            for solicitud, quienes in zip(solicitudes, reaccionan) for usuario in quienes
+        ])
+
+    def test_contador_de_reacciones_sigue_a_las_filas(self):
+        def desfasadas():
+            return list(
+                Solicitud.objects.annotate(reales=Count('reacciones')).exclude(total_reacciones=F('reales'))
+                .values_list('id', 'total_reacciones', 'reales')
+            )
+
+        # Fuera de la vista: el shell o el admin, de a una o por queryset
+        ReaccionSolicitud.objects.filter(solicitud__reacciones__usuario=self.residente).first().delete()
+        ReaccionSolicitud.objects.filter(pk__in=ReaccionSolicitud.objects.values('pk')[:5]).delete()
+        ReaccionSolicitud.objects.create(usuario=self.admin, solicitud=Solicitud.objects.exclude(reacciones__usuario=self.admin).first())
+        # En cascada, al borrar a quien reaccionó o la solicitud
+        self.client.force_login(self.admin)
+        self.client.get(reverse('usuarios:eliminar_usuario', args=[self.vecino.id]))
+        self.assertFalse(Usuario.objects.filter(pk=self.vecino.pk).exists())
+        Solicitud.objects.filter(reacciones__isnull=False).first().delete()
+        self.assertEqual(desfasadas(), [])
+
+    def test_reaccionar_dos_veces_devuelve_el_contador_guardado(self):
+        solicitud = Solicitud.objects.exclude(reacciones__usuario=self.residente).first()
+        inicial = solicitud.total_reacciones
+        url = reverse('usuarios:reaccionar_solicitud', args=[solicitud.id])
+        self.client.force_login(self.residente)
+        for accion, esperado in (('añadida', inicial + 1), ('quitada', inicial)):
+            with self.subTest(accion=accion):
+                datos = self.client.post(url).json()
+                self.assertEqual((datos['accion'], datos['total_reacciones']), (accion, esperado))
+                solicitud.refresh_from_db()
+                self.assertEqual(solicitud.total_reacciones, esperado)
+
+
+class PaginacionTarjetasTests(PruebaUsuarios):
+    """Las tarjetas de vecinos y mascotas se recorren por cursor sin repetir ni saltar filas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Casa y apellido repetidos (y casas vacías o sin dato): solo el id desempata
+        Usuario.objects.bulk_create([
+            _vecino(i, casa_departamento=(None, '', 'Casa 7', 'Casa 7')[i % 4], last_name='Mora', activo=i % 10 != 0)
+            for i in range(3, 70)
+        ])
+        mascotas = Mascota.objects.bulk_create([
+            Mascota(
+                usuario=cls.residente, numero_casa='Casa 2', nombre=f'Mascota {i}', dueno='Ana', tipo='gato',
+                activo=i % 10 != 0,
+            )
+            for i in range(50)
+        ])
+        # Todas registradas en el mismo instante
+        Mascota.objects.filter(pk__in=[mascota.pk for mascota in mascotas]).update(fecha_registro=timezone.now())
+
+    def test_vecinos_sin_repetidos_ni_saltos(self):
+        activos = Usuario.objects.filter(activo=True)
+        ids = [int(i) for i in self._recorrer(self.admin, 'tarjeta_vecinos', r'abrirChat\(event, (\d+)', paginas=3)]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), set(activos.exclude(pk=self.admin.pk).values_list('id', flat=True)))
+
+        nombres = self._recorrer(self.residente, 'tarjeta_vecinos', r'<td[^>]*>(Nombre\d+|Admin|Luis)</td>', paginas=3)
+        self.assertEqual(len(nombres), len(set(nombres)))
+        self.assertEqual(set(nombres), set(activos.exclude(pk=self.residente.pk).values_list('first_name', flat=True)))
+
+    def test_mascotas_sin_repetidas_ni_saltos(self):
+        ids = [int(i) for i in self._recorrer(self.admin, 'tarjeta_mascotas', r'abrirModalEditarMascota\((\d+)\)', paginas=3)]
+        # Con la fecha empatada, el id decide: de la más nueva a la más antigua
+        self.assertEqual(ids, list(Mascota.objects.filter(activo=True).order_by('-id').values_list('id', flat=True)))
+
+    def test_cursor_alterado(self):
+        self.client.force_login(self.admin)
+        for cursor in ('x', 'WyJhIl0', 'WyJhIiwiYiIsImMiXQ'):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get(reverse('usuarios:tarjeta_vecinos'), {'cursor': cursor}).status_code, 400)
+
+    def test_parametros_ajenos_usan_la_misma_entrada_de_cache(self):
+        self.client.force_login(self.residente)
+        url = reverse('usuarios:tarjeta_mascotas')
+        primera = self.client.get(url).json()
+        # update() no emite señales: si la página se recalculara, mostraría el cambio
+        Mascota.objects.update(nombre='Renombrada')
+        for parametros in ({'utm_source': 'correo'}, {'cursor': '', '_': '1718'}):
+            with self.subTest(parametros=parametros):
+                self.assertEqual(self.client.get(url, parametros).json(), primera)
+        self.assertNotIn('utm_source', primera['siguiente'])
+
+
+class TarjetasTests(PruebaUsuarios):
+    """Cada tarjeta del dashboard muestra las filas que le tocan a cada rol, página tras página."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Usuario.objects.bulk_create([_vecino(i, activo=i % 10 != 0) for i in range(3, 30)])
+        Solicitud.objects.bulk_create([
+            Solicitud(
+                usuario=cls.residente if i < 25 else cls.vecino, titulo=f'Solicitud {i}',
+                descripcion='Detalle de la solicitud', tipo='queja',
+            )
+            for i in range(30)
+        ])
+        Mascota.objects.bulk_create([
+            Mascota(
+                usuario=cls.residente if i < 20 else cls.vecino, numero_casa='Casa 2', nombre=f'Mascota {i}',
+                dueno='Ana', tipo='perro', activo=i % 10 != 0,
+            )
+            for i in range(30)
+        ])
+        Vehiculo.objects.bulk_create([
+            Vehiculo(
+                usuario=cls.residente if i < 22 else cls.vecino, numero_casa='Casa 2', dueno=f'Dueño {i}',
+                placa=f'PBA-{i:04d}', placa_normalizada=f'PBA{i:04d}', marca='Chevrolet', modelo='Aveo', color='Gris',
+            )
+            for i in range(25)
+        ])
+        Publicacion.objects.bulk_create([
+            Publicacion(autor=cls.admin, titulo=f'Comunicado {i}', contenido='Contenido del comunicado')
+            for i in range(23)
+        ])
+
+    def _ids(self, usuario, nombre, patron, parametros=None):
+        encontrados = self._recorrer(usuario, nombre, patron, parametros)
+        self.assertEqual(len(encontrados), len(set(encontrados)))
+        return set(encontrados)
+
+    def test_solicitudes(self):
+        patron = r'data-solicitud-id="(\d+)"'
+        todas = {str(i) for i in Solicitud.objects.values_list('id', flat=True)}
+        propias = {str(i) for i in Solicitud.objects.filter(usuario=self.residente).values_list('id', flat=True)}
+        self.assertEqual(self._ids(self.admin, 'tarjeta_solicitudes', patron), todas)
+        self.assertEqual(self._ids(self.residente, 'tarjeta_solicitudes', patron), propias)
+        # El enlace a la página siguiente conserva el alcance
+        self.assertEqual(self._ids(self.residente, 'tarjeta_solicitudes', patron, {'alcance': 'comunidad'}), todas)
+
+    def test_vehiculos(self):
+        patron = r'plate-badge">(PBA-\d{4})<'
+        self.assertEqual(self._ids(self.admin, 'tarjeta_vehiculos', patron), {f'PBA-{i:04d}' for i in range(25)})
+        self.assertEqual(self._ids(self.residente, 'tarjeta_vehiculos', patron), {f'PBA-{i:04d}' for i in range(22)})
+
+    def test_mascotas_activas_para_ambos_roles(self):
+        activas = set(Mascota.objects.filter(activo=True).values_list('nombre', flat=True))
+        for usuario in (self.admin, self.residente):
+            with self.subTest(usuario=usuario.username):
+                self.assertEqual(self._ids(usuario, 'tarjeta_mascotas', r'<h3>(Mascota \d+)</h3>'), activas)
+
+    def test_publicaciones(self):
+        titulos = {f'Comunicado {i}' for i in range(23)}
+        for usuario in (self.admin, self.residente):
+            with self.subTest(usuario=usuario.username):
+                self.assertEqual(self._ids(usuario, 'tarjeta_publicaciones', r'>(Comunicado \d+)<'), titulos)
+
+    def test_vecinos_sin_el_usuario_actual(self):
+        activos = Usuario.objects.filter(activo=True)
+        ids = self._ids(self.admin, 'tarjeta_vecinos', r'abrirChat\(event, (\d+)')
+        self.assertEqual(ids, {str(i) for i in activos.exclude(pk=self.admin.pk).values_list('id', flat=True)})
+
+        # Residente y vecino comparten las páginas cacheadas; cada uno se ve fuera de la lista
+        patron = r'<td[^>]*>(Nombre\d+|Admin|Ana|Luis)</td>'
+        for usuario in (self.residente, self.vecino):
+            with self.subTest(usuario=usuario.username):
+                nombres = self._ids(usuario, 'tarjeta_vecinos', patron)
+                self.assertEqual(nombres, set(activos.exclude(pk=usuario.pk).values_list('first_name', flat=True)))
+
+
+class CalendarioTests(PruebaUsuarios):
+    """Eventos del mes con rango semiabierto: fecha_fin es exclusiva al pedirlos y al repartirlos por día."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        marzo, abril = rango_mes(2026, 3)
+        # Termina a la medianoche en que empieza marzo: es solo de febrero
+        cls.hasta_marzo = Evento.objects.create(
+            usuario=cls.admin, titulo='Guardia nocturna', fecha_inicio=marzo - timedelta(hours=6), fecha_fin=marzo,
+        )
+        # Del 30 de marzo al 2 de abril
+        cls.entre_meses = Evento.objects.create(
+            usuario=cls.admin, titulo='Minga', fecha_inicio=abril - timedelta(days=2), fecha_fin=abril + timedelta(days=1, hours=12),
+        )
+
+    def test_evento_que_termina_al_empezar_el_mes(self):
+        self.assertEqual(eventos_del_mes(2026, 3), [self.entre_meses])
+        febrero = eventos_del_mes(2026, 2)
+        self.assertEqual(febrero, [self.hasta_marzo])
+        self.assertEqual(eventos_por_dia(febrero, 2026, 2), {28: [self.hasta_marzo]})
+
+    def test_evento_que_cruza_dos_meses(self):
+        marzo = eventos_del_mes(2026, 3, es_global=True)
+        self.assertEqual(eventos_por_dia(marzo, 2026, 3), {30: [self.entre_meses], 31: [self.entre_meses]})
+        abril = eventos_del_mes(2026, 4, es_global=True)
+        self.assertEqual(abril, [self.entre_meses])
+        self.assertEqual(eventos_por_dia(abril, 2026, 4), {1: [self.entre_meses], 2: [self.entre_meses]})
+
+
+class MetricasTests(PruebaUsuarios):
+    """Métricas por vista en /metrics/, bajo WSGI y ASGI y sumando los procesos vivos."""
+
+    def test_metricas_por_vista(self):
+        self.client.force_login(self.admin)
+        self.client.get(reverse('usuarios:dashboard'))
+        respuesta = self.client.get(reverse('usuarios:metricas'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('django_http_request_duration_seconds_count{view="usuarios:dashboard",method="GET"}', respuesta.content.decode())
+        self.assertIn('django_sql_queries_total{view="usuarios:dashboard",method="GET"}', respuesta.content.decode())
+
+        self.client.force_login(self.residente)
+        self.assertEqual(self.client.get(reverse('usuarios:metricas')).status_code, 403)
+
+        # Los archivos de procesos terminados se borran al sumar; los de procesos vivos cuentan
+        terminado = subprocess.Popen([sys.executable, '-c', 'pass'])
+        terminado.wait()
+        directorio = settings.METRICAS_DIR
+        os.makedirs(directorio, exist_ok=True)
+        archivos = {}
+        for vista, pid in (('usuarios:terminado', terminado.pid), ('usuarios:vivo', os.getppid())):
+            archivos[vista] = os.path.join(directorio, f'{pid}-1.json')
+            with open(archivos[vista], 'w') as archivo:
+                json.dump({'totales': [[vista, 'GET', {'conteo': 1}]], 'respuestas': []}, archivo)
+            self.addCleanup(lambda ruta=archivos[vista]: os.path.exists(ruta) and os.remove(ruta))
+        self.client.force_login(self.admin)
+        contenido = self.client.get(reverse('usuarios:metricas')).content.decode()
+        self.assertNotIn('usuarios:terminado', contenido)
+        self.assertFalse(os.path.exists(archivos['usuarios:terminado']))
+        self.assertIn('django_http_request_duration_seconds_count{view="usuarios:vivo",method="GET"} 1', contenido)
+
+    def test_metodos_desconocidos_se_agrupan(self):
+        self.client.force_login(self.admin)
+        for metodo in ('PROPFIND', 'X-SONDA-1', 'X-SONDA-2'):
+            self.client.generic(metodo, reverse('usuarios:dashboard'))
+        contenido = self.client.get(reverse('usuarios:metricas')).content.decode()
+        self.assertIn('django_http_request_duration_seconds_count{view="usuarios:dashboard",method="other"} 3', contenido)
+        self.assertNotIn('SONDA', contenido)
+        self.assertNotIn('PROPFIND', contenido)
+
+    async def test_metricas_de_vistas_asincronas(self):
+        def consultas_de_novedades():
+            etiqueta = 'django_sql_queries_total{view="usuarios:novedades",method="GET"} '
+            lineas = [linea for linea in exportar_prometheus().splitlines() if linea.startswith(etiqueta)]
+            return int(lineas[0].split()[-1]) if lineas else 0
+
+        self.assertTrue(iscoroutinefunction(MetricasMiddleware(self._abrir_novedades)))
+        antes = consultas_de_novedades()
+        flujo = await self._abrir_novedades()
+        await flujo.cerrar()
+        # login_required lee la sesión y el usuario con sync_to_async, en otro hilo
+        self.assertGreaterEqual(consultas_de_novedades() - antes, 2)
+
+
+class GenerarDatosTests(PruebaUsuarios):
+    """El comando generar_datos produce exactamente lo pedido, igual con la misma semilla."""
+
+    def _generar(self, prefijo, semilla=7):
+        cantidades = {
+            'usuarios': 40, 'administradores': 2, 'eventos': 15, 'solicitudes': 120, 'reacciones': 900,
+            'mascotas': 25, 'vehiculos': 30, 'publicaciones': 6, 'mensajes': 80,
+        }
+        argumentos = [f'--{nombre}={valor}' for nombre, valor in cantidades.items()]
+        call_command('generar_datos', f'--prefijo={prefijo}', f'--semilla={semilla}', *argumentos, stdout=StringIO())
+        usuarios = Usuario.objects.filter(username__startswith=prefijo)
+        solicitudes = Solicitud.objects.filter(usuario__username__startswith=prefijo).order_by('id')
+        self.assertEqual(usuarios.count(), cantidades['usuarios'] + cantidades['administradores'])
+        self.assertEqual(solicitudes.count(), cantidades['solicitudes'])
+        self.assertEqual(ReaccionSolicitud.objects.filter(solicitud__in=solicitudes).count(), cantidades['reacciones'])
+        self.assertEqual(Evento.objects.filter(usuario__username__startswith=prefijo).count(), cantidades['eventos'])
+        self.assertEqual(Mascota.objects.filter(usuario__username__startswith=prefijo).count(), cantidades['mascotas'])
+        self.assertEqual(Vehiculo.objects.filter(usuario__username__startswith=prefijo).count(), cantidades['vehiculos'])
+        self.assertEqual(Publicacion.objects.filter(autor__username__startswith=prefijo).count(), cantidades['publicaciones'])
+        self.assertEqual(Mensaje.objects.filter(remitente__username__startswith=prefijo).count(), cantidades['mensajes'])
+        # Lo que no depende de la fecha ni del prefijo
+        return (
+            list(usuarios.order_by('id').values_list('first_name', 'last_name', 'casa_departamento', 'rol', 'activo')),
+            list(solicitudes.values_list('titulo', 'tipo', 'estado', 'total_reacciones')),
+        )
+
+    def test_cantidades_exactas_y_repetibles(self):
+        primera = self._generar('uno')
+        self.assertEqual(primera, self._generar('dos'))
+        self.assertNotEqual(primera, self._generar('tres', semilla=8))
+
+    def test_reacciones_que_no_caben(self):
+        with self.assertRaises(CommandError):
+            call_command('generar_datos', '--usuarios=3', '--solicitudes=2', '--reacciones=7', stdout=StringIO())
+
+
+class ConversacionesTests(PruebaUsuarios):
+    """Chat en tiempo real por WebSocket y el resumen por conversación que lo acompaña."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        azar = random.Random(11)
+        vecinos = Usuario.objects.bulk_create([_vecino(i) for i in range(3, 40)])
+        # La administración conversa con varios vecinos; con el residente, más seguido
+        otros = [cls.residente] * 60 + [azar.choice(vecinos) for _ in range(440)]
+        Mensaje.objects.bulk_create([
+            Mensaje(
+                remitente=cls.admin if i % 2 else otro, destinatario=otro if i % 2 else cls.admin,
+                contenido=f'Mensaje {i}', leido=azar.random() > 0.2,
+            )
+            for i, otro in enumerate(otros)
+        ])
+        call_command('recalcular_conversaciones', stdout=StringIO())
+
+    def test_resumen_de_conversaciones_coincide_con_los_mensajes(self):
+        no_leidos = sum(
+            conversacion.no_leidos_de(self.admin)
+            for lado in Conversacion.objects.de_usuario(self.admin) for conversacion in lado
+        )
+        self.assertEqual(no_leidos, Mensaje.objects.filter(destinatario=self.admin, leido=False).count())
+        conversacion = Conversacion.objects.get(usuario_a=self.admin, usuario_b=self.residente)
+        ultimo = Mensaje.objects.filter(
+            Q(remitente=self.admin, destinatario=self.residente) | Q(remitente=self.residente, destinatario=self.admin)
+        ).latest('fecha_envio', 'id')
+        self.assertEqual(conversacion.ultimo_mensaje, ultimo)
+
+    async def _conectar_chat(self, usuario):
+        cliente = AsyncClient()
+        await cliente.aforce_login(usuario)
+        conexion = _ConexionWebSocket(f'{settings.SESSION_COOKIE_NAME}={cliente.cookies[settings.SESSION_COOKIE_NAME].value}')
+        self.assertEqual((await conexion.conectar())['type'], 'websocket.accept')
+        return conexion
+
+    async def test_chat_entrega_en_tiempo_real(self):
+        admin = await self._conectar_chat(self.admin)
+        residente = await self._conectar_chat(self.residente)
+        conversacion = Conversacion.objects.filter(usuario_a=self.admin, usuario_b=self.residente)
+        no_leidos = (await conversacion.aget()).no_leidos_a
+        try:
+            inicio = time.perf_counter()
+            await residente.enviar({'tipo': 'mensaje', 'destinatario': self.admin.id, 'contenido': 'Hay una fuga de agua'})
+            recibido = await admin.recibir()
+            milisegundos = (time.perf_counter() - inicio) * 1000
+            self.assertEqual((recibido['tipo'], recibido['contenido']), ('mensaje', 'Hay una fuga de agua'))
+            self._comprobar_tiempo(milisegundos, PRESUPUESTO_CHAT_MS)
+            # El remitente recibe su propio mensaje como confirmación de envío
+            self.assertEqual((await residente.recibir())['id'], recibido['id'])
+            # El resumen de la conversación sigue a cada envío y lectura
+            resumen = await conversacion.aget()
+            self.assertEqual((resumen.ultimo_mensaje_id, resumen.no_leidos_a), (recibido['id'], no_leidos + 1))
+
+            await admin.enviar({'tipo': 'leido', 'remitente': self.residente.id, 'hasta': recibido['id']})
+            confirmacion = await residente.recibir()
+            self.assertEqual((confirmacion['tipo'], confirmacion['lector']), ('leido', self.admin.id))
+            self.assertTrue((await Mensaje.objects.aget(pk=recibido['id'])).leido)
+            self.assertEqual((await conversacion.aget()).no_leidos_a, 0)
+            self.assertEqual(await Mensaje.objects.filter(destinatario=self.admin, remitente=self.residente, leido=False).acount(), 0)
+
+            # Entre vecinos no hay chat
+            await residente.enviar({'tipo': 'mensaje', 'destinatario': self.vecino.id, 'contenido': 'Hola'})
+            self.assertEqual((await residente.recibir())['tipo'], 'error')
+        finally:
+            await admin.cerrar()
+            await residente.cerrar()
+
+    async def test_chat_sin_sesion_se_rechaza(self):
+        conexion = _ConexionWebSocket('')
+        self.assertEqual(await conexion.conectar(), {'type': 'websocket.close', 'code': 4401})
+        await conexion.tarea
+
+
+class NovedadesTests(PruebaUsuarios):
+    """Novedades en vivo por Server-Sent Events."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.solicitud = Solicitud.objects.create(
+            usuario=cls.residente, titulo='Ruido', descripcion='Música alta', tipo='queja',
+        )
+
+    def _reaccionar(self, usuario):
+        """Reacciona por HTTP y ejecuta los on_commit, como al confirmarse en producción."""
+        self.client.force_login(usuario)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('usuarios:reaccionar_solicitud', args=[self.solicitud.id])).json()
+
+    async def test_novedades_en_vivo_y_reanudacion(self):
+        flujo = await self._abrir_novedades()
+        try:
+            inicio = time.perf_counter()
+            reaccion = await sync_to_async(self._reaccionar)(self.vecino)
+            evento = await flujo.leer()
+            milisegundos = (time.perf_counter() - inicio) * 1000
+        finally:
+            await flujo.cerrar()
+        campos = dict(linea.split(': ', 1) for linea in evento.strip().split('\n'))
+        self.assertEqual(campos['event'], 'reaccion')
+        self.assertEqual(json.loads(campos['data']), {'id': self.solicitud.id, 'total_reacciones': reaccion['total_reacciones']})
+        self._comprobar_tiempo(milisegundos, PRESUPUESTO_TIEMPO_MS)
+
+        # Lo que pasa durante un corte llega al reconectar con Last-Event-ID
+        quitada = await sync_to_async(self._reaccionar)(self.vecino)
+        flujo = await self._abrir_novedades(**{'Last-Event-ID': campos['id']})
+        try:
+            perdido = await flujo.leer()
+        finally:
+            await flujo.cerrar()
+        self.assertIn(f'"total_reacciones": {quitada["total_reacciones"]}', perdido)
+
+    async def test_novedades_una_lectura_por_aviso(self):
+        # Los flujos no consultan la tabla: el lector del proceso la lee una vez y reparte
+        leer = _Posicion.leer
+        lecturas = []
+
+        def contar(posicion):
+            lecturas.append(posicion)
+            return leer(posicion)
+
+        flujos = [await self._abrir_novedades() for _ in range(3)]
+        try:
+            with mock.patch.object(_Posicion, 'leer', contar):
+                await sync_to_async(self._reaccionar)(self.vecino)
+                eventos = [await flujo.leer() for flujo in flujos]
+        finally:
+            for flujo in flujos:
+                await flujo.cerrar()
+        self.assertEqual(len({evento for evento in eventos}), 1)
+        self.assertIn('event: reaccion', eventos[0])
+        self.assertEqual(len(lecturas), 1)
+
+
+class DifusionTests(PruebaUsuarios):
+    """Difusiones de la administración a todos los residentes, por lotes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        vecinos = Usuario.objects.bulk_create([_vecino(i, activo=i % 20 != 0) for i in range(3, NUM_USUARIOS)])
+        # Algunos ya conversan con la administración; al resto la difusión les abre la conversación
+        Mensaje.objects.bulk_create([
+            Mensaje(remitente=vecino, destinatario=cls.admin, contenido='¿Hay agua mañana?')
+            for vecino in [cls.residente] + vecinos[:50]
+        ])
+        call_command('recalcular_conversaciones', stdout=StringIO())
+
+    def test_difusion_llega_a_todos_los_residentes(self):
+        contenido = 'Corte de agua el sábado'
+        total = Usuario.objects.filter(activo=True, rol='vecino', is_superuser=False).count()
+        antes = Conversacion.objects.get(usuario_a=self.admin, usuario_b=self.residente)
+
+        self.client.force_login(self.admin)
+        inicio = time.perf_counter()
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post(reverse('usuarios:crear_difusion'), {'contenido': contenido, 'destino': 'todos'})
+        milisegundos = (time.perf_counter() - inicio) * 1000
+        self.assertEqual(respuesta.status_code, 202)
+        self._comprobar_tiempo(milisegundos, PRESUPUESTO_DIFUSION_MS)
+
+        estado = self.client.get(reverse('usuarios:estado_difusion', args=[respuesta.json()['id']])).json()
+        self.assertEqual((estado['estado'], estado['enviados'], estado['total']), ('completada', total, total))
+        self.assertEqual(Mensaje.objects.filter(remitente=self.admin, contenido=contenido).count(), total)
+        # Conversaciones existentes y nuevas quedan con la difusión como último mensaje
+        despues = Conversacion.objects.get(pk=antes.pk)
+        self.assertEqual(despues.no_leidos_b, antes.no_leidos_b + 1)
+        self.assertEqual(despues.no_leidos_a, antes.no_leidos_a)
+        self.assertEqual(
+            Conversacion.objects.filter(ultimo_mensaje__remitente=self.admin, ultimo_mensaje__contenido=contenido).count(),
+            total
+        )
+
+
+class ImagenesTests(PruebaUsuarios):
+    """Fotos subidas: procesamiento en segundo plano, derivadas para srcset y memoria acotada."""
+
+    def test_fotos_se_procesan_fuera_de_la_peticion(self):
+        # Foto de celular: 1200x800 guardada de lado, con orientación EXIF 6 (girar 90°)
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        datos = io.BytesIO()
+        Image.new('RGB', (1200, 800), 'orange').save(datos, format='JPEG', exif=exif)
+        foto = SimpleUploadedFile('firulais.jpg', datos.getvalue(), content_type='image/jpeg')
+
+        self.client.force_login(self.residente)
+        with self.captureOnCommitCallbacks() as tareas:
+            self.client.post(reverse('usuarios:crear_mascota'), {
+                'numero_casa': 'Casa 2', 'nombre': 'Firulais', 'dueno': 'Ana', 'tipo': 'perro', 'foto': foto,
+                # Mitad izquierda de la vista previa de 300x300
+                'crop_data': json.dumps({'left': 0, 'top': 0, 'width': 150, 'height': 300}),
+            })
+        mascota = Mascota.objects.get(usuario=self.residente, nombre='Firulais')
+        self.assertEqual(mascota.estado_foto, 'pendiente')
+        original = mascota.foto.name
+
+        for tarea in tareas:
+            tarea()
+        mascota.refresh_from_db()
+        self.addCleanup(mascota.foto.delete, save=False)
+        self.addCleanup(eliminar_derivadas, 'usuarios.Mascota', 'foto', mascota.foto.name)
+        self.assertEqual(mascota.estado_foto, 'lista')
+        self.assertFalse(mascota.foto.storage.exists(original))
+        with Image.open(mascota.foto.path) as procesada:
+            # Enderezada a 800x1200 y recortada a la mitad izquierda
+            self.assertEqual((procesada.format, procesada.size), ('JPEG', (400, 1200)))
+
+    def test_derivadas_para_srcset(self):
+        def foto(nombre):
+            datos = io.BytesIO()
+            Image.new('RGB', (1600, 1200), 'green').save(datos, format='JPEG')
+            return SimpleUploadedFile(nombre, datos.getvalue(), content_type='image/jpeg')
+
+        def derivadas(nombre):
+            storage = Mascota._meta.get_field('foto').storage
+            return [
+                storage.exists(nombre_derivada(nombre, ancho, extension))
+                for ancho in ANCHOS_DERIVADAS for extension in FORMATOS_DERIVADAS
+            ]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mascota = Mascota.objects.create(
+                usuario=self.residente, numero_casa='Casa 2', nombre='Luna', dueno='Ana', tipo='gato',
+                foto=foto('luna.jpg'),
+            )
+        mascota.refresh_from_db()
+        primera = mascota.foto.name
+        self.assertTrue(all(derivadas(primera)))
+        storage = mascota.foto.storage
+        with Image.open(storage.open(nombre_derivada(primera, ANCHOS_DERIVADAS[0], 'webp'))) as miniatura:
+            self.assertEqual((miniatura.format, miniatura.width), ('WEBP', ANCHOS_DERIVADAS[0]))
+
+        html = Template('{% load custom_tags %}{% imagen_responsiva foto "Luna" %}').render(Context({'foto': mascota.foto}))
+        self.assertIn('type="image/webp"', html)
+        self.assertIn(f'{storage.url(nombre_derivada(primera, ANCHOS_DERIVADAS[-1], "jpg"))} {ANCHOS_DERIVADAS[-1]}w', html)
+        self.client.force_login(self.residente)
+        miniatura = self.client.get(storage.url(nombre_derivada(primera, ANCHOS_DERIVADAS[0], 'webp')))
+        self.assertEqual((miniatura.status_code, miniatura['Content-Type']), (200, 'image/webp'))
+
+        # Al reemplazar la foto se borran las derivadas de la anterior
+        with self.captureOnCommitCallbacks(execute=True):
+            mascota.foto = foto('luna2.jpg')
+            mascota.save()
+        mascota.refresh_from_db()
+        storage.delete(primera)
+        self.assertFalse(any(derivadas(primera)))
+        segunda = mascota.foto.name
+        self.assertTrue(all(derivadas(segunda)))
+
+        # Y al borrar el registro, las de la actual
+        with self.captureOnCommitCallbacks(execute=True):
+            mascota.delete()
+        storage.delete(segunda)
+        self.assertFalse(any(derivadas(segunda)))
+
+    def test_fotos_grandes_con_memoria_acotada(self):
+        # Foto de 24 MP con ruido (no se comprime bien, como una real)
+        ruido = Image.effect_noise((6000, 4000), 40)
+        datos = io.BytesIO()
+        Image.merge('RGB', (ruido, ruido.transpose(Image.Transpose.ROTATE_180), ruido)).save(datos, format='JPEG', quality=90)
+
+        # Proceso aparte, como en el pool: VmHWM es su memoria pico (solo Linux)
+        if os.path.exists('/proc/self/status'):
+            medicion = subprocess.run([sys.executable, '-c', (
+                'import sys\n'
+                'from usuarios.recodificacion import recodificar\n'
+                'def pico():\n'
+                '    return next(int(l.split()[1]) for l in open("/proc/self/status") if l.startswith("VmHWM"))\n'
+                'datos = sys.stdin.buffer.read()\n'
+                'antes = pico()\n'
+                'recodificar(datos)\n'
+                'print((pico() - antes) // 1024)\n'
+            )], input=datos.getvalue(), capture_output=True, cwd=settings.BASE_DIR, check=True)
+            self.assertLessEqual(int(medicion.stdout), PRESUPUESTO_MEMORIA_FOTO_MB)
+
+        # Una imagen con más píxeles que el límite se rechaza al subirla, sin decodificarla
+        enorme = io.BytesIO()
+        lado = int(PIXELES_MAXIMOS ** 0.5) + 100
+        Image.new('1', (lado, lado)).save(enorme, format='PNG')
+        self.client.force_login(self.residente)
+        respuesta = self.client.post(reverse('usuarios:crear_mascota'), {
+            'numero_casa': 'Casa 2', 'nombre': 'Titán', 'dueno': 'Ana', 'tipo': 'perro',
+            'foto': SimpleUploadedFile('titan.png', enorme.getvalue(), content_type='image/png'),
+        }, follow=True)
+        self.assertFalse(Mascota.objects.filter(nombre='Titán').exists())
+        self.assertIn('megapíxeles', ' '.join(str(m) for m in respuesta.context['messages']))
+
+
+class MediaTests(PruebaUsuarios):
+    """Archivos subidos entregados por usuarios:media, con permisos y caché HTTP."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.publicacion = Publicacion.objects.create(autor=cls.admin, titulo='Estado de cuenta', contenido='Adjunto')
+        cls._adjuntar_pdf(cls.publicacion)
+        cls.mascota = Mascota.objects.create(
+            usuario=cls.residente, numero_casa='Casa 2', nombre='Michi', dueno='Ana', tipo='gato',
+        )
+
+    def test_media_con_permisos_y_sin_bytes_en_el_worker(self):
+        url = reverse('usuarios:media', args=[self.ruta_pdf])
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(self.residente)
+        with override_settings(MEDIA_ENVIO='x-accel'):
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['X-Accel-Redirect'], f'{settings.MEDIA_ENVIO_PREFIJO}{self.ruta_pdf}')
+        self.assertEqual((respuesta['Content-Type'], respuesta.content), ('application/pdf', b''))
+
+        # Con ETag o fecha vigentes no se envía nada
+        etag, fecha = respuesta['ETag'], respuesta['Last-Modified']
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+        self.assertEqual(self.client.get(url, headers={'If-Modified-Since': fecha}).status_code, 304)
+
+        # Sin servidor web delante, el worker atiende Range
+        tamano = self.publicacion.archivo_pdf.size
+        with override_settings(MEDIA_ENVIO='django'):
+            parcial = self.client.get(url, headers={'Range': 'bytes=0-8'})
+            self.assertEqual(parcial.status_code, 206)
+            self.assertEqual(parcial['Content-Range'], f'bytes 0-8/{tamano}')
+            self.assertEqual(b''.join(parcial.streaming_content), b'%PDF-1.4\n')
+            self.assertEqual(self.client.get(url, headers={'Range': 'bytes=-10'})['Content-Length'], '10')
+            self.assertEqual(self.client.get(url, headers={'Range': f'bytes={tamano}-'}).status_code, 416)
+            # Si el archivo cambió (If-Range no coincide) se envía completo
+            completo = self.client.get(url, headers={'Range': 'bytes=0-8', 'If-Range': '"otro"'})
+            self.assertEqual((completo.status_code, completo['Content-Length']), (200, str(tamano)))
+
+        # Archivos que ningún registro usa, o imágenes sin procesar, no se entregan
+        self.publicacion.archivo_pdf.storage.save('publicaciones/documentos/huerfano.pdf', ContentFile(b'%PDF'))
+        self.addCleanup(self.publicacion.archivo_pdf.storage.delete, 'publicaciones/documentos/huerfano.pdf')
+        self.assertEqual(self.client.get(reverse('usuarios:media', args=['publicaciones/documentos/huerfano.pdf'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('usuarios:media', args=['../config/settings.py'])).status_code, 404)
+        Mascota.objects.filter(pk=self.mascota.pk).update(foto='mascotas/fotos/cruda.jpg', estado_foto='pendiente')
+        self.assertEqual(self.client.get(reverse('usuarios:media', args=['mascotas/fotos/cruda.jpg'])).status_code, 404)
+
+
+class BusquedaTests(PruebaUsuarios):
+    """Búsqueda de texto completo sobre publicaciones y solicitudes."""
+
+    def test_busqueda_de_texto_completo(self):
+        luces = Publicacion.objects.create(
+            autor=self.admin, titulo='Reparación de las luces del parque', contenido='Se cambiarán los focos el lunes.'
+        )
+        fuga = Solicitud.objects.create(
+            usuario=self.residente, titulo='Fuga de agua', descripcion='Hay una fuga junto a la reparación del parque.',
+            tipo='mantenimiento',
+        )
+
+        def encontrados(consulta, tipo=None):
+            return [(item.tipo_busqueda, item.pk) for item in buscar(consulta, tipo)[0]]
+
+        # Sin tildes, en plural o singular, por prefijo; el título pesa más que el cuerpo
+        self.assertEqual(encontrados('REPARACIONES parque'), [('publicacion', luces.pk), ('solicitud', fuga.pk)])
+        self.assertEqual(encontrados('luz'), [('publicacion', luces.pk)])
+        self.assertEqual(encontrados('repar', 'solicitud'), [('solicitud', fuga.pk)])
+        self.assertEqual(encontrados('de la'), [])
+
+        # El índice sigue a cada cambio
+        fuga.titulo = 'Filtración en el techo'
+        fuga.save()
+        self.assertEqual(encontrados('filtracion'), [('solicitud', fuga.pk)])
+        luces.delete()
+        self.assertEqual(encontrados('luces'), [])
+
+        self.client.force_login(self.residente)
+        respuesta = self.client.get(reverse('usuarios:api_buscar'), {'q': 'techo'}).json()
+        self.assertEqual([(r['tipo'], r['id']) for r in respuesta['resultados']], [('solicitud', fuga.pk)])
+        self.assertEqual(self.client.get(reverse('usuarios:api_buscar'), {'q': 'techo', 'tipo': 'x'}).status_code, 400)
+
+        # Volumen: NUM_DOCUMENTOS_BUSQUEDA documentos; las palabras siguen la ley de Zipf,
+        # como en un texto real: unas pocas muy comunes y muchas raras
+        azar = random.Random(19)
+        silabas = ['ba', 'ca', 'da', 'fe', 'ga', 'li', 'mo', 'nu', 'pe', 'ra', 'si', 'to', 'vi', 'zu']
+        vocabulario = [normalizar(palabra) for palabra in (
+            'estado cuenta asamblea agua fuga techo parque piscina guardia portón reunión cuota pago '
+            'mantenimiento jardín basura ruido mascota vehículo ascensor bomba pintura alarma limpieza'
+        ).split()]
+        vocabulario += [''.join(azar.choices(silabas, k=4)) for _ in range(5000)]
+        pesos = [1 / (posicion + 10) for posicion in range(len(vocabulario))]
+        fecha = timezone.now()
+        DocumentoBusqueda.objects.bulk_create([
+            DocumentoBusqueda(
+                tipo='publicacion', objeto_id=10_000_000 + i,
+                titulo=' '.join(azar.choices(vocabulario, pesos, k=4)),
+                cuerpo=' '.join(azar.choices(vocabulario, pesos, k=40)),
+                fecha=fecha,
+            )
+            for i in range(NUM_DOCUMENTOS_BUSQUEDA)
+        ], batch_size=5000)
+        for consulta in ('estado de cuenta', 'fuga de agua en el techo', 'asamblea', 'pa'):
+            with self.subTest(consulta=consulta):
+                inicio = time.perf_counter()
+                buscar(consulta)
+                milisegundos = (time.perf_counter() - inicio) * 1000
+                self._comprobar_tiempo(milisegundos, PRESUPUESTO_BUSQUEDA_MS)
+
+
+class PlacasTests(PruebaUsuarios):
+    """Placas normalizadas y búsqueda tolerante a errores para la garita."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Vehiculo.objects.bulk_create([
+            Vehiculo(
+                usuario=cls.residente if i < 5 else cls.vecino, numero_casa=f'Casa {i + 1}', dueno=f'Dueño {i}',
+                placa=f'PBA-{i:04d}', placa_normalizada=f'PBA{i:04d}', marca='Chevrolet', modelo='Aveo', color='Gris',
+            )
+            for i in range(50)
+        ])
+
+    def test_placas_para_la_garita(self):
+        self.assertEqual(normalizar_placa(' pba-0001 '), 'PBA0001')
+
+        # El mismo vehículo escrito de otra forma es un duplicado
+        self.client.force_login(self.residente)
+        datos = {'numero_casa': 'Casa 9', 'dueno': 'Ana', 'marca': 'Kia', 'modelo': 'Rio', 'color': 'Rojo'}
+        self.client.post(reverse('usuarios:crear_vehiculo'), {**datos, 'placa': 'pba 0001'})
+        self.assertFalse(Vehiculo.objects.filter(placa='pba 0001').exists())
+        self.client.post(reverse('usuarios:crear_vehiculo'), {**datos, 'placa': 'gxy-4821'})
+        vehiculo = Vehiculo.objects.get(placa_normalizada='GXY4821')
+
+        self.client.force_login(self.admin)
+
+        def consultar(placa):
+            return [
+                (resultado['errores'], resultado['id'])
+                for resultado in self.client.get(reverse('usuarios:api_placas'), {'placa': placa}).json()['resultados']
+            ]
+
+        # Un carácter cambiado, dos letras invertidas, uno de menos, dos errores
+        for placa, errores in (('GXY-4821', 0), ('GXY-4827', 1), ('GYX 4821', 1), ('GXY482', 1), ('GXV-4B21', 2)):
+            with self.subTest(placa=placa):
+                self.assertEqual(consultar(placa)[0], (errores, vehiculo.id))
+        self.assertEqual(consultar('QWE-9999'), [])
+        self.assertEqual(self.client.get(reverse('usuarios:api_placas'), {'placa': ' - '}).status_code, 400)
+
+        # El índice sigue a cada cambio
+        self.client.post(reverse('usuarios:editar_vehiculo', args=[vehiculo.id]), {'placa': 'HZT-0550'})
+        self.assertEqual(consultar('HZT0550'), [(0, vehiculo.id)])
+        self.assertEqual(consultar('GXY4821'), [])
+        self.client.post(reverse('usuarios:eliminar_vehiculo', args=[vehiculo.id]))
+        self.assertEqual(consultar('HZT0550'), [])
+
+        # Con NUM_PLACAS_GARITA placas con el formato del país, cada consulta en memoria
+        azar = random.Random(20)
+        letras = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+        placas = [
+            f'{azar.choice("PGUAIC")}{azar.choice(letras)}{azar.choice(letras)}-{azar.randrange(10000):04d}'
+            for _ in range(NUM_PLACAS_GARITA)
+        ]
+        indice = IndicePlacas({'id': i, 'placa': placa} for i, placa in enumerate(placas))
+        consultas = [placa[1] + placa[0] + placa[2:-1] + 'X' for placa in azar.sample(placas, 500)]
+        inicio = time.perf_counter()
+        for consulta in consultas:
+            self.assertTrue(indice.buscar(consulta))
+        milisegundos = (time.perf_counter() - inicio) * 1000 / len(consultas)
+        self._comprobar_tiempo(milisegundos, PRESUPUESTO_PLACA_MS)
+
+
+class AdminTests(PruebaUsuarios):
+    """El admin de Django con NUM_USUARIOS_ADMIN usuarios y el resto del volumen de producción."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls._sembrar_volumen()
+        Usuario.objects.bulk_create([
+            Usuario(username=f'extra{i}', email=f'extra{i}@selva.ec', first_name='Extra', last_name=f'{i:05d}')
+            for i in range(NUM_USUARIOS_ADMIN - NUM_USUARIOS)
+        ], batch_size=2000)
+        Usuario.objects.filter(pk=cls.admin.pk).update(is_staff=True, is_superuser=True)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_admin_con_muchos_usuarios(self):
+        self.client.force_login(self.admin)
+        ultimo = f'Extra {NUM_USUARIOS_ADMIN - NUM_USUARIOS - 1:05d}'
+
+        paginas = [
+            ('admin:usuarios_usuario_changelist', [], {}),
+            ('admin:usuarios_solicitud_changelist', [], {}),
+            ('admin:usuarios_solicitud_changelist', [], {'usuario__id__exact': self.residente.id}),
+            ('admin:usuarios_solicitud_changelist', [], {'estado__exact': 'pendiente'}),
+            ('admin:usuarios_evento_changelist', [], {}),
+            ('admin:usuarios_vehiculo_changelist', [], {}),
+            ('admin:usuarios_mascota_changelist', [], {}),
+            ('admin:usuarios_publicacion_changelist', [], {}),
+            ('admin:usuarios_solicitud_change', [self.solicitud.id], {}),
+            ('admin:usuarios_vehiculo_change', [self.vehiculo.id], {}),
+            ('admin:usuarios_evento_add', [], {}),
+        ]
+        for nombre, argumentos, parametros in paginas:
+            with self.subTest(pagina=nombre, parametros=parametros):
+                url = reverse(nombre, args=argumentos)
+                with CaptureQueriesContext(connection) as consultas:
+                    inicio = time.perf_counter()
+                    respuesta = self.client.get(url, parametros)
+                    milisegundos = (time.perf_counter() - inicio) * 1000
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertLessEqual(
+                    len(consultas), MAX_CONSULTAS_ADMIN,
+                    f'{url}: {len(consultas)} consultas\n' + '\n'.join(c['sql'] for c in consultas.captured_queries)
+                )
+                self._comprobar_tiempo(milisegundos, PRESUPUESTO_ADMIN_MS, url)
+                # Ni filtros ni selects listan a todos los usuarios
+                if nombre != 'admin:usuarios_usuario_changelist':
+                    self.assertNotContains(respuesta, ultimo)
+
+        # El filtro y los selects traen los usuarios por autocompletado
+        respuesta = self.client.get(reverse('admin:autocomplete'), {
+            'term': ultimo, 'app_label': 'usuarios', 'model_name': 'solicitud', 'field_name': 'usuario',
+        })
+        self.assertEqual([r['text'] for r in respuesta.json()['results']], [ultimo])
+
+        # El buscador de solicitudes también encuentra por el correo del autor
+        respuesta = self.client.get(reverse('admin:usuarios_solicitud_changelist'), {'q': 'residente@selva'})
+        self.assertEqual(respuesta.context['cl'].result_count, Solicitud.objects.filter(usuario=self.residente).count())
+
+
+class SolicitudesEnLoteTests(PruebaUsuarios):
+    """Cambio de estado de muchas solicitudes a la vez, desde el dashboard y desde el admin."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Solicitud.objects.bulk_create([
+            Solicitud(
+                usuario=cls.residente if i % 3 else cls.vecino, titulo=f'Solicitud {i}',
+                descripcion='Detalle de la solicitud', tipo='queja', estado='pendiente' if i % 2 else 'aprobada',
+            )
+            for i in range(2 * NUM_SOLICITUDES_LOTE + 10)
+        ])
+
+    def test_gestion_de_solicitudes_en_lote(self):
+        url = reverse('usuarios:gestionar_solicitudes_lote')
+        self.client.force_login(self.admin)
+        pendientes = list(
+            Solicitud.objects.filter(estado='pendiente').order_by('id').values_list('id', flat=True)[:NUM_SOLICITUDES_LOTE]
+        )
+
+        # Las consultas no crecen con el número de solicitudes
+        for ids in (pendientes[:3], pendientes):
+            with self.subTest(solicitudes=len(ids)):
+                respuesta, consultas, _ = self._medir(self.admin, 'post', url, {'ids': ids, 'estado': 'rechazada'})
+                self.assertEqual(respuesta.json()['actualizadas'], len(ids))
+                self.assertLessEqual(len(consultas), 8)
+
+        version_residente = version('solicitudes_lote')
+        novedades = Novedad.objects.count()
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post(url, {'ids': pendientes, 'estado': 'rechazada', 'respuesta': 'Resuelto en asamblea'})
+        self.assertEqual(respuesta.json(), {'actualizadas': len(pendientes), 'estado': 'rechazada', 'estado_display': 'Rechazada'})
+        self.assertEqual(
+            Solicitud.objects.filter(pk__in=pendientes, estado='rechazada', respuesta_admin='Resuelto en asamblea').count(),
+            len(pendientes)
+        )
+        # Una sola novedad para todo el lote, y las listas de los residentes se recalculan
+        self.assertEqual(Novedad.objects.count(), novedades + 1)
+        novedad = Novedad.objects.last()
+        self.assertEqual((novedad.tipo, sorted(novedad.datos['ids'])), ('solicitudes', pendientes))
+        self.assertNotEqual(version('solicitudes_lote'), version_residente)
+
+        for datos in ({'ids': pendientes, 'estado': 'borrada'}, {'ids': ['x'], 'estado': 'rechazada'}, {'estado': 'rechazada'}):
+            with self.subTest(datos=datos):
+                self.assertEqual(self.client.post(url, datos).status_code, 400)
+        self.client.force_login(self.residente)
+        self.assertNotEqual(self.client.post(url, {'ids': pendientes, 'estado': 'aprobada'}).status_code, 200)
+
+        # La misma acción en el admin, con su página intermedia
+        Usuario.objects.filter(pk=self.admin.pk).update(is_staff=True, is_superuser=True)
+        self.client.force_login(self.admin)
+        lista = reverse('admin:usuarios_solicitud_changelist')
+        elegidas = {'action': 'gestionar_en_lote', '_selected_action': pendientes[:10]}
+        self.assertContains(self.client.post(lista, elegidas), 'name="aplicar"')
+        respuesta = self.client.post(lista, {**elegidas, 'aplicar': '1', 'estado': 'aprobada', 'respuesta': ''})
+        self.assertRedirects(respuesta, lista, fetch_redirect_response=False)
+        self.assertEqual(
+            list(Solicitud.objects.filter(pk__in=pendientes[:10]).order_by().values_list('estado', 'respuesta_admin').distinct()),
+            [('aprobada', 'Resuelto en asamblea')]
+        )
+
+
+class ExportacionTests(PruebaUsuarios):
+    """Exportación a CSV y XLSX por partes, con el volumen de producción."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls._sembrar_volumen()
+
+    def _descargar(self, nombre, **parametros):
+        respuesta = self.client.get(reverse('usuarios:exportar', args=[nombre]), parametros)
+        self.assertTrue(respuesta.streaming)
+        return list(csv.reader(io.StringIO(b''.join(respuesta.streaming_content).decode('utf-8-sig'))))
+
+    def test_exportacion_por_partes(self):
+        self.client.force_login(self.admin)
+        pendientes = self._descargar('solicitudes', estado='pendiente')
+        self.assertEqual(pendientes[0][:4], ['ID', 'Título', 'Tipo', 'Estado'])
+        self.assertEqual(len(pendientes) - 1, Solicitud.objects.filter(estado='pendiente').count())
+        self.assertEqual({fila[3] for fila in pendientes[1:]}, {'Pendiente'})
+
+        # Los filtros van en el WHERE; hasta incluye el día completo
+        hoy = timezone.localdate().isoformat()
+        ayer = (timezone.localdate() - timedelta(days=1)).isoformat()
+        casa = self._descargar('usuarios', casa='Casa 2', desde=hoy, hasta=hoy)
+        self.assertEqual(
+            [fila[1] for fila in casa[1:]],
+            list(Usuario.objects.filter(casa_departamento='Casa 2').order_by('id').values_list('username', flat=True))
+        )
+        self.assertEqual(len(self._descargar('usuarios', casa='Casa 2', hasta=ayer)), 1)
+        perros = self._descargar('mascotas', tipo='perro', estado='activo')
+        self.assertEqual(len(perros) - 1, Mascota.objects.filter(tipo='perro', activo=True).count())
+        for nombre, parametros in (
+            ('vehiculos', {'estado': 'pendiente'}), ('solicitudes', {'tipo': 'otra'}),
+            ('solicitudes', {'desde': '18/10/2026'}), ('solicitudes', {'formato': 'pdf'}),
+        ):
+            with self.subTest(nombre=nombre, parametros=parametros):
+                self.assertEqual(self.client.get(reverse('usuarios:exportar', args=[nombre]), parametros).status_code, 400)
+        self.assertEqual(self.client.get(reverse('usuarios:exportar', args=['mensajes'])).status_code, 404)
+
+        # El encabezado sale antes de consultar, y la memoria no crece con las filas
+        def pico_al_exportar(por_partes, solicitudes):
+            partes = por_partes(*filas('solicitudes', solicitudes))
+            with CaptureQueriesContext(connection) as consultas:
+                next(partes)
+            self.assertEqual(len(consultas), 0)
+            tracemalloc.start()
+            try:
+                for _ in partes:
+                    pass
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        cuarto = Solicitud.objects.order_by('id').values_list('id', flat=True)[NUM_SOLICITUDES // 4]
+        for por_partes in (csv_por_partes, xlsx_por_partes):
+            with self.subTest(formato=por_partes.__name__):
+                pico = pico_al_exportar(por_partes, Solicitud.objects.all())
+                self.assertLessEqual(pico, PRESUPUESTO_MEMORIA_EXPORTACION_MB * 1024 * 1024)
+                self.assertLessEqual(pico, 1.2 * pico_al_exportar(por_partes, Solicitud.objects.filter(id__lt=cuarto)))
+
+        # Las acciones del admin exportan lo elegido
+        Usuario.objects.filter(pk=self.admin.pk).update(is_staff=True, is_superuser=True)
+        respuesta = self.client.post(reverse('admin:usuarios_vehiculo_changelist'), {
+            'action': 'exportar_xlsx', '_selected_action': [self.vehiculo.id],
+        })
+        self.assertEqual(respuesta['Content-Type'], 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        with zipfile.ZipFile(io.BytesIO(b''.join(respuesta.streaming_content))) as libro:
+            hoja = libro.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(hoja.count('<row>'), 2)
+        self.assertIn(self.vehiculo.placa, hoja)
+
+    async def test_exportacion_bajo_asgi_es_asincrona(self):
+        # Con un iterador síncrono, Django juntaría la descarga entera antes de enviarla
+        cliente = AsyncClient()
+        await cliente.aforce_login(self.admin)
+        respuesta = await cliente.get(reverse('usuarios:exportar', args=['vehiculos']))
+        self.assertTrue(respuesta.is_async)
+        contenido = b''.join([parte async for parte in respuesta.streaming_content])
+        self.assertEqual(contenido.decode('utf-8-sig').count('\r\n'), NUM_VEHICULOS + 1)
+
+
+class ImportacionTests(PruebaUsuarios):
+    """Alta de residentes desde un CSV, por comando y desde el admin."""
+
+    def _archivo_temporal(self, contenido):
+        archivo = tempfile.NamedTemporaryFile(suffix='.csv', delete=False)
+        self.addCleanup(os.remove, archivo.name)
+        with archivo:
+            archivo.write(contenido)
+        return archivo.name
+
+    def test_importacion_de_residentes(self):
+        filas = ['username,email,first_name,last_name,telefono,casa_departamento,rol,password']
+        filas += [
+            f'bloque{i},bloque{i}@selva.ec,Nombre{i},Apellido{i},09{i:08d},Torre {i % 50},vecino,{CLAVE if i % 2 else ""}'
+            for i in range(NUM_IMPORTACION)
+        ]
+        # Teléfono inválido, correo repetido en el archivo, usuario ya registrado, rol desconocido
+        filas += [
+            'malo1,malo1@selva.ec,Malo,Uno,12345,,,',
+            'malo2,bloque0@selva.ec,Malo,Dos,0990000099,,,',
+            'vecino,otro@selva.ec,Malo,Tres,0990000098,,,',
+            'malo4,malo4@selva.ec,Malo,Cuatro,0990000097,,portero,',
+        ]
+        contenido = '\n'.join(filas).encode()
+
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            call_command('importar_usuarios', self._archivo_temporal(contenido), stdout=StringIO(), stderr=(errores := StringIO()))
+            segundos = time.perf_counter() - inicio
+        self.assertEqual(Usuario.objects.filter(username__startswith='bloque').count(), NUM_IMPORTACION)
+        self._comprobar_tiempo(segundos, PRESUPUESTO_IMPORTACION_S)
+        self.assertLessEqual(len(consultas), MAX_CONSULTAS_IMPORTACION)
+        informe = errores.getvalue().splitlines()
+        self.assertEqual([linea.split(':')[0] for linea in informe], [f'Línea {NUM_IMPORTACION + n}' for n in range(2, 6)])
+        self.assertIn('telefono:', informe[0])
+        self.assertIn('se repite en la línea 2', informe[1])
+        self.assertIn('vecino ya está registrado', informe[2])
+        self.assertIn('rol:', informe[3])
+
+        # Con contraseña puede entrar; sin ella, la cuenta espera a que se la asignen
+        self.assertTrue(Usuario.objects.get(username='bloque1').check_password(CLAVE))
+        self.assertFalse(Usuario.objects.get(username='bloque0').has_usable_password())
+
+        # Con PBKDF2 los hashes salen del pool de procesos, en el formato de Django
+        with override_settings(
+            PASSWORD_HASHERS=['django.contrib.auth.hashers.PBKDF2PasswordHasher'], TAREAS_EN_SEGUNDO_PLANO=True,
+        ):
+            hashes = hashear([CLAVE, None, 'Otra-Clave-2026'])
+            self.assertTrue(check_password(CLAVE, hashes[0]))
+            self.assertFalse(check_password('', hashes[1]))
+            self.assertTrue(check_password('Otra-Clave-2026', hashes[2]))
+
+        # Desde el admin, solo validar no crea a nadie
+        Usuario.objects.filter(pk=self.admin.pk).update(is_staff=True, is_superuser=True)
+        self.client.force_login(self.admin)
+        self.assertContains(self.client.get(reverse('admin:usuarios_usuario_changelist')), 'Importar CSV')
+        url = reverse('admin:usuarios_usuario_importar')
+        archivo = SimpleUploadedFile('bloque.csv', '\n'.join(filas[:1] + ['nuevo1,nuevo1@selva.ec,Nuevo,Uno,0990000096,,,', filas[-4]]).encode())
+        respuesta = self.client.post(url, {'archivo': archivo, 'solo_validar': 'on'})
+        self.assertContains(respuesta, '1 filas válidas')
+        self.assertFalse(Usuario.objects.filter(username='nuevo1').exists())
+        archivo = SimpleUploadedFile('bloque.csv', b'nombre,correo\nAna,ana@selva.ec')
+        self.assertContains(self.client.post(url, {'archivo': archivo}), 'Faltan columnas')
+
+
+class LoginTests(PruebaUsuarios):
+    """Login con límite de intentos por usuario y por IP."""
+
+    @override_settings(
+        LOGIN_MAX_FALLOS_USUARIO=3, LOGIN_MAX_FALLOS_IP=3,
+        PASSWORD_HASHERS=['django.contrib.auth.hashers.PBKDF2PasswordHasher', 'django.contrib.auth.hashers.MD5PasswordHasher'],
+    )
+    def test_login_con_limite_de_intentos(self):
+        url = reverse('usuarios:login')
+
+        def intentar(username, password, ip):
+            return self.client.post(url, {'username': username, 'password': password}, REMOTE_ADDR=ip)
+
+        # Usuarios al azar desde una misma IP: tras el límite, ni consultas ni hash
+        for i in range(3):
+            self.assertContains(intentar(f'nadie{i}', 'x', '203.0.113.9'), 'incorrectos')
+        for i in range(NUM_INTENTOS_ATAQUE):
+            with CaptureQueriesContext(connection) as consultas:
+                inicio = time.perf_counter()
+                respuesta = intentar(f'otro{i}', 'x', '203.0.113.9')
+                milisegundos = (time.perf_counter() - inicio) * 1000
+            self.assertEqual(respuesta.status_code, 429)
+            self.assertEqual(len(consultas), 0)
+            self._comprobar_tiempo(milisegundos, PRESUPUESTO_LOGIN_BLOQUEADO_MS)
+        self.assertGreater(int(respuesta['Retry-After']), 0)
+
+        # Mientras tanto, un residente desde otra IP entra sin problema
+        self.assertRedirects(intentar('residente', CLAVE, '198.51.100.7'), reverse('usuarios:dashboard'), fetch_redirect_response=False)
+        self.client.logout()
+
+        # Por usuario, aunque cada intento llegue de otra IP
+        for i in range(3):
+            intentar('vecino', 'x', f'198.51.100.{20 + i}')
+        self.assertEqual(intentar('vecino', CLAVE, '198.51.100.30').status_code, 429)
+
+        # Entrar con la contraseña correcta borra los fallos del usuario
+        for ip in ('198.51.100.40', '198.51.100.41'):
+            intentar('admin', 'x', ip)
+        self.assertEqual(intentar('admin', CLAVE, '198.51.100.42').status_code, 302)
+        self.client.logout()
+        for ip in ('198.51.100.43', '198.51.100.44'):
+            intentar('admin', 'x', ip)
+        self.assertEqual(intentar('admin', CLAVE, '198.51.100.45').status_code, 302)
+
+
+class _FlujoSSE:
+    """Lee una respuesta text/event-stream evento por evento, como EventSource."""
+
+    def __init__(self, respuesta):
+        self.partes = respuesta.streaming_content
+
+    async def leer(self):
+        return (await asyncio.wait_for(anext(self.partes), 5)).decode()
+
+    async def cerrar(self):
+        # Igual que el servidor cuando el cliente se desconecta: cancela la espera en curso
+        lectura = asyncio.ensure_future(anext(self.partes))
+        await asyncio.sleep(0)
+        lectura.cancel()
+        with contextlib.suppress(asyncio.CancelledError, StopAsyncIteration):
+            await lectura
+
+
+class _ConexionWebSocket:
+    """Cliente ASGI mínimo para probar usuarios.chat sin levantar un servidor."""
+
+    def __init__(self, cookie):
+        self.entrada = asyncio.Queue()
+        self.salida = asyncio.Queue()
+        scope = {
+            'type': 'websocket', 'path': '/ws/chat/',
+            'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+        }
+        self.tarea = asyncio.create_task(chat_websocket(scope, self.entrada.get, self.salida.put))
+
+    async def conectar(self):
+        await self.entrada.put({'type': 'websocket.connect'})
+        return await asyncio.wait_for(self.salida.get(), 5)
+
+    async def enviar(self, datos):
+        await self.entrada.put({'type': 'websocket.receive', 'text': json.dumps(datos)})
+
+    async def recibir(self):
+        evento = await asyncio.wait_for(self.salida.get(), 5)
+        return json.loads(evento['text'])
+
+    async def cerrar(self):
+        await self.entrada.put({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.wait_for(self.tarea, 5)
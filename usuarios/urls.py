@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
@@ -8,8 +9,22 @@ urlpatterns = [
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('dashboard/', views.dashboard_view, name='dashboard'),
+    # Tarjetas del dashboard (carga diferida en JSON)
+    path('dashboard/solicitudes/', views.tarjeta_solicitudes, name='tarjeta_solicitudes'),
+    path('dashboard/mascotas/', views.tarjeta_mascotas, name='tarjeta_mascotas'),
+    path('dashboard/vehiculos/', views.tarjeta_vehiculos, name='tarjeta_vehiculos'),
+    path('dashboard/vecinos/', views.tarjeta_vecinos, name='tarjeta_vecinos'),
+    path('dashboard/publicaciones/', views.tarjeta_publicaciones, name='tarjeta_publicaciones'),
+    # API JSON paginada por cursor
+    path('api/solicitudes/', views.api_solicitudes, name='api_solicitudes'),
+    path('api/publicaciones/', views.api_publicaciones, name='api_publicaciones'),
+    path('api/vehiculos/', views.api_vehiculos, name='api_vehiculos'),
+    # Búsqueda de texto completo en publicaciones y solicitudes
+    path('api/buscar/', views.api_buscar, name='api_buscar'),
+    path('api/placas/', views.api_placas, name='api_placas'),
     path('solicitudes/crear/', views.crear_solicitud, name='crear_solicitud'),
     path('solicitudes/gestionar/<int:solicitud_id>/', views.gestionar_solicitud, name='gestionar_solicitud'),
+    path('solicitudes/gestionar/lote/', views.gestionar_solicitudes_lote, name='gestionar_solicitudes_lote'),
     path('solicitudes/reaccionar/<int:solicitud_id>/', views.reaccionar_solicitud, name='reaccionar_solicitud'),
     path('crear_usuario/', views.crear_usuario, name='crear_usuario'),
     path('lista_usuarios/', views.lista_usuarios, name='lista_usuarios'),
@@ -28,4 +43,22 @@ urlpatterns = [
     path('vehiculos/obtener/<int:vehiculo_id>/', views.obtener_vehiculo, name='obtener_vehiculo'),
     path('vehiculos/editar/<int:vehiculo_id>/', views.editar_vehiculo, name='editar_vehiculo'),
     path('vehiculos/eliminar/<int:vehiculo_id>/', views.eliminar_vehiculo, name='eliminar_vehiculo'),
+    # Chat (los mensajes en tiempo real van por el WebSocket /ws/chat/)
+    path('chat/contactos/', views.chat_contactos, name='chat_contactos'),
+    path('chat/bandeja/', views.chat_bandeja, name='chat_bandeja'),
+    path('chat/historial/<int:usuario_id>/', views.chat_historial, name='chat_historial'),
+    path('chat/difusiones/crear/', views.crear_difusion, name='crear_difusion'),
+    path('chat/difusiones/<int:difusion_id>/', views.estado_difusion, name='estado_difusion'),
+
+    # Exportación a CSV/XLSX (usuarios, vehiculos, mascotas, solicitudes)
+    path('exportar/<str:nombre>/', views.exportar, name='exportar'),
+
+    # Novedades en vivo del dashboard (Server-Sent Events)
+    path('novedades/', views.novedades, name='novedades'),
+
+    # Archivos subidos, con permisos; los bytes los envía el servidor web
+    path(f'{settings.MEDIA_URL.strip("/")}/<path:ruta>', views.media, name='media'),
+
+    # Métricas de rendimiento para Prometheus
+    path('metrics/', views.metricas, name='metricas'),
 ]
@@ -1,47 +1,83 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth import authenticate, login
+from django.contrib.auth import login
+from django.contrib.auth.signals import user_login_failed
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404, HttpResponse, QueryDict, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.apps import apps
 from .forms import UsuarioCreationForm, UsuarioChangeForm, EventoForm
 from django.contrib import messages
+from django.core.exceptions import ValidationError
 from django.views.decorators.http import require_http_methods, require_POST
+from django.db import transaction
+from django.db.models import Q
 from datetime import datetime
-from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.utils.text import Truncator
+from django.conf import settings
 import calendar
-from .models import Evento, Solicitud, Usuario, Mascota, Publicacion, Vehiculo, ReaccionSolicitud
+import math
+from .models import CASA_ORDEN, Solicitud, Usuario, Mascota, Publicacion, Vehiculo, Mensaje, Conversacion, Difusion
+from .paginacion import paginar_keyset, paginar_por_campos, CursorInvalido
+from .cache_dashboard import fragmento
+from .calendario import eventos_del_mes, eventos_por_dia
+from .metricas import exportar_prometheus
+from .chat import MAX_CONTENIDO, serializar_mensaje
+from .difusiones import enviar_difusion
+from .novedades import flujo_novedades, publicar_novedad
+from .tareas import encolar
+from .imagenes import recortar_al_procesar, recorte_de_vista_previa
+from .busqueda import buscar
+from .gestion_solicitudes import ESTADOS, MAX_LOTE, gestionar_en_lote
+from .placas import buscar_placa, normalizar_placa
+from .exportacion import EXPORTACIONES, FORMATOS, filtrar, respuesta_exportacion
+from .limite_intentos import Intentos
+from .media import archivo_publicado, responder_archivo
 
 
 @require_http_methods(["GET", "POST"])
 def login_view(request):
     """
     Vista de login para residentes del conjunto.
-    Permite autenticación con username y contraseña.
+    Permite autenticación con username y contraseña. El usuario se busca una
+    sola vez, y los intentos fallidos se limitan por usuario y por IP
+    (usuarios.limite_intentos) antes de calcular ningún hash.
     """
     if request.method == 'POST':
-        username = request.POST.get('username')
-        password = request.POST.get('password')
-        
-        # Primero verificar si el usuario existe
+        username = request.POST.get('username', '')
+        password = request.POST.get('password', '')
+
+        intentos = Intentos(request, username)
+        espera = intentos.espera
+        if espera:
+            messages.error(request, f'Demasiados intentos fallidos. Intenta de nuevo en {math.ceil(espera / 60)} minutos.')
+            respuesta = render(request, 'usuarios/login.html', status=429)
+            respuesta['Retry-After'] = str(espera)
+            return respuesta
+
         try:
-            usuario_existente = Usuario.objects.get(username=username)
-            
+            usuario = Usuario.objects.get(username=username)
+        except Usuario.DoesNotExist:
+            usuario = None
+            # Mismo costo que con un usuario existente, para no delatar cuáles existen por el tiempo
+            Usuario().set_password(password)
+        else:
             # Si existe pero está inactivo, mostrar mensaje específico
-            if not usuario_existente.is_active:
+            if not usuario.is_active:
                 messages.error(request, 'Usuario inactivo. Comuníquese con el administrador.')
                 return render(request, 'usuarios/login.html')
-        except Usuario.DoesNotExist:
-            pass  # Si no existe, continuar con autenticación normal
-        
-        # Autenticar al usuario
-        user = authenticate(request, username=username, password=password)
-        
-        if user is not None:
-            login(request, user)
-            messages.success(request, f'¡Bienvenido {user.get_full_name() or user.username}!')
-            return redirect('usuarios:dashboard')  
-        else:
-            messages.error(request, 'Usuario o contraseña incorrectos.')
-    
+
+        # Lo mismo que authenticate() con ModelBackend, sin volver a buscar al usuario
+        if usuario is not None and usuario.check_password(password):
+            intentos.exito()
+            login(request, usuario, backend='django.contrib.auth.backends.ModelBackend')
+            messages.success(request, f'¡Bienvenido {usuario.get_full_name() or usuario.username}!')
+            return redirect('usuarios:dashboard')
+
+        intentos.fallo()
+        user_login_failed.send(sender=__name__, credentials={'username': username}, request=request)
+        messages.error(request, 'Usuario o contraseña incorrectos.')
+
     return render(request, 'usuarios/login.html')
 
 
@@ -58,25 +94,18 @@ def dashboard_view(request):
     # Generar calendario del mes
     cal = calendar.monthcalendar(ano, mes)
     
-    # Obtener eventos del usuario para este mes
-    # Obtener eventos del usuario O eventos de administradores (globales)
-    # Filtramos por mes y año
-    from django.db.models import Q
-    eventos = Evento.objects.filter(
-        Q(usuario=request.user) | Q(usuario__rol='admin'),
-        fecha_inicio__year=ano,
-        fecha_inicio__month=mes
-    ).distinct()
+    # Eventos del usuario + eventos de administradores (globales). Los globales
+    # son iguales para todos y se cachean; es_global evita el JOIN con usuarios.
+    eventos = fragmento(
+        f'eventos_globales:{ano}-{mes}', [('eventos', None)],
+        lambda: eventos_del_mes(ano, mes, es_global=True)
+    )
+    if request.user.rol != 'admin':
+        propios = eventos_del_mes(ano, mes, usuario=request.user, es_global=False)
+        eventos = sorted(eventos + propios, key=lambda evento: evento.fecha_inicio)
     
-    # Crear diccionario {día: [eventos]}
-    eventos_por_dia = {}
-    for evento in eventos:
-        # Convertir a zona horaria local antes de obtener el día
-        fecha_local = timezone.localtime(evento.fecha_inicio)
-        dia = fecha_local.day
-        if dia not in eventos_por_dia:
-            eventos_por_dia[dia] = []
-        eventos_por_dia[dia].append(evento)
+    # Crear diccionario {día: [eventos]}, incluyendo cada día de los eventos largos
+    eventos_dia = eventos_por_dia(eventos, ano, mes)
     
     # Calcular mes anterior y siguiente
     if mes == 1:
@@ -97,44 +126,39 @@ def dashboard_view(request):
     meses = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
              'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
     
-    # Obtener solicitudes según el rol
+    # Solo se calculan los contadores de las tarjetas; el contenido de cada
+    # tarjeta se carga bajo demanda desde su propio endpoint JSON.
     if request.user.es_administrador():
-        solicitudes = Solicitud.objects.all().order_by('-fecha_creacion')
-        # Contador de solicitudes pendientes para el administrador
-        solicitudes_pendientes_count = solicitudes.filter(estado='pendiente').count()
-        todas_las_solicitudes = solicitudes
-    else:
-        solicitudes = Solicitud.objects.filter(usuario=request.user).order_by('-fecha_creacion')
-        solicitudes_pendientes_count = 0
-        todas_las_solicitudes = Solicitud.objects.all().order_by('-fecha_creacion')
-    
-    # Obtener mascotas registradas
-    mascotas = Mascota.objects.filter(activo=True)
-    
-    # Obtener vehículos del usuario o todos si es admin
-    if request.user.es_administrador():
-        vehiculos = Vehiculo.objects.all().order_by('-fecha_registro')
+        contadores = fragmento(
+            'contadores_admin',
+            [('solicitudes', None), ('mascotas', None), ('vehiculos', None), ('publicaciones', None)],
+            lambda: {
+                'solicitudes_count': 0,
+                'solicitudes_pendientes_count': Solicitud.objects.filter(estado='pendiente').count(),
+                'mascotas_count': Mascota.objects.filter(activo=True).count(),
+                'vehiculos_count': Vehiculo.objects.count(),
+                'publicaciones_count': Publicacion.objects.count(),
+            }
+        )
     else:
-        vehiculos = Vehiculo.objects.filter(usuario=request.user).order_by('-fecha_registro')
-    
-    # Obtener lista de vecinos (todos los usuarios activos excepto el actual)
-    # Ordenados por casa/departamento
-    vecinos = Usuario.objects.filter(activo=True).exclude(id=request.user.id).order_by('casa_departamento', 'last_name')
-    
-    # Obtener publicaciones (noticias/reportes)
-    publicaciones = Publicacion.objects.all().order_by('-fecha_publicacion')
+        contadores = fragmento(
+            f'contadores_residente:u{request.user.id}',
+            [('solicitudes', request.user.id), ('mascotas', None), ('vehiculos', request.user.id), ('publicaciones', None)],
+            lambda: {
+                'solicitudes_count': Solicitud.objects.filter(usuario=request.user).count(),
+                'solicitudes_pendientes_count': 0,
+                'mascotas_count': Mascota.objects.filter(activo=True).count(),
+                'vehiculos_count': Vehiculo.objects.filter(usuario=request.user).count(),
+                'publicaciones_count': Publicacion.objects.count(),
+            }
+        )
 
     context = {
         'usuario': request.user,
         'calendario': cal,
-        'eventos_por_dia': eventos_por_dia,
-        'solicitudes': solicitudes,
-        'todas_las_solicitudes': todas_las_solicitudes,
-        'solicitudes_pendientes_count': solicitudes_pendientes_count,
-        'mascotas': mascotas,
-        'vehiculos': vehiculos,
-        'vecinos': vecinos,
-        'publicaciones': publicaciones,
+        'eventos_por_dia': eventos_dia,
+        'eventos_count': len(eventos),
+        **contadores,
         'mes': mes,
         'ano': ano,
         'mes_nombre': meses[mes - 1],
@@ -153,35 +177,375 @@ def dashboard_view(request):
     return render(request, template, context)
 
 
+# ========== TARJETAS DEL DASHBOARD (CARGA DIFERIDA) ==========
+
+TAMANO_PAGINA_TARJETA = 20
+
+
+def _paginar(request, queryset, campo_cursor, parametros=None):
+    """
+    Pagina una lista del dashboard o de la API por cursor (keyset), con el
+    parámetro ?cursor=. campo_cursor es un campo de fecha (más recientes primero,
+    sobre (campo_cursor, id)) o una tupla de campos de texto en orden ascendente
+    (sobre (campos..., id)). Ninguna página usa OFFSET.
+    parametros (un QueryDict) son los que conserva el enlace a la página siguiente;
+    por omisión, todos los de la petición.
+    Devuelve (items, url_siguiente, primera_pagina).
+    Lanza CursorInvalido si el cursor recibido no es válido.
+    """
+    if parametros is None:
+        parametros = request.GET
+    cursor = parametros.get('cursor')
+    if isinstance(campo_cursor, tuple):
+        items, siguiente = paginar_por_campos(queryset, campo_cursor, cursor, TAMANO_PAGINA_TARJETA)
+    else:
+        items, siguiente = paginar_keyset(queryset, campo_cursor, cursor, TAMANO_PAGINA_TARJETA)
+
+    parametros = parametros.copy()
+    parametros['cursor'] = siguiente
+    url_siguiente = f'{request.path}?{parametros.urlencode()}' if siguiente else None
+    return items, url_siguiente, not cursor
+
+
+def _parametros_tarjeta(request, nombres):
+    """
+    Parámetros que lee una tarjeta (el cursor y los de nombres), sin espacios
+    ni valores vacíos y en orden fijo. Con ellos se arma la clave de caché, así
+    que un parámetro ajeno no crea otra entrada.
+    """
+    parametros = QueryDict(mutable=True)
+    for nombre in ('cursor', *nombres):
+        valor = request.GET.get(nombre, '').strip()
+        if valor:
+            parametros[nombre] = valor
+    return parametros
+
+
+def _respuesta_tarjeta(request, queryset, plantilla, campo_cursor, dependencias=None, excluir_id=None,
+                       parametros=()):
+    """
+    Renderiza una página de una tarjeta del dashboard y la devuelve como JSON.
+    Si se indican dependencias (grupos de cache_dashboard), la página se guarda en la
+    caché y se reutiliza hasta que una señal invalide alguno de esos grupos.
+    excluir_id quita un registro de la página ya obtenida (el propio usuario en la
+    lista global de vecinos), para que la página cacheada sirva a todos.
+    parametros son los nombres de los parámetros que lee la tarjeta además del cursor.
+    """
+    leidos = _parametros_tarjeta(request, parametros)
+
+    def calcular():
+        return _paginar(request, queryset, campo_cursor, leidos)
+
+    rol = 'admin' if request.user.es_administrador() else 'residente'
+    try:
+        if dependencias is None:
+            items, siguiente, primera_pagina = calcular()
+        else:
+            items, siguiente, primera_pagina = fragmento(
+                f'tarjeta:{rol}:{plantilla}', dependencias, calcular,
+                variante=leidos.urlencode()
+            )
+    except CursorInvalido:
+        return JsonResponse({'error': 'Cursor inválido'}, status=400)
+
+    if excluir_id is not None:
+        items = [item for item in items if item.pk != excluir_id]
+
+    html = render_to_string(f'usuarios/tarjetas/{rol}/{plantilla}.html', {
+        'items': items,
+        'usuario': request.user,
+        'primera_pagina': primera_pagina,
+    }, request=request)
+
+    return JsonResponse({'html': html, 'siguiente': siguiente})
+
+
+def _solicitudes_visibles(request):
+    """
+    Solicitudes que puede ver el usuario y la plantilla de tarjeta correspondiente.
+    El administrador ve todas para gestionarlas; el residente ve las suyas
+    (alcance=propias) o las de la comunidad (alcance=comunidad).
+    """
+    if request.user.es_administrador():
+        solicitudes = Solicitud.objects.all()
+        plantilla = 'solicitudes'
+    elif request.GET.get('alcance') == 'comunidad':
+        solicitudes = Solicitud.objects.all()
+        plantilla = 'solicitudes_comunidad'
+    else:
+        solicitudes = Solicitud.objects.filter(usuario=request.user)
+        plantilla = 'solicitudes_propias'
+
+    return solicitudes.select_related('usuario').con_reacciones(request.user), plantilla
+
+
+def _vehiculos_visibles(request):
+    """
+    Vehículos del usuario, o todos si es administrador.
+    """
+    if request.user.es_administrador():
+        vehiculos = Vehiculo.objects.all()
+    else:
+        vehiculos = Vehiculo.objects.filter(usuario=request.user)
+    return vehiculos.select_related('usuario')
+
+
+@login_required(login_url='usuarios:login')
+@require_http_methods(["GET"])
+def tarjeta_solicitudes(request):
+    """
+    Solicitudes del dashboard, paginadas por cursor.
+    Solo se cachean las propias del residente: las listas globales llevan la
+    marca de reacción de cada visitante.
+    """
+    solicitudes, plantilla = _solicitudes_visibles(request)
+    dependencias = None
+    if plantilla == 'solicitudes_propias':
+        # La gestión en lote (usuarios.gestion_solicitudes) no cambia la versión de cada autor
+        dependencias = [('solicitudes', request.user.id), ('solicitudes_lote', None)]
+    return _respuesta_tarjeta(
+        request, solicitudes, plantilla, campo_cursor='fecha_creacion', dependencias=dependencias,
+        parametros=('alcance',)
+    )
+
+
+@login_required(login_url='usuarios:login')
+@require_http_methods(["GET"])
+def tarjeta_mascotas(request):
+    """
+    Mascotas activas registradas en el conjunto, las más recientes primero,
+    paginadas por cursor.
+    """
+    mascotas = Mascota.objects.filter(activo=True).select_related('usuario')
+    return _respuesta_tarjeta(
+        request, mascotas, 'mascotas', campo_cursor='fecha_registro', dependencias=[('mascotas', None)]
+    )
+
+
+@login_required(login_url='usuarios:login')
+@require_http_methods(["GET"])
+def tarjeta_vehiculos(request):
+    """
+    Vehículos del dashboard, paginados por cursor.
+    """
+    if request.user.es_administrador():
+        dependencias = [('vehiculos', None)]
+    else:
+        dependencias = [('vehiculos', request.user.id)]
+    vehiculos = _vehiculos_visibles(request)
+    return _respuesta_tarjeta(request, vehiculos, 'vehiculos', campo_cursor='fecha_registro', dependencias=dependencias)
+
+
+@login_required(login_url='usuarios:login')
+@require_http_methods(["GET"])
+def tarjeta_vecinos(request):
+    """
+    Vecinos activos (excepto el usuario actual) ordenados por casa/departamento
+    y apellido, paginados por cursor; los que no tienen casa van primero.
+    El administrador los usa para abrir el chat con cada uno.
+    """
+    vecinos = Usuario.objects.filter(activo=True).annotate(casa=CASA_ORDEN)
+    return _respuesta_tarjeta(
+        request, vecinos, 'vecinos', campo_cursor=('casa', 'last_name'),
+        dependencias=[('vecinos', None)], excluir_id=request.user.id
+    )
+
+
+@login_required(login_url='usuarios:login')
+@require_http_methods(["GET"])
+def tarjeta_publicaciones(request):
+    """
+    Publicaciones (comunicados, novedades y reportes) más recientes primero,
+    paginadas por cursor.
+    """
+    return _respuesta_tarjeta(
+        request, Publicacion.objects.all(), 'publicaciones',
+        campo_cursor='fecha_publicacion', dependencias=[('publicaciones', None)]
+    )
+
+
+# ========== API JSON (PAGINACIÓN POR CURSOR) ==========
+
+def _respuesta_api(request, queryset, campo_cursor, serializar):
+    """
+    Devuelve una página de resultados serializados y la URL de la siguiente página.
+    """
+    try:
+        items, siguiente, _ = _paginar(request, queryset, campo_cursor)
+    except CursorInvalido:
+        return JsonResponse({'error': 'Cursor inválido'}, status=400)
+
+    return JsonResponse({
+        'resultados': [serializar(item) for item in items],
+        'siguiente': siguiente,
+    })
+
+
+@login_required(login_url='usuarios:login')
+@require_http_methods(["GET"])
+def api_solicitudes(request):
+    """
+    Lista de solicitudes en JSON, con los mismos permisos que la tarjeta del dashboard.
+    """
+    solicitudes, _ = _solicitudes_visibles(request)
+    return _respuesta_api(request, solicitudes, 'fecha_creacion', lambda solicitud: {
+        'id': solicitud.id,
+        'titulo': solicitud.titulo,
+        'descripcion': solicitud.descripcion,
+        'tipo': solicitud.tipo,
+        'estado': solicitud.estado,
+        'respuesta_admin': solicitud.respuesta_admin or '',
+        'fecha_creacion': solicitud.fecha_creacion.isoformat(),
+        'casa_departamento': solicitud.usuario.casa_departamento or '',
+        'autor': solicitud.usuario.get_full_name() or solicitud.usuario.username,
+        'total_reacciones': solicitud.total_reacciones,
+        'reaccionada': solicitud.reaccionada_por_usuario,
+    })
+
+
+@login_required(login_url='usuarios:login')
+@require_http_methods(["GET"])
+def api_publicaciones(request):
+    """
+    Lista de publicaciones en JSON.
+    """
+    return _respuesta_api(request, Publicacion.objects.all(), 'fecha_publicacion', lambda pub: {
+        'id': pub.id,
+        'titulo': pub.titulo,
+        'contenido': pub.contenido,
+        'tipo': pub.tipo,
+        'imagen': pub.imagen.url if pub.imagen and pub.estado_imagen == 'lista' else None,
+        'archivo_pdf': pub.archivo_pdf.url if pub.archivo_pdf else None,
+        'fecha_publicacion': pub.fecha_publicacion.isoformat(),
+    })
+
+
+@login_required(login_url='usuarios:login')
+@require_http_methods(["GET"])
+def api_vehiculos(request):
+    """
+    Lista de vehículos en JSON: los del usuario, o todos si es administrador.
+    """
+    return _respuesta_api(request, _vehiculos_visibles(request), 'fecha_registro', lambda vehiculo: {
+        'id': vehiculo.id,
+        'placa': vehiculo.placa,
+        'marca': vehiculo.marca,
+        'modelo': vehiculo.modelo,
+        'color': vehiculo.color,
+        'dueno': vehiculo.dueno,
+        'numero_casa': vehiculo.numero_casa,
+        'fecha_registro': vehiculo.fecha_registro.isoformat(),
+    })
+
+
+@login_required(login_url='usuarios:login')
+@require_http_methods(["GET"])
+def api_buscar(request):
+    """
+    Búsqueda de texto completo en publicaciones y solicitudes (usuarios.busqueda),
+    por relevancia. ?q= texto, ?tipo= publicacion o solicitud, ?pagina= número.
+    """
+    consulta = request.GET.get('q', '').strip()
+    tipo = request.GET.get('tipo') or None
+    if tipo not in (None, 'publicacion', 'solicitud'):
+        return JsonResponse({'error': 'Tipo inválido'}, status=400)
+    try:
+        pagina = max(int(request.GET.get('pagina', 1)), 1)
+    except ValueError:
+        pagina = 1
+
+    resultados, hay_mas = buscar(consulta, tipo, pagina)
+    parametros = request.GET.copy()
+    parametros['pagina'] = pagina + 1
+
+    def serializar(item):
+        if item.tipo_busqueda == 'publicacion':
+            return {
+                'tipo': 'publicacion',
+                'id': item.id,
+                'titulo': item.titulo,
+                'resumen': Truncator(item.contenido).chars(160),
+                'categoria': item.get_tipo_display(),
+                'autor': item.autor.get_full_name() or item.autor.username,
+                'fecha': item.fecha_publicacion.isoformat(),
+            }
+        return {
+            'tipo': 'solicitud',
+            'id': item.id,
+            'titulo': item.titulo,
+            'resumen': Truncator(item.descripcion).chars(160),
+            'categoria': item.get_tipo_display(),
+            'estado': item.get_estado_display(),
+            'autor': item.usuario.get_full_name() or item.usuario.username,
+            'fecha': item.fecha_creacion.isoformat(),
+        }
+
+    return JsonResponse({
+        'resultados': [serializar(item) for item in resultados],
+        'siguiente': f'{request.path}?{parametros.urlencode()}' if hay_mas else None,
+    })
+
+
+@login_required(login_url='usuarios:login')
+@user_passes_test(lambda u: u.es_administrador())
+@require_http_methods(["GET"])
+def api_placas(request):
+    """
+    Consulta de placas para la garita (usuarios.placas): ?placa= tal como se
+    lee, con hasta dos errores de digitación. Los más parecidos primero.
+    """
+    placa = request.GET.get('placa', '')
+    if not normalizar_placa(placa):
+        return JsonResponse({'error': 'Falta la placa'}, status=400)
+    return JsonResponse({
+        'placa': normalizar_placa(placa),
+        'resultados': [
+            {'errores': errores, **vehiculo} for errores, vehiculo in buscar_placa(placa)
+        ],
+    })
+
+
 @login_required
 @require_POST
 def reaccionar_solicitud(request, solicitud_id):
     """
     Vista para manejar las reacciones a las solicitudes vía AJAX.
+    El contador total_reacciones lo ajustan las señales de la reacción
+    (usuarios/signals.py), en la misma transacción y con un número constante de
+    sentencias sin importar su popularidad.
     """
     try:
-        solicitud = get_object_or_404(Solicitud, id=solicitud_id)
-        
-        reaccion, creada = ReaccionSolicitud.objects.get_or_create(
-            usuario=request.user,
-            solicitud=solicitud
-        )
-        
-        if not creada:
-            # Si ya existía, la quitamos (toggle)
-            reaccion.delete()
-            accion = 'quitada'
-        else:
-            accion = 'añadida'
-            
-        total_reacciones = solicitud.reacciones.count()
+        with transaction.atomic():
+            # Bloquear la fila serializa los clics simultáneos sobre la misma solicitud
+            solicitud = get_object_or_404(
+                Solicitud.objects.select_for_update().only('id', 'usuario_id'),
+                id=solicitud_id
+            )
+
+            # Por el related manager la reacción ya trae su solicitud: la señal no vuelve a buscar al autor
+            reaccion = solicitud.reacciones.filter(usuario=request.user).first()
+
+            if reaccion:
+                # Si ya existía, la quitamos (toggle)
+                reaccion.delete()
+                accion = 'quitada'
+            else:
+                solicitud.reacciones.create(usuario=request.user)
+                accion = 'añadida'
+
+            # Se relee tras el F() de la señal: en motores sin FOR UPDATE (SQLite) otro
+            # clic pudo cambiar el contador después de leer la fila
+            total_reacciones = Solicitud.objects.filter(id=solicitud.id).values_list(
+                'total_reacciones', flat=True
+            ).get()
+            publicar_novedad('reaccion', id=solicitud.id, total_reacciones=total_reacciones)
         
         return JsonResponse({
             'status': 'success',
             'accion': accion,
             'total_reacciones': total_reacciones
         })
-    except Solicitud.DoesNotExist:
+    except Http404:
         return JsonResponse({'status': 'error', 'message': 'Solicitud no encontrada'}, status=404)
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
@@ -209,15 +573,19 @@ def crear_publicacion(request):
     archivo_pdf = request.FILES.get('archivo_pdf')
     
     try:
-        Publicacion.objects.create(
-            autor=request.user,
-            titulo=titulo,
-            contenido=contenido,
-            tipo=tipo,
-            imagen=imagen,
-            archivo_pdf=archivo_pdf
-        )
+        with transaction.atomic():
+            publicacion = Publicacion.objects.create(
+                autor=request.user,
+                titulo=titulo,
+                contenido=contenido,
+                tipo=tipo,
+                imagen=imagen,
+                archivo_pdf=archivo_pdf
+            )
+            publicar_novedad('publicacion', id=publicacion.id, accion='creada', titulo=publicacion.titulo)
         messages.success(request, '¡Publicación creada con éxito 🚀')
+    except ValidationError as e:
+        messages.error(request, f'❌ {" ".join(e.messages)}')
     except Exception as e:
         messages.error(request, f'Chuta, algo salió mal: {str(e)}')
         
@@ -243,8 +611,12 @@ def editar_publicacion(request, pk):
         publicacion.archivo_pdf = request.FILES['archivo_pdf']
         
     try:
-        publicacion.save()
+        with transaction.atomic():
+            publicacion.save()
+            publicar_novedad('publicacion', id=publicacion.id, accion='editada', titulo=publicacion.titulo)
         messages.success(request, '¡Publicación actualizada! Todo bien. ✅')
+    except ValidationError as e:
+        messages.error(request, f'❌ {" ".join(e.messages)}')
     except Exception as e:
         messages.error(request, f'No se pudo actualizar: {str(e)}')
         
@@ -260,7 +632,9 @@ def eliminar_publicacion(request, pk):
     """
     publicacion = get_object_or_404(Publicacion, pk=pk)
     try:
-        publicacion.delete()
+        with transaction.atomic():
+            publicar_novedad('publicacion', id=publicacion.id, accion='eliminada', titulo=publicacion.titulo)
+            publicacion.delete()
         messages.success(request, 'Publicación eliminada correctamente. 👍')
     except Exception as e:
         messages.error(request, f'No se pudo eliminar la nota: {str(e)}')
@@ -306,7 +680,12 @@ def gestionar_solicitud(request, solicitud_id):
     if nuevo_estado:
         solicitud.estado = nuevo_estado
         solicitud.respuesta_admin = respuesta
-        solicitud.save()
+        with transaction.atomic():
+            solicitud.save(update_fields=['estado', 'respuesta_admin', 'fecha_actualizacion'])
+            publicar_novedad(
+                'solicitud', id=solicitud.id, estado=solicitud.estado,
+                estado_display=solicitud.get_estado_display()
+            )
         messages.success(request, f'✅ Solicitud #{solicitud.id} actualizada correctamente.')
     else:
         messages.error(request, 'Error al actualizar la solicitud.')
@@ -314,6 +693,31 @@ def gestionar_solicitud(request, solicitud_id):
     return redirect('usuarios:dashboard')
 
 
+@login_required
+@user_passes_test(lambda u: u.es_administrador())
+@require_http_methods(["POST"])
+def gestionar_solicitudes_lote(request):
+    """
+    Cambia el estado de varias solicitudes a la vez, con una respuesta común
+    opcional (usuarios.gestion_solicitudes). Responde JSON: el dashboard no se
+    recarga.
+    """
+    try:
+        ids = [int(valor) for valor in request.POST.getlist('ids')]
+    except ValueError:
+        return JsonResponse({'error': 'Solicitudes inválidas'}, status=400)
+    if not 0 < len(ids) <= MAX_LOTE:
+        return JsonResponse({'error': f'Elige entre 1 y {MAX_LOTE} solicitudes'}, status=400)
+    estado = request.POST.get('estado')
+    if estado not in ESTADOS:
+        return JsonResponse({'error': 'Estado inválido'}, status=400)
+
+    # Vacía no toca las respuestas que ya tenían
+    respuesta = request.POST.get('respuesta', '').strip() or None
+    actualizadas = gestionar_en_lote(Solicitud.objects.filter(pk__in=ids), estado, respuesta)
+    return JsonResponse({'actualizadas': actualizadas, 'estado': estado, 'estado_display': ESTADOS[estado]})
+
+
 @login_required
 @user_passes_test(lambda u: u.es_administrador())
 def crear_usuario(request):
@@ -380,6 +784,7 @@ def eliminar_usuario(request, user_id):
     
     # Eliminar
     nombre = usuario_eliminar.username
+    # Sus reacciones se borran en cascada y las señales las descuentan de cada solicitud
     usuario_eliminar.delete()
     messages.success(request, f'Usuario {nombre} eliminado correctamente.')
     return redirect('usuarios:lista_usuarios')
@@ -415,11 +820,6 @@ def crear_mascota(request):
     Los vecinos pueden registrar mascotas dentro del conjunto.
     """
     try:
-        from PIL import Image
-        import json
-        import io
-        from django.core.files.uploadedfile import InMemoryUploadedFile
-        
         numero_casa = request.POST.get('numero_casa', '').strip()
         nombre = request.POST.get('nombre', '').strip()
         dueno = request.POST.get('dueno', '').strip()
@@ -443,67 +843,18 @@ def crear_mascota(request):
             descripcion=descripcion  
         )
         
-        # Guardar foto con crop aplicado
+        # La foto se guarda tal como llega; el recorte y la recodificación se
+        # hacen en segundo plano (usuarios.imagenes)
         if foto:
-            try:
-                # Procesar el crop si existe
-                if crop_data:
-                    crop_coords = json.loads(crop_data)
-                    img = Image.open(foto)
-                    
-                    # Asegurarse de que la imagen esté en RGB si es necesario
-                    if img.mode in ('RGBA', 'LA', 'P'):
-                        img = img.convert('RGB')
-                    
-                    # Obtener coordenadas del crop (vienen del contenedor de 300x300px)
-                    left_preview = int(crop_coords.get('left', 0))
-                    top_preview = int(crop_coords.get('top', 0))
-                    width_preview = int(crop_coords.get('width', 300))
-                    height_preview = int(crop_coords.get('height', 300))
-                    
-                    # Calcular la escala entre el preview (300px) y la imagen real
-                    preview_size = 300
-                    scale_x = img.width / preview_size
-                    scale_y = img.height / preview_size
-                    
-                    # Convertir las coordenadas del preview a coordenadas de la imagen real
-                    left = int(left_preview * scale_x)
-                    top = int(top_preview * scale_y)
-                    right = int((left_preview + width_preview) * scale_x)
-                    bottom = int((top_preview + height_preview) * scale_y)
-                    
-                    # Asegurar que las coordenadas estén dentro de los límites de la imagen
-                    left = max(0, min(left, img.width))
-                    top = max(0, min(top, img.height))
-                    right = max(0, min(right, img.width))
-                    bottom = max(0, min(bottom, img.height))
-                    
-                    img_cropped = img.crop((left, top, right, bottom))
-                    
-                    # Guardar la imagen recortada en memoria
-                    img_io = io.BytesIO()
-                    img_cropped.save(img_io, format='JPEG', quality=90)
-                    img_io.seek(0)
-                    
-                    # Crear un archivo subido en memoria
-                    foto_croppada = InMemoryUploadedFile(
-                        img_io,
-                        'ImageField',
-                        f'{nombre}_cropped.jpg',
-                        'image/jpeg',
-                        img_io.getbuffer().nbytes,
-                        None
-                    )
-                    mascota.foto = foto_croppada
-                else:
-                    mascota.foto = foto
-            except Exception as e:
-                print(f'Error al procesar imagen: {e}')
-                mascota.foto = foto
+            mascota.foto = foto
+            if crop_data:
+                recortar_al_procesar(mascota, 'foto', recorte_de_vista_previa(crop_data))
         
         mascota.save()
         foto_text = " con foto" if foto else ""
         messages.success(request, f'✅ Mascota "{nombre}" registrada exitosamente{foto_text}.')
+    except ValidationError as e:
+        messages.error(request, f'❌ {" ".join(e.messages)}')
     except Exception as e:
         messages.error(request, f'Error al registrar la mascota: {str(e)}')
     
@@ -544,7 +895,7 @@ def editar_mascota(request, mascota_id):
         mascota = Mascota.objects.get(id=mascota_id)
         
         # Validar permisos: solo propietario o administrador
-        if mascota.usuario != request.user and not request.user.es_administrador():
+        if mascota.usuario_id != request.user.id and not request.user.es_administrador():
             messages.error(request, 'No tienes permiso para editar esta mascota.')
             return redirect('usuarios:dashboard')
         
@@ -562,6 +913,8 @@ def editar_mascota(request, mascota_id):
         messages.success(request, f'✅ Mascota "{mascota.nombre}" actualizada exitosamente.')
     except Mascota.DoesNotExist:
         messages.error(request, 'La mascota no fue encontrada.')
+    except ValidationError as e:
+        messages.error(request, f'❌ {" ".join(e.messages)}')
     except Exception as e:
         messages.error(request, f'Error al actualizar la mascota: {str(e)}')
     
@@ -579,7 +932,7 @@ def eliminar_mascota(request, mascota_id):
         mascota = Mascota.objects.get(id=mascota_id)
         
         # Validar permisos: solo propietario o administrador
-        if mascota.usuario != request.user and not request.user.es_administrador():
+        if mascota.usuario_id != request.user.id and not request.user.es_administrador():
             messages.error(request, 'No tienes permiso para eliminar esta mascota.')
             return redirect('usuarios:dashboard')
         
@@ -610,8 +963,8 @@ def crear_vehiculo(request):
         modelo = request.POST.get('modelo')
         color = request.POST.get('color')
         
-        # Validar que no exista otro vehículo con la misma placa
-        if Vehiculo.objects.filter(placa=placa).exists():
+        # Validar que no exista otro vehículo con la misma placa, aunque esté escrita distinto
+        if Vehiculo.objects.filter(placa_normalizada=normalizar_placa(placa)).exists():
             messages.error(request, f'❌ Ya existe un vehículo registrado con la placa {placa}.')
             return redirect('usuarios:dashboard')
         
@@ -643,7 +996,7 @@ def obtener_vehiculo(request, vehiculo_id):
         vehiculo = Vehiculo.objects.get(id=vehiculo_id)
         
         # Validar permisos: solo propietario o administrador
-        if vehiculo.usuario != request.user and not request.user.es_administrador():
+        if vehiculo.usuario_id != request.user.id and not request.user.es_administrador():
             return JsonResponse({'error': 'No tienes permiso para ver este vehículo.'}, status=403)
             
         data = {
@@ -672,14 +1025,16 @@ def editar_vehiculo(request, vehiculo_id):
         vehiculo = Vehiculo.objects.get(id=vehiculo_id)
         
         # Validar permisos: solo propietario o administrador
-        if vehiculo.usuario != request.user and not request.user.es_administrador():
+        if vehiculo.usuario_id != request.user.id and not request.user.es_administrador():
             messages.error(request, 'No tienes permiso para editar este vehículo.')
             return redirect('usuarios:dashboard')
         
         placa_nueva = request.POST.get('placa', '').strip()
         
         # Validar que si cambia de placa, no exista ya en otro vehículo
-        if placa_nueva and placa_nueva != vehiculo.placa and Vehiculo.objects.filter(placa=placa_nueva).exists():
+        if placa_nueva and normalizar_placa(placa_nueva) != vehiculo.placa_normalizada and Vehiculo.objects.filter(
+            placa_normalizada=normalizar_placa(placa_nueva)
+        ).exclude(pk=vehiculo.pk).exists():
             messages.error(request, f'❌ Ya existe otro vehículo con la placa {placa_nueva}.')
             return redirect('usuarios:dashboard')
             
@@ -710,7 +1065,7 @@ def eliminar_vehiculo(request, vehiculo_id):
         vehiculo = Vehiculo.objects.get(id=vehiculo_id)
         
         # Validar permisos: solo propietario o administrador
-        if vehiculo.usuario != request.user and not request.user.es_administrador():
+        if vehiculo.usuario_id != request.user.id and not request.user.es_administrador():
             messages.error(request, 'No tienes permiso para eliminar este vehículo.')
             return redirect('usuarios:dashboard')
             
@@ -723,3 +1078,210 @@ def eliminar_vehiculo(request, vehiculo_id):
         messages.error(request, f'Error al eliminar el vehículo: {str(e)}')
     
     return redirect('usuarios:dashboard')
+
+
+# ========== CHAT ==========
+# Los mensajes nuevos y las confirmaciones de lectura viajan por WebSocket
+# (usuarios.chat); por HTTP solo se piden los contactos y el historial.
+
+def _serializar_contacto(usuario, contacto, conversacion):
+    return {
+        'id': contacto.id,
+        'nombre': contacto.get_full_name() or contacto.username,
+        'casa_departamento': contacto.casa_departamento or '',
+        'no_leidos': conversacion.no_leidos_de(usuario) if conversacion else 0,
+        'ultimo_mensaje': conversacion.ultimo_mensaje.contenido if conversacion and conversacion.ultimo_mensaje else '',
+        'ultima_actividad': conversacion.ultima_actividad.isoformat() if conversacion else None,
+    }
+
+
+@login_required(login_url='usuarios:login')
+@require_http_methods(["GET"])
+def chat_contactos(request):
+    """
+    La administración activa, a la que el residente puede escribir, con los
+    mensajes sin leer de cada conversación.
+    """
+    administradores = list(
+        Usuario.objects.filter((Q(rol='admin') | Q(is_superuser=True)) & Q(activo=True))
+        .exclude(pk=request.user.pk).order_by('first_name', 'last_name')
+    )
+    conversaciones = {
+        conversacion.otro_id(request.user): conversacion
+        for conversacion in Conversacion.objects.entre(request.user, [a.pk for a in administradores])
+        .select_related('ultimo_mensaje')
+    }
+    return JsonResponse({'resultados': [
+        _serializar_contacto(request.user, administrador, conversaciones.get(administrador.pk))
+        for administrador in administradores
+    ]})
+
+
+@login_required(login_url='usuarios:login')
+@require_http_methods(["GET"])
+def chat_bandeja(request):
+    """
+    Conversaciones del usuario, de la más reciente a la más antigua y paginadas
+    por cursor. Se lee solo el resumen de Conversacion: el costo no depende de
+    cuántos mensajes se hayan enviado.
+    """
+    conversaciones = [
+        lado.select_related('usuario_a', 'usuario_b', 'ultimo_mensaje')
+        for lado in Conversacion.objects.de_usuario(request.user)
+    ]
+    return _respuesta_api(request, conversaciones, 'ultima_actividad', lambda conversacion: _serializar_contacto(
+        request.user, conversacion.otro(request.user), conversacion
+    ))
+
+
+@login_required(login_url='usuarios:login')
+@require_http_methods(["GET"])
+def chat_historial(request, usuario_id):
+    """
+    Mensajes de la conversación con otro usuario, más recientes primero
+    y paginados por cursor. Una de las dos partes debe ser administrador.
+    """
+    try:
+        otro = Usuario.objects.only('id', 'rol', 'is_superuser').get(pk=usuario_id, activo=True)
+    except Usuario.DoesNotExist:
+        return JsonResponse({'error': 'Usuario no encontrado'}, status=404)
+
+    if otro.pk == request.user.pk or not (request.user.es_administrador() or otro.es_administrador()):
+        return JsonResponse({'error': 'No tienes permiso para ver esta conversación'}, status=403)
+
+    mensajes = Mensaje.objects.filter(
+        Q(remitente=request.user, destinatario=otro) | Q(remitente=otro, destinatario=request.user)
+    )
+    return _respuesta_api(request, mensajes, 'fecha_envio', serializar_mensaje)
+
+
+def _serializar_difusion(difusion):
+    return {
+        'id': difusion.id,
+        'estado': difusion.estado,
+        'estado_display': difusion.get_estado_display(),
+        'total': difusion.total,
+        'enviados': difusion.enviados,
+        'porcentaje': difusion.porcentaje,
+    }
+
+
+@login_required
+@user_passes_test(lambda u: u.es_administrador())
+@require_http_methods(["POST"])
+def crear_difusion(request):
+    """
+    Mensaje de la administración a todos los residentes o a un grupo. Aquí solo
+    se registra la difusión: el reparto corre en segundo plano
+    (usuarios.difusiones) y su avance se consulta en estado_difusion.
+    """
+    contenido = request.POST.get('contenido', '').strip()
+    destino = request.POST.get('destino', 'todos')
+    casa = request.POST.get('casa', '').strip()
+
+    if not contenido:
+        return JsonResponse({'error': 'El mensaje está vacío'}, status=400)
+    if len(contenido) > MAX_CONTENIDO:
+        return JsonResponse({'error': f'El mensaje supera los {MAX_CONTENIDO} caracteres'}, status=400)
+    if destino not in dict(Difusion.DESTINO_CHOICES):
+        return JsonResponse({'error': 'Destino no válido'}, status=400)
+
+    with transaction.atomic():
+        difusion = Difusion.objects.create(
+            remitente=request.user, contenido=contenido, destino=destino, casa=casa[:50]
+        )
+        encolar(enviar_difusion, difusion.id)
+    return JsonResponse(_serializar_difusion(difusion), status=202)
+
+
+@login_required
+@user_passes_test(lambda u: u.es_administrador())
+@require_http_methods(["GET"])
+def estado_difusion(request, difusion_id):
+    """Avance del reparto de una difusión, para la barra de progreso."""
+    try:
+        difusion = Difusion.objects.get(pk=difusion_id)
+    except Difusion.DoesNotExist:
+        return JsonResponse({'error': 'Difusión no encontrada'}, status=404)
+    return JsonResponse(_serializar_difusion(difusion))
+
+
+# ========== EXPORTACIONES ==========
+
+@login_required(login_url='usuarios:login')
+@user_passes_test(lambda u: u.es_administrador())
+@require_http_methods(["GET"])
+def exportar(request, nombre):
+    """
+    Descarga de usuarios, vehiculos, mascotas o solicitudes en CSV o XLSX
+    (?formato=), con filtros opcionales ?estado= ?tipo= ?desde= ?hasta= ?casa=
+    (usuarios.exportacion). Se envía por partes: la memoria no depende del
+    número de filas.
+    """
+    if nombre not in EXPORTACIONES:
+        raise Http404('Exportación no encontrada')
+    formato = request.GET.get('formato', 'csv')
+    if formato not in FORMATOS:
+        return JsonResponse({'error': 'Formato inválido (csv o xlsx)'}, status=400)
+    modelo = apps.get_model(EXPORTACIONES[nombre]['modelo'])
+    try:
+        registros = filtrar(nombre, modelo.objects.all(), request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return respuesta_exportacion(request, nombre, registros, formato)
+
+
+# ========== NOVEDADES EN VIVO ==========
+
+@login_required(login_url='usuarios:login')
+@require_http_methods(["GET"])
+async def novedades(request):
+    """
+    Flujo Server-Sent Events con los cambios de estado de las solicitudes, los
+    totales de reacciones y las publicaciones. Es una vista asíncrona: cada
+    cliente conectado es una corrutina en espera, no un hilo del servidor, así
+    que necesita un servidor ASGI (ver config/asgi.py). EventSource se reconecta
+    solo y envía Last-Event-ID para recibir lo que se perdió en el corte.
+    """
+    ultimo = request.headers.get('Last-Event-ID') or request.GET.get('desde')
+    try:
+        ultimo_id = int(ultimo) if ultimo else None
+    except ValueError:
+        return JsonResponse({'error': 'Last-Event-ID inválido'}, status=400)
+
+    respuesta = StreamingHttpResponse(flujo_novedades(ultimo_id), content_type='text/event-stream')
+    respuesta['Cache-Control'] = 'no-cache'
+    # nginx no debe acumular el flujo en su buffer
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
+
+
+# ========== ARCHIVOS SUBIDOS ==========
+
+@login_required(login_url='usuarios:login')
+@require_http_methods(["GET", "HEAD"])
+def media(request, ruta):
+    """
+    Entrega un archivo de MEDIA_ROOT a los usuarios con sesión, si algún
+    registro lo usa. Los bytes los envía el servidor web (usuarios.media).
+    """
+    if not archivo_publicado(ruta):
+        raise Http404('Archivo no encontrado')
+    return responder_archivo(request, ruta)
+
+
+# ========== MÉTRICAS ==========
+
+@require_http_methods(["GET"])
+def metricas(request):
+    """
+    Métricas de rendimiento en formato Prometheus.
+    Accesible para administradores o con el token METRICAS_TOKEN (Authorization: Bearer).
+    """
+    token = settings.METRICAS_TOKEN
+    autorizacion = request.headers.get('Authorization', '')
+    con_token = bool(token) and constant_time_compare(autorizacion, f'Bearer {token}')
+    if not con_token and not (request.user.is_authenticated and request.user.es_administrador()):
+        return JsonResponse({'error': 'No autorizado'}, status=403)
+
+    return HttpResponse(exportar_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')